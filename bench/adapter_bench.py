@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# ABOUTME: Benchmarks the subprocess plumbing of the q, gemini and codex adapters
+# ABOUTME: Runs them against fake CLIs to measure overhead, first byte, CPU per MB and shutdown
+
+"""Adapter subprocess benchmark.
+
+Points ``RALPH_QCHAT_COMMAND``, ``RALPH_GEMINI_COMMAND`` and
+``RALPH_CODEX_COMMAND`` at the shims in ``bench/fake_cli`` and runs 1-64
+adapters concurrently in each scenario:
+
+    throughput  stream --bytes as fast as possible
+    paced       stream 64 KiB at 256 KiB/s after a 100 ms delay
+    stderr      flood stderr with --bytes alongside stdout
+    timeout     hang until the adapter's timeout terminates the CLI
+    sigterm     hang and ignore SIGTERM, so the adapter has to kill
+    cancel      hang until the adapter task is cancelled
+
+Reported per row: the mean run time above the fake CLI's own schedule,
+the mean time to first byte, the orchestrator-process CPU per MB of
+output, and for the shutdown scenarios the time from the timeout or
+cancel to the adapter returning.
+
+Usage:
+    python bench/adapter_bench.py [--adapters qchat,codex] [--concurrency 1,8]
+                                  [--scenarios throughput,sigterm] [--sync] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+FAKE_CLI_DIR = BENCH_DIR / "fake_cli"
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from ralph_orchestrator.adapters.base import EVENT_TEXT  # noqa: E402
+from ralph_orchestrator.logging_config import RalphLogger  # noqa: E402
+
+ADAPTERS = {
+    "qchat": ("RALPH_QCHAT_COMMAND", "q"),
+    "gemini": ("RALPH_GEMINI_COMMAND", "gemini"),
+    "codex": ("RALPH_CODEX_COMMAND", "codex"),
+}
+
+SHUTDOWN_TIMEOUT = 1.0  # Adapter timeout (or cancel delay) in the shutdown scenarios
+
+
+@dataclass
+class Scenario:
+    name: str
+    mode: str = "stream"
+    size: int = 0  # 0 means --bytes
+    rate: float = 0.0
+    delay: float = 0.0
+    timeout: Optional[float] = None
+    cancel_after: Optional[float] = None
+
+    @property
+    def shutdown(self) -> bool:
+        return self.timeout is not None or self.cancel_after is not None
+
+
+SCENARIOS = {
+    s.name: s for s in [
+        Scenario("throughput"),
+        Scenario("paced", size=65536, rate=262144, delay=0.1),
+        Scenario("stderr", mode="stderr"),
+        Scenario("timeout", mode="hang", size=4096, timeout=SHUTDOWN_TIMEOUT),
+        Scenario("sigterm", mode="ignore-term", size=4096, timeout=SHUTDOWN_TIMEOUT),
+        Scenario("cancel", mode="hang", size=4096, cancel_after=SHUTDOWN_TIMEOUT),
+    ]
+}
+
+
+@dataclass
+class Result:
+    adapter: str
+    scenario: str
+    concurrency: int
+    wall: float
+    overhead_ms: float
+    ttfb_ms: Optional[float]
+    cpu_ms_per_mb: Optional[float]
+    shutdown_ms: Optional[float]
+    failures: int
+
+
+def configure_fake_cli(scenario: Scenario, size: int, chunk: int) -> None:
+    """Adapters read their command at construction; the fake CLI reads FAKE_AGENT_* at start."""
+    for env_var, shim in ADAPTERS.values():
+        os.environ[env_var] = str(FAKE_CLI_DIR / shim)
+    os.environ["FAKE_AGENT_PYTHON"] = sys.executable
+    os.environ["FAKE_AGENT_MODE"] = scenario.mode
+    os.environ["FAKE_AGENT_BYTES"] = str(size)
+    os.environ["FAKE_AGENT_RATE"] = str(scenario.rate)
+    os.environ["FAKE_AGENT_DELAY"] = str(scenario.delay)
+    os.environ["FAKE_AGENT_CHUNK"] = str(chunk)
+
+
+def create_adapter(name: str):
+    if name == "qchat":
+        from ralph_orchestrator.adapters.qchat import QChatAdapter
+        return QChatAdapter(available=True)
+    if name == "gemini":
+        from ralph_orchestrator.adapters.gemini import GeminiAdapter
+        return GeminiAdapter(available=True)
+    from ralph_orchestrator.adapters.codex import CodexAdapter
+    return CodexAdapter(available=True)
+
+
+async def run_one(adapter, scenario: Scenario, executor: Optional[ThreadPoolExecutor]) -> Dict[str, Any]:
+    """Run one adapter call and time its first byte and its end."""
+    first_byte: List[float] = []
+
+    def on_event(_name, event):
+        if event.kind == EVENT_TEXT and not first_byte:
+            first_byte.append(time.monotonic())
+
+    adapter.subscribe(on_event)
+    kwargs: Dict[str, Any] = {"timeout": scenario.timeout or 600, "verbose": False}
+    start = time.monotonic()
+    stopped_at = None
+    try:
+        if executor:
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(executor, lambda: adapter.execute("benchmark prompt", **kwargs))
+        else:
+            call = asyncio.ensure_future(adapter.aexecute("benchmark prompt", **kwargs))
+
+        if scenario.cancel_after is not None:
+            done, _ = await asyncio.wait([call], timeout=scenario.cancel_after)
+            if not done:
+                stopped_at = time.monotonic()
+                call.cancel()
+        try:
+            response = await call
+            # The sync path publishes no events, so it reports no first byte
+            success = response.success
+        except asyncio.CancelledError:
+            success = False
+    finally:
+        adapter.unsubscribe(on_event)
+
+    end = time.monotonic()
+    if scenario.timeout is not None:
+        stopped_at = start + scenario.timeout
+    return {
+        "duration": end - start,
+        "ttfb": first_byte[0] - start if first_byte else None,
+        "shutdown": end - stopped_at if stopped_at else None,
+        "success": success,
+    }
+
+
+async def run_row(name: str, scenario: Scenario, concurrency: int, size: int,
+                  chunk: int, use_sync: bool) -> Result:
+    configure_fake_cli(scenario, size, chunk)
+    adapters = [create_adapter(name) for _ in range(concurrency)]
+    # One thread per blocking call, so the sync path is not throttled by the pool size
+    executor = ThreadPoolExecutor(concurrency) if use_sync else None
+
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.monotonic()
+    runs = await asyncio.gather(*(run_one(a, scenario, executor) for a in adapters))
+    wall = time.monotonic() - start
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    if executor:
+        executor.shutdown()
+
+    for adapter in adapters:
+        await adapter.aclose()
+
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    megabytes = size * concurrency * (2 if scenario.mode == "stderr" else 1) / 1e6
+    schedule = scenario.delay + (size / scenario.rate if scenario.rate else 0.0)
+    ttfbs = [r["ttfb"] for r in runs if r["ttfb"] is not None]
+    shutdowns = [r["shutdown"] for r in runs if r["shutdown"] is not None]
+
+    return Result(
+        adapter=name,
+        scenario=scenario.name,
+        concurrency=concurrency,
+        wall=round(wall, 3),
+        overhead_ms=round((statistics.mean(r["duration"] for r in runs) - schedule) * 1000, 1),
+        ttfb_ms=round(statistics.mean(ttfbs) * 1000, 1) if ttfbs else None,
+        cpu_ms_per_mb=round(cpu * 1000 / megabytes, 1) if megabytes and not scenario.shutdown else None,
+        shutdown_ms=round(statistics.mean(shutdowns) * 1000, 1) if shutdowns else None,
+        failures=sum(1 for r in runs if not r["success"]) if not scenario.shutdown else 0,
+    )
+
+
+def format_row(result: Result) -> str:
+    def cell(value, width):
+        return f"{'-' if value is None else value:>{width}}"
+    return (
+        f"{result.adapter:8} {result.scenario:11} {result.concurrency:>4} "
+        f"{cell(result.wall, 8)} {cell(result.overhead_ms, 11)} {cell(result.ttfb_ms, 9)} "
+        f"{cell(result.cpu_ms_per_mb, 10)} {cell(result.shutdown_ms, 12)} {result.failures:>5}"
+    )
+
+
+async def main_async(args) -> List[Result]:
+    results = []
+    print(f"{'adapter':8} {'scenario':11} {'conc':>4} {'wall s':>8} {'overhead ms':>11} "
+          f"{'ttfb ms':>9} {'cpu ms/MB':>10} {'shutdown ms':>12} {'fails':>5}")
+    for name in args.adapters:
+        for scenario_name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_row(
+                    name, SCENARIOS[scenario_name], concurrency,
+                    SCENARIOS[scenario_name].size or args.bytes, args.chunk, args.sync
+                )
+                print(format_row(result), flush=True)
+                results.append(result)
+    return results
+
+
+def csv_list(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--adapters", type=csv_list, default=list(ADAPTERS),
+                        help="Comma-separated adapters (default: qchat,gemini,codex)")
+    parser.add_argument("--scenarios", type=csv_list, default=list(SCENARIOS),
+                        help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in csv_list(v)],
+                        default=[1, 4, 16, 64], help="Concurrent adapters per row (default: 1,4,16,64)")
+    parser.add_argument("--bytes", type=int, default=8 * 1024 * 1024,
+                        help="Output per CLI run for the throughput scenarios (default: 8 MiB)")
+    parser.add_argument("--chunk", type=int, default=4096, help="Bytes per write by the fake CLI")
+    parser.add_argument("--sync", action="store_true",
+                        help="Benchmark the blocking execute() path on a thread pool instead")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    unknown = [a for a in args.adapters if a not in ADAPTERS] + [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown adapters or scenarios: {', '.join(unknown)}")
+    if args.sync and "cancel" in args.scenarios:
+        # A thread running execute() cannot be cancelled
+        args.scenarios = [s for s in args.scenarios if s != "cancel"]
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # The q adapter logs to the 'ralph' hierarchy, which RalphLogger gives its
+    # own handlers on first use; set it up silent before any adapter is built
+    RalphLogger.initialize(log_level="CRITICAL", console_output=False)
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
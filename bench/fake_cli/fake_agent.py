@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# ABOUTME: Stand-in for the q, gemini and codex CLIs used by the adapter benchmarks
+# ABOUTME: Emits output at a controlled rate, hangs, floods stderr or ignores SIGTERM
+
+"""Fake agent CLI.
+
+Invoked through the ``q``, ``gemini`` and ``codex`` shims next to this file
+(point ``RALPH_QCHAT_COMMAND``, ``RALPH_GEMINI_COMMAND`` or
+``RALPH_CODEX_COMMAND`` at them). Behaviour is set with environment
+variables so it is inherited from the benchmark process:
+
+    FAKE_AGENT_MODE    stream (default), hang, stderr or ignore-term
+    FAKE_AGENT_BYTES   bytes written to stdout (default 65536)
+    FAKE_AGENT_RATE    bytes per second, 0 for as fast as possible (default 0)
+    FAKE_AGENT_CHUNK   bytes per write (default 4096)
+    FAKE_AGENT_DELAY   seconds before the first byte (default 0)
+    FAKE_AGENT_EXIT    exit status (default 0)
+
+``hang`` and ``ignore-term`` write their output and then never exit;
+``ignore-term`` also ignores SIGTERM, so only SIGKILL stops it. ``stderr``
+writes FAKE_AGENT_BYTES to stderr as well as stdout.
+"""
+
+import os
+import signal
+import sys
+import time
+
+LINE = b"fake agent output: the quick brown fox jumps over the lazy dog\n"
+
+
+def env_number(name, default, kind=int):
+    return kind(os.environ.get(name, default))
+
+
+def emit(streams, total, rate, chunk_size):
+    block = LINE * (chunk_size // len(LINE) + 1)
+    start = time.monotonic()
+    sent = 0
+    while sent < total:
+        size = min(chunk_size, total - sent)
+        for stream in streams:
+            stream.write(block[:size])
+            stream.flush()
+        sent += size
+        if rate > 0:
+            # Sleep until the schedule for ``sent`` bytes is reached
+            ahead = sent / rate - (time.monotonic() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def main():
+    program = os.environ.get("FAKE_AGENT_PROGRAM") or os.path.basename(sys.argv[0])
+    if "--version" in sys.argv[1:]:
+        print(f"{program} 0.0.0-fake")
+        return 0
+
+    mode = os.environ.get("FAKE_AGENT_MODE", "stream")
+    if mode == "ignore-term":
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    # q takes the prompt as an argument; codex and gemini read it from stdin
+    if program != "q" and not sys.stdin.isatty():
+        sys.stdin.buffer.read()
+
+    delay = env_number("FAKE_AGENT_DELAY", 0, float)
+    if delay > 0:
+        time.sleep(delay)
+
+    streams = [sys.stdout.buffer]
+    if mode == "stderr":
+        streams.append(sys.stderr.buffer)
+    emit(
+        streams,
+        env_number("FAKE_AGENT_BYTES", 65536),
+        env_number("FAKE_AGENT_RATE", 0, float),
+        max(env_number("FAKE_AGENT_CHUNK", 4096), 1)
+    )
+
+    if mode in ("hang", "ignore-term"):
+        while True:
+            time.sleep(3600)
+    return env_number("FAKE_AGENT_EXIT", 0)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # The adapter stopped reading; exit quietly like a real CLI would
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
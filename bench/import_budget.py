@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# ABOUTME: Import-time regression check for the ralph CLI
+# ABOUTME: Fails when light commands exceed a startup budget or import heavy modules
+
+"""Check that `ralph --help` and `ralph status` start fast.
+
+Runs each command under ``python -X importtime`` and fails if the total
+import time exceeds the budget, or if any module that should only load on
+the run path (orchestrator, adapters, SDKs, web server) was imported.
+
+Usage:
+    python bench/import_budget.py [--budget-ms 150] [--runs 5]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+COMMANDS = [
+    ["--help"],
+    ["status"],
+]
+
+# Modules that light commands must never import
+FORBIDDEN = [
+    "ralph_orchestrator.orchestrator",
+    "ralph_orchestrator.adapters.claude",
+    "ralph_orchestrator.adapters.qchat",
+    "ralph_orchestrator.adapters.gemini",
+    "ralph_orchestrator.adapters.codex",
+    "ralph_orchestrator.logging_config",
+    "ralph_orchestrator.web.server",
+    "claude_code_sdk",
+    "yaml",
+    "fastapi",
+    "passlib",
+]
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(args: List[str], cwd: str) -> Tuple[float, Dict[str, int]]:
+    """Run ``ralph <args>`` with -X importtime.
+
+    Returns:
+        Tuple of (total import time in ms, cumulative microseconds by module)
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "ralph_orchestrator", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ralph {' '.join(args)} failed:\n{result.stderr}")
+
+    modules: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules[name] = cumulative
+        # Top-level imports (one space of indent) already include their children
+        if len(indent) == 1:
+            total_us += cumulative
+    return total_us / 1000, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("RALPH_IMPORT_BUDGET_MS", "150")),
+                        help="Maximum import time per command in milliseconds")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Runs per command; the fastest run is compared to the budget")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for command in COMMANDS:
+            label = "ralph " + " ".join(command)
+            timings = []
+            modules: Dict[str, int] = {}
+            for _ in range(args.runs):
+                total_ms, modules = measure(command, workdir)
+                timings.append(total_ms)
+            best = min(timings)
+
+            heavy = [name for name in FORBIDDEN if name in modules]
+            status = "ok"
+            if best > args.budget_ms or heavy:
+                status = "FAIL"
+                failed = True
+            print(f"{label:20} {best:8.1f} ms (budget {args.budget_ms:.0f} ms)  {status}")
+            for name in heavy:
+                print(f"    imports {name} ({modules[name] / 1000:.1f} ms)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,12 @@
 """
 Ralph Orchestrator Benchmark Suite
 Executes all three benchmark projects and collects comprehensive metrics
+
+Sessions recorded with --record can be replayed offline with --replay,
+which measures orchestrator overhead without calling any agent.
 """
 
+import argparse
 import time
 import json
 import subprocess
@@ -12,12 +16,16 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import shutil
 
 class RalphBenchmarkRunner:
-    def __init__(self):
+    def __init__(self, record_dir: Optional[Path] = None, replay_dir: Optional[Path] = None,
+                 replay_speed: float = 0.0):
         self.results = {}
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.replay_speed = replay_speed
         self.start_time = None
         self.benchmark_dir = Path("ralph_benchmarks")
 
@@ -125,8 +133,18 @@ class RalphBenchmarkRunner:
             "--verbose",
             "--max-iterations", "50",
             "--max-runtime", "1800",  # 30 minutes max
-            "--agent", "claude"
         ]
+        session_file = f"{project['id']}.ralph"
+        if self.replay_dir:
+            ralph_cmd += [
+                "--agent", f"replay:{(self.replay_dir / session_file).resolve()}",
+                "--replay-speed", str(self.replay_speed)
+            ]
+        else:
+            ralph_cmd += ["--agent", "claude"]
+        if self.record_dir:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+            ralph_cmd += ["--record", str((self.record_dir / session_file).resolve())]
 
         print(f"   Command: {' '.join(ralph_cmd)}")
 
@@ -189,6 +207,7 @@ class RalphBenchmarkRunner:
             result = {
                 "project_id": project['id'],
                 "project_name": project['name'],
+                "mode": "replay" if self.replay_dir else "live",
                 "success": process.returncode == 0,
                 "execution_time_seconds": round(execution_time, 2),
                 "execution_time_minutes": round(execution_time / 60, 2),
@@ -335,7 +354,16 @@ class RalphBenchmarkRunner:
 
 def main():
     """Main execution function"""
-    runner = RalphBenchmarkRunner()
+    parser = argparse.ArgumentParser(description="Run the Ralph benchmark projects")
+    parser.add_argument("--record", type=Path, metavar="DIR",
+                        help="Record each project's agent session into DIR")
+    parser.add_argument("--replay", type=Path, metavar="DIR",
+                        help="Replay sessions recorded into DIR instead of calling the agent")
+    parser.add_argument("--replay-speed", type=float, default=0.0,
+                        help="Replay speed relative to the recording, 0 for no delays (default: 0)")
+    args = parser.parse_args()
+
+    runner = RalphBenchmarkRunner(args.record, args.replay, args.replay_speed)
     results = runner.run_all_benchmarks()
     return results
 
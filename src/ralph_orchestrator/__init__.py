@@ -5,7 +5,26 @@
 
 __version__ = "0.1.0"
 
-from .orchestrator import RalphOrchestrator
-from .metrics import Metrics, CostTracker
+__all__ = ["RalphOrchestrator", "Metrics", "CostTracker"]
 
-__all__ = ["RalphOrchestrator", "Metrics", "CostTracker"]
\ No newline at end of file
+# Public names are imported on first access so that light commands such as
+# `ralph status` do not pay for the orchestrator and adapter import graph
+_LAZY_IMPORTS = {
+    "RalphOrchestrator": ".orchestrator",
+    "Metrics": ".metrics",
+    "CostTracker": ".metrics",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -14,14 +14,16 @@ import logging
 import subprocess
 from typing import List
 
-# Import the proper orchestrator with adapter support
-from .orchestrator import RalphOrchestrator
+# The orchestrator is imported on the run path only, keeping status/clean fast
 from .main import (
-    RalphConfig, AgentType,
+    RalphConfig, AgentType, agent_spec, split_agent_spec,
     DEFAULT_MAX_ITERATIONS, DEFAULT_MAX_RUNTIME, DEFAULT_PROMPT_FILE,
     DEFAULT_CHECKPOINT_INTERVAL, DEFAULT_RETRY_DELAY, DEFAULT_MAX_TOKENS,
     DEFAULT_MAX_COST, DEFAULT_CONTEXT_WINDOW, DEFAULT_CONTEXT_THRESHOLD,
-    DEFAULT_METRICS_INTERVAL, DEFAULT_MAX_PROMPT_SIZE
+    DEFAULT_METRICS_INTERVAL, DEFAULT_MAX_PROMPT_SIZE, DEFAULT_WORKERS,
+    DEFAULT_HEDGE_DELAY, DEFAULT_MAX_OUTPUT_SIZE, DEFAULT_REPLAY_SPEED,
+    DEFAULT_ITERATION_DELAY, DEFAULT_ROUTE_POLICY, DEFAULT_TOKEN_ESTIMATOR,
+    DEFAULT_SUMMARIZER, DEFAULT_RETRIEVAL_K, DEFAULT_PROMPT_DELIVERY
 )
 
 
@@ -123,7 +125,7 @@ def show_status():
     if Path(".git").exists():
         print("\nGit checkpoints:")
         result = subprocess.run(
-            ["git", "log", "--oneline", "-5"],
+            ["git", "log", "--oneline", "-5", "refs/ralph/checkpoints", "--"],
             capture_output=True,
             text=True
         )
@@ -402,6 +404,7 @@ Examples:
     ralph -p task.md -i 50          # Custom prompt, max 50 iterations
     ralph -t 3600 --dry-run         # Test mode with 1 hour timeout
     ralph --max-cost 10.00          # Limit spending to $10
+    ralph run --workers 4           # Run 4 agents in parallel git worktrees
     ralph init                      # Set up new project
     ralph status                    # Check current progress
     ralph clean                     # Clean agent workspace
@@ -459,9 +462,9 @@ Examples:
         
         p.add_argument(
             "-a", "--agent",
-            choices=["codex", "claude", "q", "gemini", "auto"],
+            type=agent_spec(["codex", "claude", "q", "gemini", "auto"]),
             default="codex",
-            help="AI agent to use (default: codex)"
+            help="AI agent to use: codex, claude, q, gemini, auto, replay:<session> or mock[:<profile>] (default: codex)"
         )
         
         p.add_argument(
@@ -527,6 +530,44 @@ Examples:
             help=f"Context summarization threshold (default: {DEFAULT_CONTEXT_THRESHOLD})"
         )
         
+        p.add_argument(
+            "--token-estimator",
+            choices=["auto", "tiktoken", "heuristic"],
+            default=DEFAULT_TOKEN_ESTIMATOR,
+            help="How prompt tokens are counted against the context budget: exact BPE with "
+                 f"tiktoken or a heuristic; auto uses tiktoken if installed (default: {DEFAULT_TOKEN_ESTIMATOR})"
+        )
+        
+        p.add_argument(
+            "--summarizer",
+            choices=["extractive", "claude", "gemini", "q", "codex"],
+            default=DEFAULT_SUMMARIZER,
+            help="How older iterations' progress summaries are condensed: local TF-IDF "
+                 f"ranking or a (cheap) agent (default: {DEFAULT_SUMMARIZER})"
+        )
+        
+        p.add_argument(
+            "--retrieval-k",
+            type=int,
+            default=DEFAULT_RETRIEVAL_K,
+            help="Snippets of past iterations most relevant to the current task added "
+                 f"to the prompt; 0 disables the retrieval index (default: {DEFAULT_RETRIEVAL_K})"
+        )
+        
+        p.add_argument(
+            "--prompt-delivery",
+            choices=["full", "delta"],
+            default=DEFAULT_PROMPT_DELIVERY,
+            help="With --claude-session, delta sends each turn only the prompt sections that changed, "
+                 f"resending the full prompt periodically (default: {DEFAULT_PROMPT_DELIVERY})"
+        )
+        
+        p.add_argument(
+            "--claude-session",
+            action="store_true",
+            help="Keep one Claude session across iterations, restarting it at the context threshold"
+        )
+        
         p.add_argument(
             "--checkpoint-interval",
             type=int,
@@ -555,6 +596,13 @@ Examples:
             help=f"Max prompt file size (default: {DEFAULT_MAX_PROMPT_SIZE})"
         )
         
+        p.add_argument(
+            "--max-output-size",
+            type=int,
+            default=DEFAULT_MAX_OUTPUT_SIZE,
+            help=f"Characters of agent output kept in memory per iteration (default: {DEFAULT_MAX_OUTPUT_SIZE})"
+        )
+        
         p.add_argument(
             "--no-git",
             action="store_true",
@@ -585,6 +633,71 @@ Examples:
             help="Strict mode: never fallback to other agents when specified agent fails"
         )
         
+        p.add_argument(
+            "-w", "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f"Parallel worktree workers (default: {DEFAULT_WORKERS})"
+        )
+        
+        p.add_argument(
+            "--hedge",
+            action="store_true",
+            help="Race a backup agent against a slow primary instead of sequential fallback"
+        )
+        
+        p.add_argument(
+            "--hedge-delay",
+            type=float,
+            default=DEFAULT_HEDGE_DELAY,
+            help=f"Initial hedge delay in seconds before latency history exists (default: {DEFAULT_HEDGE_DELAY})"
+        )
+        
+        p.add_argument(
+            "--record",
+            metavar="SESSION",
+            help="Record agent responses, timings and workspace diffs to a session file"
+        )
+        
+        p.add_argument(
+            "--replay-speed",
+            type=float,
+            default=DEFAULT_REPLAY_SPEED,
+            help=f"Speed of --agent replay:<session> relative to the recording, 0 for no delays (default: {DEFAULT_REPLAY_SPEED})"
+        )
+        
+        p.add_argument(
+            "--iteration-delay",
+            type=float,
+            default=DEFAULT_ITERATION_DELAY,
+            help=f"Seconds to pause between iterations, 0 for load tests (default: {DEFAULT_ITERATION_DELAY})"
+        )
+        
+        p.add_argument(
+            "--route",
+            action="store_true",
+            help="Route each iteration to the available agent with the best observed throughput"
+        )
+        
+        p.add_argument(
+            "--route-policy",
+            choices=["ucb", "thompson"],
+            default=DEFAULT_ROUTE_POLICY,
+            help=f"Bandit policy used by --route (default: {DEFAULT_ROUTE_POLICY})"
+        )
+        
+        p.add_argument(
+            "--route-max-cost",
+            type=float,
+            help="Avoid agents costing more than this (USD) per successful iteration"
+        )
+        
+        p.add_argument(
+            "--rate-limit-store",
+            metavar="DB",
+            help="SQLite file that shares the adapters' rate limits with Ralph runs in other processes"
+        )
+        
         # Collect remaining arguments for agent
         p.add_argument(
             "agent_args",
@@ -633,8 +746,13 @@ Examples:
         "qchat": AgentType.Q,
         "gemini": AgentType.GEMINI,
         "g": AgentType.GEMINI,
+        "replay": AgentType.REPLAY,
+        "mock": AgentType.MOCK,
         "auto": AgentType.AUTO
     }
+    agent_name, agent_argument = split_agent_spec(args.agent)
+    replay_session = agent_argument if agent_name == "replay" else None
+    mock_profile = agent_argument if agent_name == "mock" else None
     
     # Create config - load from YAML if provided, otherwise use CLI args
     if args.config:
@@ -642,18 +760,54 @@ Examples:
             config = RalphConfig.from_yaml(args.config)
             # Override with any CLI arguments that were explicitly provided
             if hasattr(args, 'agent') and args.agent != 'auto':
-                config.agent = agent_map[args.agent]
+                config.agent = agent_map[agent_name]
+                if replay_session:
+                    config.replay_session = replay_session
+                if mock_profile:
+                    config.mock_profile = mock_profile
             if hasattr(args, 'verbose') and args.verbose:
                 config.verbose = args.verbose
             if hasattr(args, 'dry_run') and args.dry_run:
                 config.dry_run = args.dry_run
+            if getattr(args, 'max_output_size', DEFAULT_MAX_OUTPUT_SIZE) != DEFAULT_MAX_OUTPUT_SIZE:
+                config.max_output_size = args.max_output_size
+            if hasattr(args, 'workers') and args.workers != DEFAULT_WORKERS:
+                config.workers = args.workers
+            if hasattr(args, 'hedge') and args.hedge:
+                config.hedge = args.hedge
+            if getattr(args, 'hedge_delay', DEFAULT_HEDGE_DELAY) != DEFAULT_HEDGE_DELAY:
+                config.hedge_delay = args.hedge_delay
+            if hasattr(args, 'claude_session') and args.claude_session:
+                config.claude_session = args.claude_session
+            if getattr(args, 'record', None):
+                config.record_session = args.record
+            if getattr(args, 'replay_speed', DEFAULT_REPLAY_SPEED) != DEFAULT_REPLAY_SPEED:
+                config.replay_speed = args.replay_speed
+            if getattr(args, 'iteration_delay', DEFAULT_ITERATION_DELAY) != DEFAULT_ITERATION_DELAY:
+                config.iteration_delay = args.iteration_delay
+            if getattr(args, 'route', False):
+                config.route = args.route
+            if getattr(args, 'route_policy', DEFAULT_ROUTE_POLICY) != DEFAULT_ROUTE_POLICY:
+                config.route_policy = args.route_policy
+            if getattr(args, 'route_max_cost', None) is not None:
+                config.route_max_cost = args.route_max_cost
+            if getattr(args, 'rate_limit_store', None):
+                config.rate_limit_store = args.rate_limit_store
+            if getattr(args, 'token_estimator', DEFAULT_TOKEN_ESTIMATOR) != DEFAULT_TOKEN_ESTIMATOR:
+                config.token_estimator = args.token_estimator
+            if getattr(args, 'summarizer', DEFAULT_SUMMARIZER) != DEFAULT_SUMMARIZER:
+                config.summarizer = args.summarizer
+            if getattr(args, 'retrieval_k', DEFAULT_RETRIEVAL_K) != DEFAULT_RETRIEVAL_K:
+                config.retrieval_k = args.retrieval_k
+            if getattr(args, 'prompt_delivery', DEFAULT_PROMPT_DELIVERY) != DEFAULT_PROMPT_DELIVERY:
+                config.prompt_delivery = args.prompt_delivery
         except Exception as e:
             print(f"Error loading config file: {e}")
             sys.exit(1)
     else:
         # Create config from CLI arguments
         config = RalphConfig(
-            agent=agent_map[args.agent],
+            agent=agent_map[agent_name],
             prompt_file=args.prompt,
             max_iterations=args.max_iterations,
             max_runtime=args.max_runtime,
@@ -670,8 +824,26 @@ Examples:
             metrics_interval=args.metrics_interval,
             enable_metrics=not args.no_metrics,
             max_prompt_size=args.max_prompt_size,
+            max_output_size=args.max_output_size,
             allow_unsafe_paths=args.allow_unsafe_paths,
             strict_mode=args.strict,
+            workers=args.workers,
+            hedge=args.hedge,
+            hedge_delay=args.hedge_delay,
+            claude_session=args.claude_session,
+            replay_session=replay_session,
+            replay_speed=args.replay_speed,
+            record_session=args.record,
+            mock_profile=mock_profile,
+            iteration_delay=args.iteration_delay,
+            route=args.route,
+            route_policy=args.route_policy,
+            route_max_cost=args.route_max_cost,
+            rate_limit_store=args.rate_limit_store,
+            token_estimator=args.token_estimator,
+            summarizer=args.summarizer,
+            retrieval_k=args.retrieval_k,
+            prompt_delivery=args.prompt_delivery,
             agent_args=getattr(args, 'agent_args', [])
         )
     
@@ -683,6 +855,7 @@ Examples:
         print(f"  Max iterations: {config.max_iterations}")
         print(f"  Max runtime: {config.max_runtime}s")
         print(f"  Max cost: ${config.max_cost:.2f}")
+        print(f"  Workers: {config.workers}")
         sys.exit(0)
     
     # Validate prompt file exists
@@ -707,6 +880,8 @@ Examples:
         print(f"Agent: {config.agent.value}")
         print(f"Prompt: {config.prompt_file}")
         print(f"Max iterations: {config.max_iterations}")
+        if config.workers > 1:
+            print(f"Workers: {config.workers}")
         print("Press Ctrl+C to stop gracefully")
         print("=" * 50)
         
@@ -721,6 +896,8 @@ Examples:
         }
         primary_tool = tool_name_map.get(agent_name, agent_name)
         
+        from .orchestrator import RalphOrchestrator
+        
         orchestrator = RalphOrchestrator(
             prompt_file_or_config=config.prompt_file,
             primary_tool=primary_tool,
@@ -730,13 +907,33 @@ Examples:
             max_cost=config.max_cost,
             checkpoint_interval=config.checkpoint_interval,
             verbose=config.verbose,
-            strict_mode=config.strict_mode
+            strict_mode=config.strict_mode,
+            workers=config.workers,
+            hedge=config.hedge,
+            hedge_delay=config.hedge_delay,
+            claude_session=config.claude_session,
+            context_window=config.context_window,
+            context_threshold=config.context_threshold,
+            max_output_size=config.max_output_size,
+            replay_session=config.replay_session,
+            replay_speed=config.replay_speed,
+            record_session=config.record_session,
+            mock_profile=config.mock_profile,
+            iteration_delay=config.iteration_delay,
+            route=config.route,
+            route_policy=config.route_policy,
+            route_max_cost=config.route_max_cost,
+            rate_limits=config.adapters,
+            rate_limit_store=config.rate_limit_store,
+            token_estimator=config.token_estimator,
+            summarizer=config.summarizer,
+            retrieval_k=config.retrieval_k,
+            prompt_delivery=config.prompt_delivery
         )
         
         # Enable all tools for Claude adapter (including WebSearch)
         if primary_tool == 'claude' and 'claude' in orchestrator.adapters:
-            claude_adapter = orchestrator.adapters['claude']
-            claude_adapter.configure(enable_all_tools=True, enable_web_search=True)
+            orchestrator.configure_adapter('claude', enable_all_tools=True, enable_web_search=True)
             if config.verbose:
                 print("✓ Claude configured with all native tools including WebSearch")
         
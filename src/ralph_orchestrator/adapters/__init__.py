@@ -3,15 +3,39 @@
 
 """Tool adapters for Ralph Orchestrator."""
 
-from .base import ToolAdapter, ToolResponse
-from .claude import ClaudeAdapter
-from .qchat import QChatAdapter
-from .gemini import GeminiAdapter
-
 __all__ = [
     "ToolAdapter",
     "ToolResponse",
     "ClaudeAdapter", 
     "QChatAdapter",
     "GeminiAdapter",
-]
\ No newline at end of file
+    "MockAdapter",
+    "RecordingAdapter",
+    "ReplayAdapter",
+]
+
+# Adapters are imported on first access; each one pulls in its own tooling
+_LAZY_IMPORTS = {
+    "ToolAdapter": ".base",
+    "ToolResponse": ".base",
+    "ClaudeAdapter": ".claude",
+    "QChatAdapter": ".qchat",
+    "GeminiAdapter": ".gemini",
+    "MockAdapter": ".mock",
+    "RecordingAdapter": ".replay",
+    "ReplayAdapter": ".replay",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -0,0 +1,225 @@
+# ABOUTME: Concurrent, cached availability probing for tool adapters
+# ABOUTME: Provides a lazy adapter registry that only builds adapters when first used
+
+"""Adapter availability probing for Ralph Orchestrator."""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Mapping, Optional, Sequence
+
+from .base import ToolAdapter
+
+logger = logging.getLogger('ralph-orchestrator.adapters.availability')
+
+DEFAULT_CACHE_FILE = Path(".agent") / "cache" / "adapters.json"
+DEFAULT_TTL = 3600.0
+
+
+@dataclass
+class Probe:
+    """How to tell whether an adapter's tool is installed."""
+    command: Optional[str] = None  # Executable looked up on PATH
+    args: Optional[Sequence[str]] = None  # Arguments for a test run; None only checks PATH
+    module: Optional[str] = None  # Python module that must be importable
+    timeout: float = 5.0
+
+
+def default_probes() -> Dict[str, Probe]:
+    """Probes for the built-in adapters, in fallback order."""
+    return {
+        'codex': Probe(command=os.getenv("RALPH_CODEX_COMMAND", "codex"), args=["--version"], timeout=10.0),
+        'claude': Probe(module="claude_code_sdk"),
+        'qchat': Probe(command=os.getenv("RALPH_QCHAT_COMMAND", "q")),
+        'gemini': Probe(command=os.getenv("RALPH_GEMINI_COMMAND", "gemini"), args=["--version"]),
+    }
+
+
+class AvailabilityCache:
+    """Probe results keyed on binary path and mtime, expiring after a TTL."""
+
+    def __init__(self, cache_file: Path = DEFAULT_CACHE_FILE, ttl: float = DEFAULT_TTL):
+        """Initialize the cache.
+
+        Args:
+            cache_file: JSON file the results are stored in
+            ttl: Seconds a result stays valid
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.entries: Dict[str, Dict[str, object]] = {}
+        try:
+            self.entries = json.loads(cache_file.read_text())
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name: str, path: str, mtime: float) -> Optional[bool]:
+        """Return the cached result for ``name`` if it is still valid."""
+        entry = self.entries.get(name)
+        if not entry or entry.get('path') != path or entry.get('mtime') != mtime:
+            return None
+        if time.time() - entry.get('checked_at', 0) > self.ttl:
+            return None
+        return bool(entry.get('available'))
+
+    def put(self, name: str, path: str, mtime: float, available: bool) -> None:
+        self.entries[name] = {
+            'path': path,
+            'mtime': mtime,
+            'available': available,
+            'checked_at': time.time()
+        }
+
+    def save(self) -> None:
+        """Write the cache atomically."""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(self.entries, indent=2))
+            tmp_file.replace(self.cache_file)
+        except OSError as e:
+            logger.debug(f"Could not write adapter cache: {e}")
+
+
+async def _run_probe(name: str, probe: Probe, cache: AvailabilityCache) -> bool:
+    """Check one adapter, consulting the cache before running anything."""
+    if probe.module:
+        return importlib.util.find_spec(probe.module) is not None
+
+    path = shutil.which(probe.command)
+    if not path:
+        return False
+    if probe.args is None:
+        return True
+
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return False
+    cached = cache.get(name, path, mtime)
+    if cached is not None:
+        return cached
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            path, *probe.args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError as e:
+        logger.debug(f"{name} probe failed: {e}")
+        return False
+    try:
+        available = await asyncio.wait_for(process.wait(), probe.timeout) == 0
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.debug(f"{name} probe timed out after {probe.timeout}s")
+        available = False
+
+    cache.put(name, path, mtime, available)
+    return available
+
+
+async def aprobe_adapters(
+    probes: Optional[Dict[str, Probe]] = None,
+    cache_file: Path = DEFAULT_CACHE_FILE,
+    ttl: float = DEFAULT_TTL
+) -> Dict[str, bool]:
+    """Check which adapters are available, running probes concurrently.
+
+    Args:
+        probes: Probes by adapter name (default: the built-in adapters)
+        cache_file: Where probe results are cached
+        ttl: Seconds a cached result stays valid
+
+    Returns:
+        Availability by adapter name, in the order of ``probes``
+    """
+    probes = probes if probes is not None else default_probes()
+    cache = AvailabilityCache(cache_file, ttl)
+    results = await asyncio.gather(
+        *(_run_probe(name, probe, cache) for name, probe in probes.items()),
+        return_exceptions=True
+    )
+    cache.save()
+
+    availability = {}
+    for name, result in zip(probes, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"{name} availability check failed: {result}")
+            result = False
+        availability[name] = result
+    return availability
+
+
+def probe_adapters(
+    probes: Optional[Dict[str, Probe]] = None,
+    cache_file: Path = DEFAULT_CACHE_FILE,
+    ttl: float = DEFAULT_TTL
+) -> Dict[str, bool]:
+    """Synchronous wrapper around :func:`aprobe_adapters`."""
+    coro = aprobe_adapters(probes, cache_file, ttl)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Called from inside an event loop; probe on a separate thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class AdapterRegistry(Mapping[str, ToolAdapter]):
+    """Mapping of available adapters that constructs each one on first use."""
+
+    def __init__(self, availability: Dict[str, bool], factory: Callable[..., ToolAdapter]):
+        """Initialize the registry.
+
+        Args:
+            availability: Availability by adapter name
+            factory: Called as ``factory(name, available=True)`` to build an adapter
+        """
+        self.availability = availability
+        self.factory = factory
+        self._adapters: Dict[str, ToolAdapter] = {}
+        # Adapters can be first used from executor threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> ToolAdapter:
+        if not self.availability.get(name):
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._adapters:
+                try:
+                    self._adapters[name] = self.factory(name, available=True)
+                except Exception as e:
+                    logger.warning(f"{name} adapter error: {e}")
+                    self.availability[name] = False
+                    raise KeyError(name) from e
+            return self._adapters[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, available in self.availability.items() if available)
+
+    def __len__(self) -> int:
+        return sum(1 for available in self.availability.values() if available)
+
+    def __contains__(self, name: object) -> bool:
+        return bool(self.availability.get(name))
+
+    def loaded(self, name: str) -> Optional[ToolAdapter]:
+        """Return the adapter if it has already been constructed."""
+        return self._adapters.get(name)
+
+    def instances(self) -> Iterator[ToolAdapter]:
+        """Iterate over the adapters constructed so far."""
+        return iter(list(self._adapters.values()))
@@ -4,10 +4,27 @@
 """Base adapter interface for AI tools."""
 
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, AsyncIterator, Callable, Deque, List
 from pathlib import Path
 import asyncio
+import logging
+
+from .transcript import DEFAULT_SPILL_THRESHOLD, TranscriptView, TranscriptWriter, transcript_name
+
+logger = logging.getLogger(__name__)
+
+# Default cap on output kept in memory per execution (characters)
+DEFAULT_MAX_OUTPUT_SIZE = 10 * 1024 * 1024
+
+# Stream event kinds
+EVENT_TEXT = "text"  # Agent output
+EVENT_ERROR = "error"  # Diagnostic output (stderr)
+EVENT_TOOL_USE = "tool_use"  # The agent invoked a tool
+EVENT_TOOL_RESULT = "tool_result"  # A tool returned to the agent
+EVENT_USAGE = "usage"  # Token usage and cost
+EVENT_RESULT = "result"  # Final event, carries the ToolResponse
 
 
 @dataclass
@@ -20,22 +37,118 @@ class ToolResponse:
     tokens_used: Optional[int] = None
     cost: Optional[float] = None
     metadata: Dict[str, Any] = None
+    transcript: Optional[Path] = None  # Full output, when it was too large to keep in memory
     
     def __post_init__(self):
         if self.metadata is None:
             self.metadata = {}
+    
+    @property
+    def view(self) -> TranscriptView:
+        """Lazy view of the full output, with head/tail/search helpers.
+        
+        ``output`` only holds the head and tail of a spilled transcript;
+        use this to inspect all of it.
+        """
+        return TranscriptView(self.transcript, self.output)
+
+
+@dataclass
+class StreamEvent:
+    """A piece of adapter output, delivered while the tool is running."""
+    
+    kind: str
+    text: str = ""
+    data: Dict[str, Any] = None
+    response: Optional[ToolResponse] = None  # Only set on EVENT_RESULT
+    
+    def __post_init__(self):
+        if self.data is None:
+            self.data = {}
+
+
+class OutputBuffer:
+    """Accumulates streamed text up to a size cap.
+    
+    Past the cap, the first half is kept and the rest is a rolling tail,
+    so both the start of the output and the final result survive.
+    """
+    
+    def __init__(self, limit: Optional[int] = DEFAULT_MAX_OUTPUT_SIZE):
+        """Initialize the buffer.
+        
+        Args:
+            limit: Maximum characters kept in memory (None for no cap)
+        """
+        self.limit = limit
+        self.total = 0
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+    
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        self.total += len(text)
+        if self.limit is None:
+            self._head.append(text)
+            self._head_size += len(text)
+            return
+        
+        room = self.limit // 2 - self._head_size
+        if room > 0:
+            self._head.append(text[:room])
+            self._head_size += min(room, len(text))
+            text = text[room:]
+            if not text:
+                return
+        
+        self._tail.append(text)
+        self._tail_size += len(text)
+        tail_limit = self.limit - self.limit // 2
+        while self._tail_size > tail_limit:
+            excess = self._tail_size - tail_limit
+            first = self._tail[0]
+            if len(first) <= excess:
+                self._tail.popleft()
+                self._tail_size -= len(first)
+            else:
+                self._tail[0] = first[excess:]
+                self._tail_size -= excess
+    
+    @property
+    def truncated(self) -> int:
+        """Number of characters dropped from the middle."""
+        return self.total - self._head_size - self._tail_size
+    
+    def getvalue(self) -> str:
+        head = ''.join(self._head)
+        tail = ''.join(self._tail)
+        if self.truncated:
+            return f"{head}\n[... {self.truncated} characters truncated ...]\n{tail}"
+        return head + tail
 
 
 class ToolAdapter(ABC):
     """Abstract base class for tool adapters."""
     
-    def __init__(self, name: str, config=None):
+    def __init__(self, name: str, config=None, available: Optional[bool] = None):
         self.name = name
         self.config = config or type('Config', (), {
             'enabled': True, 'timeout': 300, 'max_retries': 3, 
             'args': [], 'env': {}
         })()
-        self.available = self.check_availability()
+        # Skip the probe when availability was already determined
+        self.available = self.check_availability() if available is None else available
+        self.max_output_size: Optional[int] = DEFAULT_MAX_OUTPUT_SIZE
+        # Output past spill_threshold is written to a transcript in this directory
+        self.transcript_dir: Optional[Path] = None
+        self.spill_threshold = DEFAULT_SPILL_THRESHOLD
+        # Calls wait for a slot from this provider limiter (see ralph_orchestrator.ratelimit)
+        self.rate_limiter = None
+        self.rate_limit_owner = str(id(self))
+        self._subscribers: List[Callable[[str, StreamEvent], None]] = []
     
     @abstractmethod
     def check_availability(self) -> bool:
@@ -47,17 +160,121 @@ class ToolAdapter(ABC):
         """Execute the tool with the given prompt."""
         pass
     
-    async def aexecute(self, prompt: str, **kwargs) -> ToolResponse:
-        """Async execute the tool with the given prompt.
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        """Execute the tool, yielding output events as they arrive.
         
-        Default implementation runs sync execute in thread pool.
-        Subclasses can override for native async support.
+        The last event is always EVENT_RESULT. Its response carries success,
+        error and metadata; the output itself is delivered as EVENT_TEXT.
+        
+        Default implementation runs sync execute in thread pool and replays
+        its result. Subclasses can override for native streaming.
         """
         loop = asyncio.get_event_loop()
         # Create a function that can be called with no arguments for run_in_executor
         def execute_with_args():
             return self.execute(prompt, **kwargs)
-        return await loop.run_in_executor(None, execute_with_args)
+        response = await loop.run_in_executor(None, execute_with_args)
+        
+        if response.output:
+            yield StreamEvent(EVENT_TEXT, response.output)
+        if response.tokens_used or response.cost:
+            yield StreamEvent(EVENT_USAGE, data={"tokens": response.tokens_used, "cost": response.cost})
+        yield StreamEvent(EVENT_RESULT, response=response)
+    
+    async def aexecute(self, prompt: str, **kwargs) -> ToolResponse:
+        """Async execute the tool with the given prompt.
+        
+        Consumes :meth:`astream`, notifying subscribers of each event.
+        With a ``rate_limiter``, the call first waits for the provider's
+        limits to allow it.
+        """
+        transcript = transcript_name(self.name, kwargs.get('iteration'))
+        if self.rate_limiter is None:
+            return await self.collect(self.astream(prompt, **kwargs), transcript=transcript)
+        
+        async with self.rate_limiter.session(self.rate_limit_owner, tokens=len(prompt) // 4) as lease:
+            response = await self.collect(self.astream(prompt, **kwargs), transcript=transcript)
+            lease.settle(response)
+        return response
+    
+    async def collect(
+        self,
+        events: AsyncIterator[StreamEvent],
+        transcript: Optional[str] = None
+    ) -> ToolResponse:
+        """Consume a stream into a ToolResponse with capped output.
+        
+        With a ``transcript_dir``, output larger than ``spill_threshold`` is
+        appended to a transcript file and only its head and tail stay in
+        memory.
+        
+        Args:
+            events: Events from :meth:`astream`
+            transcript: File name stem for a spilled transcript
+            
+        Returns:
+            The final response, with output taken from the text events
+        """
+        writer = None
+        limit = self.max_output_size
+        if self.transcript_dir is not None:
+            writer = TranscriptWriter(
+                self.transcript_dir,
+                transcript or transcript_name(self.name),
+                self.spill_threshold
+            )
+            limit = self.spill_threshold if limit is None else min(limit, self.spill_threshold)
+        output = OutputBuffer(limit)
+        errors = OutputBuffer(self.max_output_size)
+        tokens = None
+        cost = None
+        response = None
+        
+        try:
+            async for event in events:
+                self._publish(event)
+                if event.kind == EVENT_TEXT:
+                    output.append(event.text)
+                    if writer:
+                        writer.write(event.text)
+                elif event.kind == EVENT_ERROR:
+                    errors.append(event.text)
+                elif event.kind == EVENT_USAGE:
+                    tokens = event.data.get("tokens") or tokens
+                    cost = event.data.get("cost") or cost
+                elif event.kind == EVENT_RESULT:
+                    response = event.response
+        finally:
+            transcript_path = writer.close() if writer else None
+        
+        if response is None:
+            response = ToolResponse(success=False, output="", error="Stream ended without a result")
+        response.output = output.getvalue()
+        response.transcript = transcript_path
+        if not response.success and not response.error:
+            response.error = errors.getvalue() or f"{self.name} failed"
+        if response.tokens_used is None:
+            response.tokens_used = tokens
+        if response.cost is None:
+            response.cost = cost
+        if output.truncated and not response.transcript:
+            response.metadata["output_truncated"] = output.truncated
+        return response
+    
+    def subscribe(self, callback: Callable[[str, StreamEvent], None]) -> None:
+        """Register a callback, called with (adapter name, event) for each event."""
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[str, StreamEvent], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _publish(self, event: StreamEvent) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(self.name, event)
+            except Exception as e:
+                logger.debug(f"Stream subscriber failed: {e}")
     
     def execute_with_file(self, prompt_file: Path, **kwargs) -> ToolResponse:
         """Execute the tool with a prompt file."""
@@ -87,6 +304,30 @@ class ToolAdapter(ABC):
         
         return await self.aexecute(prompt, **kwargs)
     
+    async def aclose(self) -> None:
+        """Release long-lived resources such as persistent sessions.
+        
+        Default implementation does nothing.
+        """
+        pass
+    
+    def interrupt(self) -> None:
+        """Stop the child process of a running call, on a shutdown signal.
+        
+        Called from the orchestrator's signal handler, so it must not block.
+        Default implementation does nothing.
+        """
+        pass
+    
+    @property
+    def session_id(self) -> Optional[int]:
+        """Conversation the next call will continue, or None if it starts afresh.
+        
+        Adapters that keep a session report its id, and "id" and "resumed"
+        under metadata["session"] of each response.
+        """
+        return None
+    
     def estimate_cost(self, prompt: str) -> float:
         """Estimate the cost of executing this prompt."""
         # Default implementation - subclasses can override
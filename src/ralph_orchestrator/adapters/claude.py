@@ -4,25 +4,26 @@
 """Claude SDK adapter for Ralph Orchestrator."""
 
 import asyncio
+import importlib.util
 import logging
-from typing import Optional
-from .base import ToolAdapter, ToolResponse
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from .base import (
+    EVENT_RESULT, EVENT_TEXT, EVENT_TOOL_RESULT, EVENT_TOOL_USE, EVENT_USAGE,
+    StreamEvent, ToolAdapter, ToolResponse
+)
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-try:
-    from claude_code_sdk import ClaudeCodeOptions, query
-    CLAUDE_SDK_AVAILABLE = True
-except ImportError:
-    CLAUDE_SDK_AVAILABLE = False
+# The SDK is only imported when a query runs; finding it is enough here
+CLAUDE_SDK_AVAILABLE = importlib.util.find_spec("claude_code_sdk") is not None
 
 
 class ClaudeAdapter(ToolAdapter):
     """Adapter for Claude using the Python SDK."""
     
-    def __init__(self, verbose: bool = False):
-        super().__init__("claude")
+    def __init__(self, verbose: bool = False, available: Optional[bool] = None):
+        super().__init__("claude", available=available)
         self.sdk_available = CLAUDE_SDK_AVAILABLE
         self._system_prompt = None
         self._allowed_tools = None
@@ -30,6 +31,19 @@ class ClaudeAdapter(ToolAdapter):
         self._enable_all_tools = False
         self._enable_web_search = True  # Enable WebSearch by default
         self.verbose = verbose
+        
+        # Session mode keeps one Claude Code process alive across iterations
+        self.session_mode = False
+        self.context_window = 200000
+        self.context_threshold = 0.8
+        self.sessions_started = 0
+        self._session = None
+        self._session_key = None
+        self._session_loop = None
+        self._session_task = None
+        self._session_stale = False
+        self._session_turns = 0
+        self._session_tokens = 0
     
     def check_availability(self) -> bool:
         """Check if Claude SDK is available and properly configured."""
@@ -61,6 +75,113 @@ class ClaudeAdapter(ToolAdapter):
         if enable_web_search and allowed_tools is not None and 'WebSearch' not in allowed_tools:
             self._allowed_tools = allowed_tools + ['WebSearch']
     
+    def enable_session(self, context_window: int = 200000, context_threshold: float = 0.8):
+        """Reuse one SDK client across calls instead of a one-shot query each time.
+        
+        Each call becomes a new turn in the same conversation. The session is
+        restarted once its context grows past ``context_window * context_threshold``
+        tokens, or when the options (cwd, tools, system prompt) change.
+        
+        Args:
+            context_window: Model context window in tokens
+            context_threshold: Fraction of the window that triggers a restart
+        """
+        self.session_mode = True
+        self.context_window = context_window
+        self.context_threshold = context_threshold
+    
+    @property
+    def session_id(self) -> Optional[int]:
+        """The open session the next call will continue, if any."""
+        if self._session is None or self._session_stale:
+            return None
+        return self.sessions_started
+    
+    async def aclose(self):
+        """Disconnect the persistent session, if one is open."""
+        client, self._session = self._session, None
+        loop, self._session_loop = self._session_loop, None
+        self._session_key = None
+        self._session_task = None
+        self._session_stale = False
+        self._session_turns = 0
+        self._session_tokens = 0
+        if client is None:
+            return
+        if loop is not asyncio.get_running_loop():
+            # The client's transport belongs to a loop that is gone
+            return
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing Claude session: {e}")
+    
+    async def _ensure_session(self, options, key: str) -> Tuple[Optional[Any], bool]:
+        """Return the session client to use for this call.
+        
+        Returns:
+            Tuple of (client, resumed). The client is None when the session is
+            busy with another call, which then falls back to a one-shot query.
+        """
+        from claude_code_sdk import ClaudeSDKClient
+        
+        if self._session is not None:
+            task = self._session_task
+            if task is not None and not task.done() and task is not asyncio.current_task():
+                return None, False
+            
+            reason = None
+            if self._session_loop is not asyncio.get_running_loop():
+                reason = "event loop changed"
+            elif self._session_stale:
+                reason = "previous turn did not finish"
+            elif self._session_key != key:
+                reason = "options changed"
+            if reason:
+                logger.info(f"Restarting Claude session: {reason}")
+                await self.aclose()
+        
+        if self._session is not None:
+            return self._session, True
+        
+        client = ClaudeSDKClient(options=options)
+        await client.connect()
+        self._session = client
+        self._session_key = key
+        self._session_loop = asyncio.get_running_loop()
+        self.sessions_started += 1
+        logger.info(f"Started Claude session {self.sessions_started}")
+        return client, False
+    
+    async def _session_turn(self, client, prompt: str):
+        """Send ``prompt`` as a new turn and yield messages until its result."""
+        self._session_task = asyncio.current_task()
+        # Stays set if the turn fails or is cancelled part way through
+        self._session_stale = True
+        await client.query(prompt)
+        async for message in client.receive_response():
+            yield message
+        self._session_stale = False
+    
+    def _end_session_turn(self, context_tokens: int, tokens_used: int) -> bool:
+        """Record a finished turn.
+        
+        Returns:
+            True if the session has crossed the context threshold
+        """
+        self._session_task = None
+        self._session_turns += 1
+        # Usage of the latest turn covers the whole conversation so far
+        self._session_tokens = context_tokens or self._session_tokens + tokens_used
+        limit = int(self.context_window * self.context_threshold)
+        if self._session_tokens < limit:
+            return False
+        logger.info(
+            f"Claude session reached {self._session_tokens}/{self.context_window} "
+            f"context tokens after {self._session_turns} turns, restarting"
+        )
+        return True
+    
     def execute(self, prompt: str, **kwargs) -> ToolResponse:
         """Execute Claude with the given prompt synchronously.
         
@@ -87,17 +208,20 @@ class ClaudeAdapter(ToolAdapter):
                 error=str(e)
             )
     
-    async def aexecute(self, prompt: str, **kwargs) -> ToolResponse:
-        """Execute Claude with the given prompt asynchronously."""
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        """Execute Claude, yielding output events as the SDK delivers them."""
         if not self.available:
             logger.warning("Claude SDK not available")
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error="Claude SDK is not available"
-            )
+            ))
+            return
         
         try:
+            from claude_code_sdk import ClaudeCodeOptions, query
+            
             # Get configuration from kwargs or use defaults
             prompt_file = kwargs.get('prompt_file', 'PROMPT.md')
             
@@ -108,17 +232,11 @@ class ClaudeAdapter(ToolAdapter):
             system_prompt = kwargs.get('system_prompt', self._system_prompt)
             if not system_prompt:
                 # Create a default system prompt with orchestration context
-                enhanced_prompt = self._enhance_prompt_with_instructions(prompt)
                 system_prompt = (
                     f"You are helping complete a task. "
                     f"The task is described in the file '{prompt_file}'. "
                     f"Please edit this file directly to add your solution and progress updates."
                 )
-                # Use the enhanced prompt as the main prompt
-                prompt = enhanced_prompt
-            else:
-                # If custom system prompt provided, still enhance the main prompt
-                prompt = self._enhance_prompt_with_instructions(prompt)
             options_dict['system_prompt'] = system_prompt
             
             # Set tool restrictions if provided
@@ -161,6 +279,17 @@ class ClaudeAdapter(ToolAdapter):
             # Create options
             options = ClaudeCodeOptions(**options_dict)
             
+            # In session mode, continue the open conversation when possible
+            client = None
+            resumed = False
+            if self.session_mode:
+                client, resumed = await self._ensure_session(options, repr(sorted(options_dict.items())))
+            
+            # The orchestration instructions only need to be sent once per conversation.
+            # A prompt delta is only meaningful to the conversation it was made for.
+            if not resumed:
+                prompt = self._enhance_prompt_with_instructions(kwargs.get('full_prompt') or prompt)
+            
             # Log request details if verbose
             if self.verbose:
                 logger.info("Claude SDK Request:")
@@ -171,9 +300,11 @@ class ClaudeAdapter(ToolAdapter):
                 if disallowed_tools:
                     logger.info(f"  Disallowed tools: {disallowed_tools}")
             
-            # Collect all response chunks
-            output_chunks = []
+            # Output is streamed to the caller; only its size is tracked here
+            output_length = 0
             tokens_used = 0
+            context_tokens = 0
+            usage_report = None
             chunk_count = 0
             
             # Use one-shot query for simpler execution
@@ -183,7 +314,12 @@ class ClaudeAdapter(ToolAdapter):
                 print("CLAUDE PROCESSING:")
                 print("="*50)
             
-            async for message in query(prompt=prompt, options=options):
+            if client is not None:
+                messages = self._session_turn(client, prompt)
+            else:
+                messages = query(prompt=prompt, options=options)
+            
+            async for message in messages:
                 chunk_count += 1
                 msg_type = type(message).__name__
                 
@@ -201,7 +337,8 @@ class ClaudeAdapter(ToolAdapter):
                             if hasattr(content_block, 'text'):
                                 # TextBlock
                                 text = content_block.text
-                                output_chunks.append(text)
+                                output_length += len(text)
+                                yield StreamEvent(EVENT_TEXT, text)
                                 
                                 # Stream output to console in real-time when verbose
                                 if self.verbose and text:
@@ -209,7 +346,12 @@ class ClaudeAdapter(ToolAdapter):
                                     logger.debug(f"Received assistant text: {len(text)} characters")
                             
                             elif block_type == 'ToolUseBlock':
-                                # Tool use block - log but don't include in output
+                                # Tool use block - reported as an event, not included in output
+                                yield StreamEvent(EVENT_TOOL_USE, data={
+                                    'name': getattr(content_block, 'name', 'unknown'),
+                                    'id': getattr(content_block, 'id', None),
+                                    'input': getattr(content_block, 'input', {}),
+                                })
                                 if self.verbose:
                                     tool_name = getattr(content_block, 'name', 'unknown')
                                     tool_id = getattr(content_block, 'id', 'unknown')
@@ -252,6 +394,18 @@ class ClaudeAdapter(ToolAdapter):
                         usage = message.usage
                         if isinstance(usage, dict):
                             tokens_used = usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+                            context_tokens = (
+                                tokens_used
+                                + usage.get('cache_read_input_tokens', 0)
+                                + usage.get('cache_creation_input_tokens', 0)
+                            )
+                            # Kept so the orchestrator can measure prompt-cache hits
+                            usage_report = {
+                                key: usage.get(key, 0) for key in (
+                                    'input_tokens', 'output_tokens',
+                                    'cache_read_input_tokens', 'cache_creation_input_tokens'
+                                )
+                            }
                         else:
                             tokens_used = getattr(usage, 'total_tokens', 0)
                         if self.verbose:
@@ -264,6 +418,9 @@ class ClaudeAdapter(ToolAdapter):
                 
                 elif msg_type == 'UserMessage':
                     # User message (tool results being sent back)
+                    for event in self._tool_result_events(getattr(message, 'content', None)):
+                        yield event
+                    
                     if self.verbose:
                         logger.debug("User message (tool result) received")
                         
@@ -306,6 +463,16 @@ class ClaudeAdapter(ToolAdapter):
                 
                 elif msg_type == 'ToolResultMessage':
                     # Tool result message
+                    content = getattr(message, 'content', None)
+                    yield StreamEvent(
+                        EVENT_TOOL_RESULT,
+                        content if isinstance(content, str) else "",
+                        data={
+                            'tool_use_id': getattr(message, 'tool_use_id', None),
+                            'is_error': bool(getattr(message, 'is_error', False)),
+                        }
+                    )
+                    
                     if self.verbose:
                         logger.debug("Tool result message received")
                         
@@ -337,14 +504,16 @@ class ClaudeAdapter(ToolAdapter):
                 elif hasattr(message, 'text'):
                     # Generic text message
                     chunk_text = message.text
-                    output_chunks.append(chunk_text)
+                    output_length += len(chunk_text)
+                    yield StreamEvent(EVENT_TEXT, chunk_text)
                     if self.verbose:
                         print(chunk_text, end='', flush=True)
                         logger.debug(f"Received text chunk {chunk_count}: {len(chunk_text)} characters")
                 
                 elif isinstance(message, str):
                     # Plain string message
-                    output_chunks.append(message)
+                    output_length += len(message)
+                    yield StreamEvent(EVENT_TEXT, message)
                     if self.verbose:
                         print(message, end='', flush=True)
                         logger.debug(f"Received string chunk {chunk_count}: {len(message)} characters")
@@ -353,17 +522,24 @@ class ClaudeAdapter(ToolAdapter):
                     if self.verbose:
                         logger.debug(f"Unknown message type {msg_type}: {message}")
             
-            # Combine output
-            output = ''.join(output_chunks)
+            metadata = {"model": kwargs.get("model", "claude-3-sonnet")}
+            if usage_report:
+                metadata["usage"] = usage_report
+            if client is not None:
+                metadata["session"] = {
+                    "id": self.sessions_started,
+                    "turn": self._session_turns + 1,
+                    "resumed": resumed,
+                }
+                if self._end_session_turn(context_tokens, tokens_used):
+                    await self.aclose()
             
             # End streaming section if verbose
             if self.verbose:
                 print("\n" + "="*50 + "\n")
             
-            # Always log the output we're about to return
-            logger.info(f"Claude adapter returning {len(output)} characters of output")
-            if output:
-                logger.debug(f"Output preview: {output[:200]}...")
+            # Always log the size of the output we streamed
+            logger.info(f"Claude adapter returning {output_length} characters of output")
             
             # Calculate cost if we have token count
             cost = self._calculate_cost(tokens_used) if tokens_used > 0 else None
@@ -371,36 +547,56 @@ class ClaudeAdapter(ToolAdapter):
             # Log response details if verbose
             if self.verbose:
                 logger.info("Claude SDK Response:")
-                logger.info(f"  Output length: {len(output)} characters")
+                logger.info(f"  Output length: {output_length} characters")
                 logger.info(f"  Chunks received: {chunk_count}")
                 if tokens_used > 0:
                     logger.info(f"  Tokens used: {tokens_used}")
                     if cost:
                         logger.info(f"  Estimated cost: ${cost:.4f}")
-                logger.debug(f"Response preview: {output[:500]}..." if len(output) > 500 else f"Response: {output}")
             
-            return ToolResponse(
+            if tokens_used > 0:
+                yield StreamEvent(EVENT_USAGE, data={'tokens': tokens_used, 'cost': cost})
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=True,
-                output=output,
+                output="",
                 tokens_used=tokens_used if tokens_used > 0 else None,
                 cost=cost,
-                metadata={"model": kwargs.get("model", "claude-3-sonnet")}
-            )
+                metadata=metadata
+            ))
             
         except asyncio.TimeoutError:
             logger.error("Claude SDK request timed out")
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error="Claude SDK request timed out"
-            )
+            ))
         except Exception as e:
             logger.error(f"Claude SDK error: {str(e)}", exc_info=True)
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error=str(e)
-            )
+            ))
+    
+    def _tool_result_events(self, content) -> List[StreamEvent]:
+        """Turn the ToolResultBlocks of a UserMessage into events."""
+        if not isinstance(content, list):
+            return []
+        events = []
+        for item in content:
+            if type(item).__name__ != 'ToolResultBlock':
+                continue
+            result_content = getattr(item, 'content', None)
+            events.append(StreamEvent(
+                EVENT_TOOL_RESULT,
+                result_content if isinstance(result_content, str) else "",
+                data={
+                    'tool_use_id': getattr(item, 'tool_use_id', None),
+                    'is_error': bool(getattr(item, 'is_error', False)),
+                }
+            ))
+        return events
     
     def _calculate_cost(self, tokens: Optional[int]) -> Optional[float]:
         """Calculate estimated cost based on tokens."""
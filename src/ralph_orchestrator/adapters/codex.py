@@ -3,13 +3,12 @@
 
 """Codex adapter for Ralph Orchestrator."""
 
-import asyncio
 import logging
+import os
 import subprocess
-import tempfile
-from pathlib import Path
-from typing import Optional
-from .base import ToolAdapter, ToolResponse
+from typing import AsyncIterator, List, Optional
+from .base import EVENT_RESULT, StreamEvent, ToolAdapter, ToolResponse
+from .subprocess_io import AsyncSubprocess, run_command
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -18,15 +17,16 @@ logger = logging.getLogger(__name__)
 class CodexAdapter(ToolAdapter):
     """Adapter for Codex CLI tool."""
 
-    def __init__(self, verbose: bool = False):
-        super().__init__("codex")
+    def __init__(self, verbose: bool = False, available: Optional[bool] = None):
+        self.command = os.getenv("RALPH_CODEX_COMMAND", "codex")
+        super().__init__("codex", available=available)
         self._verbose = verbose
 
     def check_availability(self) -> bool:
         """Check if codex CLI is available."""
         try:
             result = subprocess.run(
-                ["codex", "--version"],
+                [self.command, "--version"],
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -38,75 +38,112 @@ class CodexAdapter(ToolAdapter):
     def execute(self, prompt: str, **kwargs) -> ToolResponse:
         """Execute prompt using codex CLI."""
         try:
-            # Create temporary file for prompt
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-                f.write(prompt)
-                prompt_file = f.name
-
-            try:
-                # Build codex command
-                cmd = ["codex", "exec", "--yolo", "--skip-git-repo-check"]
-
-                if self._verbose:
-                    cmd.extend(["-c", "verbose=true"])
-
-                # Add debug mode for better error reporting
-                cmd.extend(["-c", "debug=true"])
-
-                # Execute codex command with prompt from stdin
-                with open(prompt_file, 'r') as f:
-                    result = subprocess.run(
-                        cmd,
-                        stdin=f,
-                        capture_output=True,
-                        text=True,
-                        timeout=3600  # 1 hour timeout
-                    )
-
-                success = result.returncode == 0
-                output = result.stdout if success else result.stderr
-
-                if self._verbose:
-                    logger.info(f"Codex execution {'succeeded' if success else 'failed'}")
-                    if not success:
-                        logger.error(f"Codex error: {result.stderr}")
+            cmd = self._build_command()
+
+            # Execute codex command with the prompt piped to stdin
+            result = run_command(
+                cmd,
+                input=prompt,
+                timeout=kwargs.get("timeout", 3600),  # 1 hour timeout
+                cwd=kwargs.get("cwd"),
+                max_output_size=self.max_output_size
+            )
 
+            if result.timed_out:
+                error_msg = "Codex execution timed out"
+                logger.error(error_msg)
                 return ToolResponse(
-                    success=success,
-                    output=output,
-                    error=result.stderr if not success else None,
-                    metadata={
-                        "command": " ".join(cmd),
-                        "return_code": result.returncode,
-                        "execution_time": None  # Could add timing if needed
-                    }
+                    success=False,
+                    output=result.stdout,
+                    error=error_msg,
+                    metadata={"timeout": True}
                 )
 
-            finally:
-                # Clean up temporary file
-                Path(prompt_file).unlink(missing_ok=True)
+            success = result.returncode == 0
+            output = result.stdout if success else result.stderr
 
-        except subprocess.TimeoutExpired:
-            error_msg = "Codex execution timed out"
+            if self._verbose:
+                logger.info(f"Codex execution {'succeeded' if success else 'failed'}")
+                if not success:
+                    logger.error(f"Codex error: {result.stderr}")
+
+            return ToolResponse(
+                success=success,
+                output=output,
+                error=result.stderr if not success else None,
+                metadata={
+                    "command": " ".join(cmd),
+                    "return_code": result.returncode,
+                    "execution_time": result.duration
+                }
+            )
+
+        except Exception as e:
+            error_msg = f"Codex execution failed: {str(e)}"
             logger.error(error_msg)
             return ToolResponse(
                 success=False,
                 output="",
                 error=error_msg,
-                metadata={"timeout": True}
+                metadata={"exception": str(e)}
             )
 
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        """Stream codex output on the event loop, piping the prompt to stdin."""
+        cmd = self._build_command()
+        process = AsyncSubprocess(
+            cmd,
+            input=prompt,
+            cwd=kwargs.get("cwd"),
+            timeout=kwargs.get("timeout", 3600)  # 1 hour timeout
+        )
+
+        try:
+            async for event in process.events():
+                yield event
         except Exception as e:
             error_msg = f"Codex execution failed: {str(e)}"
             logger.error(error_msg)
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error=error_msg,
                 metadata={"exception": str(e)}
-            )
+            ))
+            return
 
-    async def execute_async(self, prompt: str, **kwargs) -> ToolResponse:
-        """Async version of execute."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.execute, prompt)
\ No newline at end of file
+        if process.timed_out:
+            error_msg = "Codex execution timed out"
+            logger.error(error_msg)
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                success=False,
+                output="",
+                error=error_msg,
+                metadata={"timeout": True}
+            ))
+            return
+
+        success = process.returncode == 0
+        if self._verbose:
+            logger.info(f"Codex execution {'succeeded' if success else 'failed'}")
+
+        # On failure the error is taken from the streamed stderr
+        yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+            success=success,
+            output="",
+            metadata={
+                "command": " ".join(cmd),
+                "return_code": process.returncode,
+                "execution_time": process.duration
+            }
+        ))
+
+    def _build_command(self) -> List[str]:
+        cmd = [self.command, "exec", "--yolo", "--skip-git-repo-check"]
+
+        if self._verbose:
+            cmd.extend(["-c", "verbose=true"])
+
+        # Add debug mode for better error reporting
+        cmd.extend(["-c", "debug=true"])
+        return cmd
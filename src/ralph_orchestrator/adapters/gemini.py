@@ -5,16 +5,17 @@
 
 import subprocess
 import os
-from typing import Optional
-from .base import ToolAdapter, ToolResponse
+from typing import AsyncIterator, List, Optional
+from .base import EVENT_ERROR, EVENT_RESULT, OutputBuffer, StreamEvent, ToolAdapter, ToolResponse
+from .subprocess_io import AsyncSubprocess, run_command
 
 
 class GeminiAdapter(ToolAdapter):
     """Adapter for Gemini CLI tool."""
     
-    def __init__(self):
-        self.command = "gemini"
-        super().__init__("gemini")
+    def __init__(self, available: Optional[bool] = None):
+        self.command = os.getenv("RALPH_GEMINI_COMMAND", "gemini")
+        super().__init__("gemini", available=available)
     
     def check_availability(self) -> bool:
         """Check if Gemini CLI is available."""
@@ -42,28 +43,22 @@ class GeminiAdapter(ToolAdapter):
             # Enhance prompt with orchestration instructions
             enhanced_prompt = self._enhance_prompt_with_instructions(prompt)
             
-            # Build command
-            cmd = [self.command]
-            
-            # Add model if specified
-            if kwargs.get("model"):
-                cmd.extend(["--model", kwargs["model"]])
-            
-            # Add the enhanced prompt
-            cmd.extend(["-p", enhanced_prompt])
-            
-            # Add output format if specified
-            if kwargs.get("output_format"):
-                cmd.extend(["--output", kwargs["output_format"]])
-            
-            # Execute command
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=kwargs.get("timeout", 300)  # 5 minute default
+            # Execute command with the prompt piped to stdin
+            result = run_command(
+                self._build_command(**kwargs),
+                input=enhanced_prompt,
+                timeout=kwargs.get("timeout", 300),  # 5 minute default
+                cwd=kwargs.get("cwd"),
+                max_output_size=self.max_output_size
             )
             
+            if result.timed_out:
+                return ToolResponse(
+                    success=False,
+                    output=result.stdout,
+                    error="Gemini command timed out"
+                )
+            
             if result.returncode == 0:
                 # Extract token count if available
                 tokens = self._extract_token_count(result.stderr)
@@ -82,18 +77,77 @@ class GeminiAdapter(ToolAdapter):
                     error=result.stderr or "Gemini command failed"
                 )
                 
-        except subprocess.TimeoutExpired:
+        except Exception as e:
             return ToolResponse(
                 success=False,
                 output="",
-                error="Gemini command timed out"
+                error=str(e)
             )
+    
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        """Stream Gemini output on the event loop, piping the prompt to stdin."""
+        if not self.available:
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                success=False,
+                output="",
+                error="Gemini CLI is not available"
+            ))
+            return
+        
+        process = AsyncSubprocess(
+            self._build_command(**kwargs),
+            input=self._enhance_prompt_with_instructions(prompt),
+            cwd=kwargs.get("cwd"),
+            timeout=kwargs.get("timeout", 300)  # 5 minute default
+        )
+        stderr = OutputBuffer(self.max_output_size)
+        
+        try:
+            async for event in process.events():
+                if event.kind == EVENT_ERROR:
+                    stderr.append(event.text)
+                yield event
         except Exception as e:
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error=str(e)
-            )
+            ))
+            return
+        
+        if process.timed_out:
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                success=False,
+                output="",
+                error="Gemini command timed out"
+            ))
+        elif process.returncode == 0:
+            tokens = self._extract_token_count(stderr.getvalue())
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                success=True,
+                output="",
+                tokens_used=tokens,
+                cost=self._calculate_cost(tokens),
+                metadata={"model": kwargs.get("model", "gemini-2.5-pro")}
+            ))
+        else:
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                success=False,
+                output="",
+                error=stderr.getvalue() or "Gemini command failed"
+            ))
+    
+    def _build_command(self, **kwargs) -> List[str]:
+        cmd = [self.command]
+        
+        # Add model if specified
+        if kwargs.get("model"):
+            cmd.extend(["--model", kwargs["model"]])
+        
+        # Add output format if specified
+        if kwargs.get("output_format"):
+            cmd.extend(["--output", kwargs["output_format"]])
+        return cmd
     
     def _extract_token_count(self, stderr: str) -> Optional[int]:
         """Extract token count from Gemini output."""
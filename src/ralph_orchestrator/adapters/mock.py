@@ -0,0 +1,213 @@
+# ABOUTME: Synthetic agent adapter for load-testing the orchestration loop
+# ABOUTME: Samples latency, output size, tokens and failures from configurable distributions
+
+"""Mock adapter for Ralph Orchestrator.
+
+``--agent mock`` runs the loop against a fake agent; ``--agent
+mock:profile.yml`` loads a :class:`MockProfile` from YAML or JSON, e.g.::
+
+    latency: {kind: lognormal, mean: 0.5, spread: 0.8}
+    output_size: {kind: normal, mean: 4000, spread: 1000}
+    failure_rate: 0.05
+    tokens_per_second: 200
+    edits: 3
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Union
+
+from .base import (
+    EVENT_RESULT, EVENT_TEXT, EVENT_USAGE,
+    StreamEvent, ToolAdapter, ToolResponse
+)
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "reading the prompt updating the implementation running the tests "
+    "fixing a failing case refactoring the module writing documentation "
+).split()
+
+
+@dataclass
+class Distribution:
+    """A sampled quantity; ``spread`` is sigma for (log)normal and half-width for uniform."""
+
+    kind: str = "constant"
+    mean: float = 0.0
+    spread: float = 0.0
+    minimum: float = 0.0
+
+    KINDS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+    def __post_init__(self):
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution {self.kind!r}, expected one of {', '.join(self.KINDS)}")
+
+    @classmethod
+    def parse(cls, spec: Union['Distribution', float, Dict[str, Any]]) -> 'Distribution':
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("constant", float(spec))
+        return cls(**spec)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant" or (self.mean <= 0 and self.kind != "normal"):
+            value = self.mean
+        elif self.kind == "uniform":
+            value = rng.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.spread)
+        elif self.kind == "lognormal":
+            # Parameterised so the distribution's mean is ``mean``
+            value = rng.lognormvariate(math.log(self.mean) - self.spread ** 2 / 2, self.spread)
+        else:
+            value = rng.expovariate(1.0 / self.mean)
+        return max(value, self.minimum)
+
+
+@dataclass
+class MockProfile:
+    """Behaviour of the mock agent."""
+
+    latency: Distribution = field(default_factory=lambda: Distribution("lognormal", 0.05, 0.5))
+    output_size: Distribution = field(default_factory=lambda: Distribution("normal", 2000, 500))
+    tokens: Optional[Distribution] = None  # Default: output characters / 4
+    failure_rate: float = 0.0
+    completion_rate: float = 0.0  # Fraction of responses that report the task completed
+    tokens_per_second: float = 0.0  # Streaming rate after the first chunk; 0 streams instantly
+    chunk_tokens: int = 16
+    edits: int = 1  # Files rewritten in edit_dir per successful response
+    edit_dir: str = "mock_edits"
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.latency = Distribution.parse(self.latency)
+        self.output_size = Distribution.parse(self.output_size)
+        if self.tokens is not None:
+            self.tokens = Distribution.parse(self.tokens)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> 'MockProfile':
+        """Load a profile from a YAML or JSON file."""
+        path = Path(path)
+        text = path.read_text()
+        if path.suffix == ".json":
+            data = json.loads(text)
+        else:
+            import yaml
+            data = yaml.safe_load(text)
+
+        known = {f.name for f in fields(cls)}
+        unknown = set(data or {}) - known
+        if unknown:
+            raise ValueError(f"Unknown mock profile keys in {path}: {', '.join(sorted(unknown))}")
+        return cls(**(data or {}))
+
+
+class MockAdapter(ToolAdapter):
+    """Fake agent that produces synthetic output, usage and workspace edits."""
+
+    def __init__(self, profile: Optional[MockProfile] = None, available: Optional[bool] = None):
+        self.profile = profile or MockProfile()
+        self.rng = random.Random(self.profile.seed)
+        self.calls = 0
+        super().__init__("mock", available=available)
+
+    def check_availability(self) -> bool:
+        return True
+
+    def execute(self, prompt: str, **kwargs) -> ToolResponse:
+        turn = self._sample()
+        time.sleep(turn["latency"] + turn["stream_time"])
+        return self._finish(turn, kwargs, output=turn["output"])
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        turn = self._sample()
+        await asyncio.sleep(turn["latency"])
+
+        if not turn["failed"]:
+            chunks = list(self._chunks(turn["output"], turn["tokens"]))
+            delay = turn["stream_time"] / len(chunks) if chunks else 0
+            for chunk in chunks:
+                yield StreamEvent(EVENT_TEXT, chunk)
+                if delay:
+                    await asyncio.sleep(delay)
+            yield StreamEvent(EVENT_USAGE, data={"tokens": turn["tokens"], "cost": None})
+        yield StreamEvent(EVENT_RESULT, response=self._finish(turn, kwargs))
+
+    def _sample(self) -> Dict[str, Any]:
+        """Draw one response from the profile."""
+        profile = self.profile
+        self.calls += 1
+        failed = self.rng.random() < profile.failure_rate
+        size = int(profile.output_size.sample(self.rng))
+        tokens = int(profile.tokens.sample(self.rng)) if profile.tokens else size // 4
+
+        output = self._text(size)
+        if self.rng.random() < profile.completion_rate:
+            output += "\nTask completed."
+
+        stream_time = tokens / profile.tokens_per_second if profile.tokens_per_second > 0 else 0.0
+        return {
+            "failed": failed,
+            "latency": profile.latency.sample(self.rng),
+            "output": output,
+            "tokens": tokens,
+            "stream_time": 0.0 if failed else stream_time,
+        }
+
+    def _finish(self, turn: Dict[str, Any], kwargs: Dict[str, Any], output: str = "") -> ToolResponse:
+        if turn["failed"]:
+            return ToolResponse(
+                success=False,
+                output="",
+                error="Mock agent failure",
+                metadata={"mock_call": self.calls}
+            )
+        edited = self._edit(kwargs.get("cwd"), kwargs.get("iteration"))
+        return ToolResponse(
+            success=True,
+            output=output,
+            tokens_used=turn["tokens"],
+            metadata={"mock_call": self.calls, "mock_edits": edited}
+        )
+
+    def _edit(self, cwd: Optional[str], iteration: Optional[int]) -> int:
+        """Rewrite fake files so checkpoints and change tracking have work to do."""
+        if self.profile.edits <= 0:
+            return 0
+        directory = Path(cwd or Path.cwd()) / self.profile.edit_dir
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            for index in range(self.profile.edits):
+                path = directory / f"file_{self.rng.randrange(max(self.profile.edits * 4, 1)):04d}.txt"
+                with open(path, "a") as f:
+                    f.write(f"iteration {iteration} call {self.calls} edit {index}\n")
+        except OSError as e:
+            logger.warning(f"Mock edit failed: {e}")
+            return 0
+        return self.profile.edits
+
+    def _text(self, size: int) -> str:
+        if size <= 0:
+            return ""
+        start = self.rng.randrange(len(_WORDS))
+        sentence = " ".join(_WORDS[start:] + _WORDS[:start]) + "\n"
+        return (sentence * (size // len(sentence) + 1))[:size]
+
+    def _chunks(self, text: str, tokens: int) -> Iterator[str]:
+        if not text:
+            return
+        count = max(1, tokens // max(self.profile.chunk_tokens, 1))
+        size = max(1, -(-len(text) // count))
+        for start in range(0, len(text), size):
+            yield text[start:start + size]
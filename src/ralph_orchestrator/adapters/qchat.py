@@ -6,16 +6,12 @@
 import subprocess
 import os
 import sys
-import signal
 import threading
-import asyncio
-import select
-import time
-import fcntl
 import logging
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 from contextlib import contextmanager
-from .base import ToolAdapter, ToolResponse
+from .base import EVENT_RESULT, StreamEvent, ToolAdapter, ToolResponse
+from .subprocess_io import AsyncSubprocess, SubprocessRunner, terminate_later
 from ..logging_config import RalphLogger
 
 # Get logger for this module
@@ -25,7 +21,7 @@ logger = RalphLogger.get_logger(RalphLogger.ADAPTER_QCHAT)
 class QChatAdapter(ToolAdapter):
     """Adapter for Q Chat CLI tool."""
     
-    def __init__(self):
+    def __init__(self, available: Optional[bool] = None):
         # Get configuration from environment variables
         self.command = os.getenv("RALPH_QCHAT_COMMAND", "q")
         self.default_timeout = int(os.getenv("RALPH_QCHAT_TIMEOUT", "600"))
@@ -33,56 +29,32 @@ class QChatAdapter(ToolAdapter):
         self.trust_all_tools = os.getenv("RALPH_QCHAT_TRUST_TOOLS", "true").lower() == "true"
         self.no_interactive = os.getenv("RALPH_QCHAT_NO_INTERACTIVE", "true").lower() == "true"
         
-        # Initialize signal handler attributes before calling super()
-        self._original_sigint = None
-        self._original_sigterm = None
-        
-        super().__init__("qchat")
+        super().__init__("qchat", available=available)
         self.current_process = None
+        self._runner = None
         self.shutdown_requested = False
         
         # Thread synchronization
         self._lock = threading.Lock()
         
-        # Register signal handlers to propagate shutdown to subprocess
-        self._register_signal_handlers()
-        
         logger.info(f"Q Chat adapter initialized - Command: {self.command}, "
                    f"Default timeout: {self.default_timeout}s, "
                    f"Trust tools: {self.trust_all_tools}")
     
-    def _register_signal_handlers(self):
-        """Register signal handlers and store originals."""
-        self._original_sigint = signal.signal(signal.SIGINT, self._signal_handler)
-        self._original_sigterm = signal.signal(signal.SIGTERM, self._signal_handler)
-        logger.debug("Signal handlers registered for SIGINT and SIGTERM")
-    
-    def _restore_signal_handlers(self):
-        """Restore original signal handlers."""
-        if hasattr(self, '_original_sigint') and self._original_sigint is not None:
-            signal.signal(signal.SIGINT, self._original_sigint)
-        if hasattr(self, '_original_sigterm') and self._original_sigterm is not None:
-            signal.signal(signal.SIGTERM, self._original_sigterm)
-    
-    def _signal_handler(self, signum, frame):
-        """Handle shutdown signals and terminate running subprocess."""
+    def interrupt(self) -> None:
+        """Terminate the running q chat process; later execute() calls return at once."""
         with self._lock:
             self.shutdown_requested = True
             process = self.current_process
+            runner = self._runner
         
-        if process and process.poll() is None:
-            logger.warning(f"Received signal {signum}, terminating q chat process...")
-            try:
-                process.terminate()
-                process.wait(timeout=3)
-                logger.debug("Process terminated gracefully")
-            except subprocess.TimeoutExpired:
-                logger.warning("Force killing q chat process...")
-                process.kill()
-                try:
-                    process.wait(timeout=2)
-                except subprocess.TimeoutExpired:
-                    logger.error("Process may still be running after force kill")
+        if runner is not None:
+            # The runner terminates its own child and returns
+            runner.interrupt()
+        elif process is not None and process.returncode is None:
+            # Child of astream(); its event stream ends once it exits
+            logger.warning("Shutdown requested, terminating q chat process...")
+            terminate_later(process)
     
     def check_availability(self) -> bool:
         """Check if q CLI is available."""
@@ -149,169 +121,70 @@ class QChatAdapter(ToolAdapter):
             if verbose:
                 logger.info(f"Starting q chat command...")
                 logger.info(f"Command: {' '.join(cmd)}")
-                logger.info(f"Working directory: {os.getcwd()}")
+                logger.info(f"Working directory: {kwargs.get('cwd') or os.getcwd()}")
                 logger.info(f"Timeout: {timeout} seconds")
                 print("-" * 60, file=sys.stderr)
             
-            # Use Popen for real-time output streaming
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=os.getcwd(),
-                bufsize=0,  # Unbuffered to prevent deadlock
-                universal_newlines=True
-            )
-            
-            # Set process reference with lock
+            # Stream output through the shared selector-based runner
+            runner = SubprocessRunner()
             with self._lock:
-                self.current_process = process
+                self._runner = runner
+                shutdown = self.shutdown_requested
+            if shutdown:
+                runner.interrupt()
             
-            # Make pipes non-blocking to prevent deadlock
-            self._make_non_blocking(process.stdout)
-            self._make_non_blocking(process.stderr)
+            def set_process(process):
+                with self._lock:
+                    self.current_process = process
             
-            # Collect output while streaming
-            stdout_lines = []
-            stderr_lines = []
+            def echo(stream_name, text):
+                if verbose:
+                    print(text, end='', file=sys.stderr, flush=True)
             
-            start_time = time.time()
-            last_output_time = start_time
+            def report_progress(elapsed):
+                logger.debug(f"Q chat still running... elapsed: {elapsed:.1f}s / {timeout}s")
+                if verbose:
+                    print(f"Q chat still running... elapsed: {elapsed:.1f}s / {timeout}s", file=sys.stderr)
             
-            while True:
-                # Check for shutdown signal first with lock
+            try:
+                result = runner.run(
+                    cmd,
+                    cwd=kwargs.get('cwd') or os.getcwd(),
+                    timeout=timeout,
+                    on_output=echo,
+                    on_start=set_process,
+                    heartbeat=report_progress,
+                    max_output_size=self.max_output_size
+                )
+            finally:
+                # Clean up process reference with lock
                 with self._lock:
-                    shutdown = self.shutdown_requested
-                
-                if shutdown:
-                    if verbose:
-                        print("Shutdown requested, terminating q chat process...", file=sys.stderr)
-                    process.terminate()
-                    try:
-                        process.wait(timeout=3)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                        process.wait(timeout=2)
-                    
-                    # Clean up process reference with lock
-                    with self._lock:
-                        self.current_process = None
-                    
-                    return ToolResponse(
-                        success=False,
-                        output="".join(stdout_lines),
-                        error="Process terminated due to shutdown signal"
-                    )
-                
-                # Check for timeout
-                elapsed_time = time.time() - start_time
-                
-                # Log progress every 30 seconds
-                if int(elapsed_time) % 30 == 0 and int(elapsed_time) > 0:
-                    logger.debug(f"Q chat still running... elapsed: {elapsed_time:.1f}s / {timeout}s")
-                    
-                    # Check if the process seems stuck (no output for a while)
-                    time_since_output = time.time() - last_output_time
-                    if time_since_output > 60:
-                        logger.warning(f"No output received for {time_since_output:.1f}s, Q might be stuck")
-                    
-                    if verbose:
-                        print(f"Q chat still running... elapsed: {elapsed_time:.1f}s / {timeout}s", file=sys.stderr)
-                
-                if elapsed_time > timeout:
-                    logger.warning(f"Command timed out after {elapsed_time:.2f} seconds")
-                    if verbose:
-                        print(f"Command timed out after {elapsed_time:.2f} seconds", file=sys.stderr)
-                    
-                    # Try to terminate gracefully first
-                    process.terminate()
-                    try:
-                        # Wait a bit for graceful termination
-                        process.wait(timeout=3)
-                    except subprocess.TimeoutExpired:
-                        logger.warning("Graceful termination failed, force killing process")
-                        if verbose:
-                            print("Graceful termination failed, force killing process", file=sys.stderr)
-                        process.kill()
-                        # Wait for force kill to complete
-                        try:
-                            process.wait(timeout=2)
-                        except subprocess.TimeoutExpired:
-                            logger.error("Process may still be running after kill")
-                            if verbose:
-                                print("Warning: Process may still be running after kill", file=sys.stderr)
-                    
-                    # Try to capture any remaining output after termination
-                    try:
-                        remaining_stdout = process.stdout.read()
-                        remaining_stderr = process.stderr.read()
-                        if remaining_stdout:
-                            stdout_lines.append(remaining_stdout)
-                        if remaining_stderr:
-                            stderr_lines.append(remaining_stderr)
-                    except Exception as e:
-                        logger.warning(f"Could not read remaining output after timeout: {e}")
-                        if verbose:
-                            print(f"Warning: Could not read remaining output after timeout: {e}", file=sys.stderr)
-                    
-                    # Clean up process reference with lock
-                    with self._lock:
-                        self.current_process = None
-                    
-                    return ToolResponse(
-                        success=False,
-                        output="".join(stdout_lines),
-                        error=f"q chat command timed out after {elapsed_time:.2f} seconds"
-                    )
-                
-                # Check if process is still running
-                if process.poll() is not None:
-                    # Process finished, read remaining output
-                    remaining_stdout = process.stdout.read()
-                    remaining_stderr = process.stderr.read()
-                    
-                    if remaining_stdout:
-                        stdout_lines.append(remaining_stdout)
-                        if verbose:
-                            print(f"{remaining_stdout}", end='', file=sys.stderr)
-                    
-                    if remaining_stderr:
-                        stderr_lines.append(remaining_stderr)
-                        if verbose:
-                            print(f"{remaining_stderr}", end='', file=sys.stderr)
-                    
-                    break
-                
-                # Read available data without blocking
-                try:
-                    # Read stdout
-                    stdout_data = self._read_available(process.stdout)
-                    if stdout_data:
-                        stdout_lines.append(stdout_data)
-                        last_output_time = time.time()
-                        if verbose:
-                            print(stdout_data, end='', file=sys.stderr)
-                    
-                    # Read stderr
-                    stderr_data = self._read_available(process.stderr)
-                    if stderr_data:
-                        stderr_lines.append(stderr_data)
-                        last_output_time = time.time()
-                        if verbose:
-                            print(stderr_data, end='', file=sys.stderr)
-                    
-                    # Small sleep to prevent busy waiting
-                    time.sleep(0.01)
-                    
-                except IOError:
-                    # Non-blocking read, ignore would-block errors
-                    pass
+                    self.current_process = None
+                    self._runner = None
+                runner.close()
+            
+            execution_time = result.duration
+            
+            if result.interrupted:
+                if verbose:
+                    print("Shutdown requested, terminated q chat process", file=sys.stderr)
+                return ToolResponse(
+                    success=False,
+                    output=result.stdout,
+                    error="Process terminated due to shutdown signal"
+                )
             
-            # Get final return code
-            returncode = process.poll()
+            if result.timed_out:
+                logger.warning(f"Command timed out after {execution_time:.2f} seconds")
+                if verbose:
+                    print(f"Command timed out after {execution_time:.2f} seconds", file=sys.stderr)
+                return ToolResponse(
+                    success=False,
+                    output=result.stdout,
+                    error=f"q chat command timed out after {execution_time:.2f} seconds"
+                )
             
-            execution_time = time.time() - start_time
+            returncode = result.returncode
             logger.info(f"Process completed - Return code: {returncode}, Execution time: {execution_time:.2f}s")
             
             if verbose:
@@ -319,19 +192,11 @@ class QChatAdapter(ToolAdapter):
                 print(f"Process completed with return code: {returncode}", file=sys.stderr)
                 print(f"Total execution time: {execution_time:.2f} seconds", file=sys.stderr)
             
-            # Clean up process reference with lock
-            with self._lock:
-                self.current_process = None
-            
-            # Combine output
-            full_stdout = "".join(stdout_lines)
-            full_stderr = "".join(stderr_lines)
-            
             if returncode == 0:
-                logger.debug(f"Q chat succeeded - Output length: {len(full_stdout)} chars")
+                logger.debug(f"Q chat succeeded - Output length: {len(result.stdout)} chars")
                 return ToolResponse(
                     success=True,
-                    output=full_stdout,
+                    output=result.stdout,
                     metadata={
                         "tool": "q chat",
                         "execution_time": execution_time,
@@ -340,11 +205,11 @@ class QChatAdapter(ToolAdapter):
                     }
                 )
             else:
-                logger.error(f"Q chat failed - Return code: {returncode}, Error: {full_stderr[:200]}")
+                logger.error(f"Q chat failed - Return code: {returncode}, Error: {result.stderr[:200]}")
                 return ToolResponse(
                     success=False,
-                    output=full_stdout,
-                    error=full_stderr or f"q chat command failed with code {returncode}"
+                    output=result.stdout,
+                    error=result.stderr or f"q chat command failed with code {returncode}"
                 )
                 
         except Exception as e:
@@ -357,43 +222,15 @@ class QChatAdapter(ToolAdapter):
                 error=str(e)
             )
     
-    def _make_non_blocking(self, pipe):
-        """Make a pipe non-blocking to prevent deadlock."""
-        if pipe:
-            try:
-                fd = pipe.fileno()
-                # Check if fd is a valid integer file descriptor
-                if isinstance(fd, int) and fd >= 0:
-                    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
-                    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
-            except (AttributeError, ValueError, OSError):
-                # In tests or when pipe doesn't support fileno()
-                pass
-    
-    def _read_available(self, pipe):
-        """Read available data from a non-blocking pipe."""
-        if not pipe:
-            return ""
-        
-        try:
-            # Try to read up to 4KB at a time
-            data = pipe.read(4096)
-            # Ensure we always return a string, not None
-            if data is None:
-                return ""
-            return data if data else ""
-        except (IOError, OSError):
-            # Would block or no data available
-            return ""
-    
-    async def aexecute(self, prompt: str, **kwargs) -> ToolResponse:
-        """Native async execution using asyncio subprocess."""
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        """Native async streaming using asyncio subprocess."""
         if not self.available:
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error="q CLI is not available"
-            )
+            ))
+            return
         
         try:
             verbose = kwargs.get('verbose', True)
@@ -427,92 +264,67 @@ class QChatAdapter(ToolAdapter):
                 print(f"Command: {' '.join(cmd)}", file=sys.stderr)
                 print("-" * 60, file=sys.stderr)
             
-            # Create async subprocess
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=os.getcwd()
-            )
+            def set_process(process):
+                with self._lock:
+                    self.current_process = process
             
-            # Set process reference with lock
-            with self._lock:
-                self.current_process = process
+            process = AsyncSubprocess(
+                cmd,
+                cwd=kwargs.get('cwd') or os.getcwd(),
+                timeout=timeout,
+                on_start=set_process
+            )
             
             try:
-                # Wait for completion with timeout
-                stdout_data, stderr_data = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
-                )
-                
-                # Decode output
-                stdout = stdout_data.decode('utf-8') if stdout_data else ""
-                stderr = stderr_data.decode('utf-8') if stderr_data else ""
-                
-                if verbose and stdout:
-                    print(stdout, file=sys.stderr)
-                if verbose and stderr:
-                    print(stderr, file=sys.stderr)
-                
-                # Check return code
-                if process.returncode == 0:
-                    logger.debug(f"Async Q chat succeeded - Output length: {len(stdout)} chars")
-                    return ToolResponse(
-                        success=True,
-                        output=stdout,
-                        metadata={
-                            "tool": "q chat",
-                            "verbose": verbose,
-                            "async": True,
-                            "return_code": process.returncode
-                        }
-                    )
-                else:
-                    logger.error(f"Async Q chat failed - Return code: {process.returncode}")
-                    return ToolResponse(
-                        success=False,
-                        output=stdout,
-                        error=stderr or f"q chat failed with code {process.returncode}"
-                    )
-                
-            except asyncio.TimeoutError:
-                # Timeout occurred
-                logger.warning(f"Async q chat timed out after {timeout} seconds")
+                # Cancellation (e.g. a lost hedged race) terminates q chat too
+                async for event in process.events():
+                    if verbose:
+                        print(event.text, end='', file=sys.stderr, flush=True)
+                    yield event
+            finally:
+                # Clean up process reference
+                with self._lock:
+                    self.current_process = None
+            
+            if process.timed_out:
                 if verbose:
                     print(f"Async q chat timed out after {timeout} seconds", file=sys.stderr)
-                
-                # Try to terminate process
-                try:
-                    process.terminate()
-                    await asyncio.wait_for(process.wait(), timeout=3)
-                except (asyncio.TimeoutError, ProcessLookupError):
-                    try:
-                        process.kill()
-                        await process.wait()
-                    except ProcessLookupError:
-                        pass
-                
-                return ToolResponse(
+                yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                     success=False,
                     output="",
                     error=f"q chat command timed out after {timeout} seconds"
-                )
-            
-            finally:
-                # Clean up process reference
-                with self._lock:
-                    self.current_process = None
+                ))
+            elif process.returncode == 0:
+                logger.debug("Async Q chat succeeded")
+                yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                    success=True,
+                    output="",
+                    metadata={
+                        "tool": "q chat",
+                        "verbose": verbose,
+                        "async": True,
+                        "return_code": process.returncode
+                    }
+                ))
+            else:
+                logger.error(f"Async Q chat failed - Return code: {process.returncode}")
+                # The error falls back to the streamed stderr
+                yield StreamEvent(EVENT_RESULT, response=ToolResponse(
+                    success=False,
+                    output="",
+                    error=None,
+                    metadata={"return_code": process.returncode}
+                ))
                     
         except Exception as e:
             logger.exception(f"Async execution error: {str(e)}")
             if kwargs.get('verbose'):
                 print(f"Async execution error: {str(e)}", file=sys.stderr)
-            return ToolResponse(
+            yield StreamEvent(EVENT_RESULT, response=ToolResponse(
                 success=False,
                 output="",
                 error=str(e)
-            )
+            ))
     
     def estimate_cost(self, prompt: str) -> float:
         """Q chat cost estimation (if applicable)."""
@@ -522,9 +334,6 @@ class QChatAdapter(ToolAdapter):
     
     def __del__(self):
         """Cleanup on deletion."""
-        # Restore original signal handlers
-        self._restore_signal_handlers()
-        
         # Ensure any running process is terminated
         if hasattr(self, '_lock'):
             with self._lock:
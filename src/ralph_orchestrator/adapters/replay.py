@@ -0,0 +1,390 @@
+# ABOUTME: Record and replay adapters for deterministic, offline orchestrator runs
+# ABOUTME: Sessions are gzipped JSON lines of responses, timings, usage and workspace diffs
+
+"""Session recording and replay for Ralph Orchestrator.
+
+A session file (``*.ralph``) is gzip-compressed JSON lines: a header
+followed by one record per agent turn. :class:`RecordingAdapter` wraps a
+real adapter and appends a turn for every response; :class:`ReplayAdapter`
+plays the turns back in order, re-applying each turn's workspace diff, so
+orchestrator overhead can be measured without calling any agent.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from .base import (
+    EVENT_RESULT, EVENT_TEXT, EVENT_USAGE,
+    StreamEvent, ToolAdapter, ToolResponse
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION_FORMAT = "ralph-session"
+SESSION_VERSION = 1
+
+# Orchestrator state is rebuilt by the replaying run itself
+DIFF_EXCLUDES = [":(exclude).agent"]
+
+
+@dataclass
+class SessionTurn:
+    """One recorded agent response."""
+
+    adapter: str
+    iteration: Optional[int]
+    started: float  # Seconds since the session started
+    duration: float
+    success: bool
+    output: str
+    error: Optional[str] = None
+    tokens_used: Optional[int] = None
+    cost: Optional[float] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    diff: Optional[str] = None  # Binary git diff of the workspace over the turn
+
+    def to_response(self) -> ToolResponse:
+        return ToolResponse(
+            success=self.success,
+            output=self.output,
+            error=self.error,
+            tokens_used=self.tokens_used,
+            cost=self.cost,
+            metadata=dict(self.metadata)
+        )
+
+
+class SessionRecorder:
+    """Appends turns to a session file; shared by every recording adapter."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.turns = 0
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self._write({
+            "type": "header",
+            "format": SESSION_FORMAT,
+            "version": SESSION_VERSION,
+            "created": self._start,
+            "cwd": str(Path.cwd())
+        })
+
+    def record(self, turn: SessionTurn) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._write({"type": "turn", **asdict(turn)})
+            self.turns += 1
+
+    def elapsed(self) -> float:
+        return time.time() - self._start
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"Recorded {self.turns} turns to {self.path}")
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        # Sync-flush each record so an interrupted run still leaves a usable session
+        self._file.flush()
+
+
+class ReplaySession:
+    """Turns loaded from a session file, consumed in order by replay adapters."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.turns: List[SessionTurn] = []
+        self.header: Dict[str, Any] = {}
+        self._position = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def next_turn(self) -> Optional[SessionTurn]:
+        """Return the next turn, or None once the session is exhausted."""
+        with self._lock:
+            if self._position >= len(self.turns):
+                return None
+            turn = self.turns[self._position]
+            self._position += 1
+            return turn
+
+    @property
+    def remaining(self) -> int:
+        return len(self.turns) - self._position
+
+    def _load(self) -> None:
+        fields = set(SessionTurn.__dataclass_fields__)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    kind = record.pop("type", None)
+                    if kind == "header":
+                        self.header = record
+                    elif kind == "turn":
+                        self.turns.append(SessionTurn(**{k: v for k, v in record.items() if k in fields}))
+            except (EOFError, json.JSONDecodeError) as e:
+                # A recording that was killed mid-write; keep the complete turns
+                logger.warning(f"Session {self.path} is truncated after {len(self.turns)} turns: {e}")
+
+        if self.header.get("format") != SESSION_FORMAT:
+            raise ValueError(f"{self.path} is not a Ralph session file")
+        if self.header.get("version", 0) > SESSION_VERSION:
+            raise ValueError(f"{self.path} needs a newer Ralph (session version {self.header['version']})")
+
+
+class WorkspaceDiff:
+    """Snapshots a git working tree through a private index to diff agent turns."""
+
+    INDEX_NAME = "ralph-record.index"
+
+    def __init__(self, cwd: Optional[Union[str, Path]] = None):
+        self.cwd = Path(cwd) if cwd else Path.cwd()
+        self._env: Optional[Dict[str, str]] = None
+
+    def snapshot(self) -> Optional[str]:
+        """Write the current working tree as a git tree object.
+
+        Returns:
+            The tree id, or None outside a git repository
+        """
+        env = self._index_env()
+        if env is None:
+            return None
+        if self._git("add", "-A", env=env).returncode != 0:
+            return None
+        result = self._git("write-tree", env=env)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def diff(self, before: Optional[str], after: Optional[str]) -> Optional[str]:
+        if not before or not after or before == after:
+            return None
+        result = self._git("diff", "--binary", before, after, "--", ".", *DIFF_EXCLUDES)
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout
+
+    def apply(self, patch: str) -> bool:
+        """Apply a recorded diff to the working tree."""
+        result = self._git("apply", "--binary", "--whitespace=nowarn", "-", input=patch)
+        if result.returncode != 0:
+            logger.warning(f"Could not apply recorded workspace diff: {result.stderr.strip()}")
+            return False
+        return True
+
+    def _index_env(self) -> Optional[Dict[str, str]]:
+        if self._env is None:
+            result = self._git("rev-parse", "--path-format=absolute", "--git-path", self.INDEX_NAME)
+            if result.returncode != 0:
+                return None
+            self._env = os.environ.copy()
+            self._env["GIT_INDEX_FILE"] = result.stdout.strip()
+        return self._env
+
+    def _git(
+        self,
+        *args: str,
+        env: Optional[Dict[str, str]] = None,
+        input: Optional[str] = None
+    ) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(
+                ["git", *args],
+                cwd=str(self.cwd),
+                env=env,
+                input=input,
+                capture_output=True,
+                # Non-UTF-8 file contents survive the JSON round trip as escapes
+                encoding='utf-8',
+                errors='surrogateescape'
+            )
+        except OSError as e:
+            return subprocess.CompletedProcess(args, 1, "", str(e))
+
+
+class RecordingAdapter(ToolAdapter):
+    """Wraps an adapter and records each of its responses to a session."""
+
+    def __init__(self, inner: ToolAdapter, recorder: SessionRecorder, capture_diffs: bool = True):
+        """Initialize the recording adapter.
+
+        Args:
+            inner: Adapter that does the real work
+            recorder: Session the turns are appended to
+            capture_diffs: Record the workspace diff of each turn
+        """
+        self.inner = inner
+        self.recorder = recorder
+        self.capture_diffs = capture_diffs
+        super().__init__(inner.name, config=inner.config, available=inner.available)
+
+    def __getattr__(self, name: str):
+        # Adapter-specific settings (configure, enable_session, ...) reach the real adapter
+        if name == 'inner':
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    @property
+    def session_id(self) -> Optional[int]:
+        # Defined on ToolAdapter, so __getattr__ would never forward it
+        return self.inner.session_id
+
+    def interrupt(self) -> None:
+        self.inner.interrupt()
+
+    def check_availability(self) -> bool:
+        return self.inner.available
+
+    def execute(self, prompt: str, **kwargs) -> ToolResponse:
+        workspace = WorkspaceDiff(kwargs.get('cwd')) if self.capture_diffs else None
+        before = workspace.snapshot() if workspace else None
+        started = self.recorder.elapsed()
+        start = time.time()
+        response = self.inner.execute(prompt, **kwargs)
+        self._record(response, kwargs, started, time.time() - start, workspace, before)
+        return response
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        async for event in self.inner.astream(prompt, **kwargs):
+            yield event
+
+    async def aexecute(self, prompt: str, **kwargs) -> ToolResponse:
+        loop = asyncio.get_running_loop()
+        workspace = WorkspaceDiff(kwargs.get('cwd')) if self.capture_diffs else None
+        before = await loop.run_in_executor(None, workspace.snapshot) if workspace else None
+        started = self.recorder.elapsed()
+        start = time.time()
+        response = await super().aexecute(prompt, **kwargs)
+        duration = time.time() - start
+        await loop.run_in_executor(
+            None, self._record, response, kwargs, started, duration, workspace, before
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def _record(
+        self,
+        response: ToolResponse,
+        kwargs: Dict[str, Any],
+        started: float,
+        duration: float,
+        workspace: Optional[WorkspaceDiff],
+        before: Optional[str]
+    ) -> None:
+        diff = workspace.diff(before, workspace.snapshot()) if workspace else None
+        # Spilled output is recorded in full so a replay reproduces it
+        output = response.view.text() if response.transcript else response.output
+        metadata = {k: v for k, v in response.metadata.items() if _is_json(v)}
+        self.recorder.record(SessionTurn(
+            adapter=self.name,
+            iteration=kwargs.get('iteration'),
+            started=round(started, 3),
+            duration=round(duration, 3),
+            success=response.success,
+            output=output,
+            error=response.error,
+            tokens_used=response.tokens_used,
+            cost=response.cost,
+            metadata=metadata,
+            diff=diff
+        ))
+
+
+class ReplayAdapter(ToolAdapter):
+    """Plays back a recorded session instead of running an agent."""
+
+    def __init__(
+        self,
+        session: ReplaySession,
+        speed: float = 1.0,
+        apply_diffs: bool = True,
+        available: Optional[bool] = None
+    ):
+        """Initialize the replay adapter.
+
+        Args:
+            session: Loaded session; adapters sharing it consume turns in order
+            speed: Playback speed relative to the recording (0 = no delays)
+            apply_diffs: Re-apply each turn's workspace diff
+            available: Skip the availability check when already known
+        """
+        self.session = session
+        self.speed = speed
+        self.apply_diffs = apply_diffs
+        super().__init__("replay", available=available)
+
+    def check_availability(self) -> bool:
+        return bool(self.session.turns)
+
+    def execute(self, prompt: str, **kwargs) -> ToolResponse:
+        turn = self.session.next_turn()
+        if turn is None:
+            return self._exhausted()
+        delay = self._delay(turn)
+        if delay:
+            time.sleep(delay)
+        return self._play(turn, kwargs)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StreamEvent]:
+        turn = self.session.next_turn()
+        if turn is None:
+            yield StreamEvent(EVENT_RESULT, response=self._exhausted())
+            return
+        delay = self._delay(turn)
+        if delay:
+            await asyncio.sleep(delay)
+
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(None, self._play, turn, kwargs)
+        if response.output:
+            yield StreamEvent(EVENT_TEXT, response.output)
+        if response.tokens_used or response.cost:
+            yield StreamEvent(EVENT_USAGE, data={"tokens": response.tokens_used, "cost": response.cost})
+        response.output = ""
+        yield StreamEvent(EVENT_RESULT, response=response)
+
+    def _delay(self, turn: SessionTurn) -> float:
+        return turn.duration / self.speed if self.speed > 0 else 0.0
+
+    def _play(self, turn: SessionTurn, kwargs: Dict[str, Any]) -> ToolResponse:
+        if self.apply_diffs and turn.diff:
+            WorkspaceDiff(kwargs.get('cwd')).apply(turn.diff)
+        response = turn.to_response()
+        response.metadata["replayed_from"] = turn.adapter
+        return response
+
+    def _exhausted(self) -> ToolResponse:
+        return ToolResponse(
+            success=False,
+            output="",
+            error=f"Replay session {self.session.path} exhausted",
+            metadata={"replay_exhausted": True}
+        )
+
+
+def _is_json(value: Any) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,443 @@
+# ABOUTME: Shared subprocess I/O engine for CLI-based tool adapters
+# ABOUTME: Waits on pipes with selectors or asyncio instead of polling, decoding output incrementally
+
+"""Subprocess I/O for Ralph Orchestrator adapters."""
+
+import asyncio
+import codecs
+import io
+import logging
+import os
+import selectors
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+from .base import DEFAULT_MAX_OUTPUT_SIZE, EVENT_ERROR, EVENT_TEXT, OutputBuffer, StreamEvent
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+# Seconds a terminated child gets before it is killed
+KILL_GRACE = 3.0
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a subprocess run."""
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    interrupted: bool = False
+
+
+class _Stream:
+    """One output pipe: a reusable read buffer and an incremental decoder."""
+
+    def __init__(self, name: str, limit: Optional[int]):
+        self.name = name
+        self.buffer = bytearray(READ_SIZE)
+        self.view = memoryview(self.buffer)
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='replace'), translate=True
+        )
+        self.output = OutputBuffer(limit)
+
+
+class SubprocessRunner:
+    """Runs a command, blocking in ``select`` until output, timeout or interrupt.
+
+    Both pipes and an optional stdin payload are multiplexed on one
+    selector, so a chatty stderr or a large prompt can never deadlock the
+    child. :meth:`interrupt` wakes the loop through a self-pipe and is safe
+    to call from signal handlers and other threads.
+    """
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._interrupted = threading.Event()
+
+    def interrupt(self) -> None:
+        """Ask a running :meth:`run` to terminate the child and return."""
+        self._interrupted.set()
+        try:
+            os.write(self._wake_w, b'x')
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self) -> None:
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(
+        self,
+        cmd: List[str],
+        input: Optional[Union[str, bytes]] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+        heartbeat: Optional[Callable[[float], None]] = None,
+        heartbeat_interval: float = 30.0,
+        max_output_size: Optional[int] = DEFAULT_MAX_OUTPUT_SIZE
+    ) -> ProcessResult:
+        """Run ``cmd`` to completion.
+
+        Args:
+            cmd: Command and arguments
+            input: Data written to stdin (stdin is inherited when None)
+            cwd: Working directory
+            env: Environment for the child
+            timeout: Seconds before the child is terminated
+            on_output: Called with ("stdout" or "stderr", text) as output arrives
+            on_start: Called with the Popen object once the child is running
+            heartbeat: Called with the elapsed seconds while the child is quiet
+            heartbeat_interval: Seconds between heartbeats
+            max_output_size: Characters kept per stream (None for no cap)
+
+        Returns:
+            The exit status and captured output
+        """
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        payload = input.encode('utf-8') if isinstance(input, str) else input
+
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if payload is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            bufsize=0
+        )
+        self.process = process
+        if on_start:
+            on_start(process)
+
+        streams = {
+            process.stdout.fileno(): _Stream('stdout', max_output_size),
+            process.stderr.fileno(): _Stream('stderr', max_output_size),
+        }
+        timed_out = False
+
+        with selectors.DefaultSelector() as selector:
+            for fd in streams:
+                os.set_blocking(fd, False)
+                selector.register(fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            if payload is not None:
+                stdin_fd = process.stdin.fileno()
+                if payload:
+                    os.set_blocking(stdin_fd, False)
+                    selector.register(stdin_fd, selectors.EVENT_WRITE)
+                else:
+                    process.stdin.close()
+            payload_view = memoryview(payload) if payload else None
+            last_beat = start
+
+            while len(selector.get_map()) > 1 and not self._interrupted.is_set():
+                wait = heartbeat_interval if heartbeat else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        timed_out = True
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+
+                ready = selector.select(wait)
+                now = time.monotonic()
+                if heartbeat and now - last_beat >= heartbeat_interval:
+                    last_beat = now
+                    heartbeat(now - start)
+
+                for key, _ in ready:
+                    fd = key.fd
+                    if fd == self._wake_r:
+                        self._drain_wake()
+                    elif fd in streams:
+                        if not self._read(fd, streams[fd], on_output):
+                            selector.unregister(fd)
+                    else:
+                        payload_view = self._write(fd, payload_view)
+                        if not payload_view:
+                            selector.unregister(fd)
+                            process.stdin.close()
+
+            if timed_out or self._interrupted.is_set():
+                self._terminate(process)
+                # Pick up whatever the child wrote before it exited
+                while True:
+                    ready = [key.fd for key, _ in selector.select(0) if key.fd in streams]
+                    if not ready:
+                        break
+                    for fd in ready:
+                        if not self._read(fd, streams[fd], on_output):
+                            selector.unregister(fd)
+
+        for stream in streams.values():
+            text = stream.decoder.decode(b'', final=True)
+            if text:
+                stream.output.append(text)
+                if on_output:
+                    on_output(stream.name, text)
+
+        if process.stdin and not process.stdin.closed:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+        process.stdout.close()
+        process.stderr.close()
+        try:
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 0) if deadline else None)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            self._terminate(process)
+            returncode = process.returncode
+        self.process = None
+
+        stdout, stderr = (stream.output.getvalue() for stream in streams.values())
+        return ProcessResult(
+            returncode=returncode,
+            stdout=stdout,
+            stderr=stderr,
+            duration=time.monotonic() - start,
+            timed_out=timed_out,
+            interrupted=self._interrupted.is_set()
+        )
+
+    def _read(self, fd: int, stream: _Stream, on_output) -> bool:
+        """Read available data from ``fd``; returns False at EOF."""
+        try:
+            count = os.readv(fd, [stream.buffer])
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        if count == 0:
+            return False
+        text = stream.decoder.decode(stream.view[:count])
+        if text:
+            stream.output.append(text)
+            if on_output:
+                on_output(stream.name, text)
+        return True
+
+    def _write(self, fd: int, payload: memoryview) -> Optional[memoryview]:
+        """Write as much of ``payload`` as the pipe takes; returns the rest."""
+        try:
+            written = os.write(fd, payload[:READ_SIZE])
+        except BlockingIOError:
+            return payload
+        except BrokenPipeError:
+            # The child stopped reading stdin
+            return None
+        return payload[written:]
+
+    def _drain_wake(self) -> None:
+        try:
+            while os.read(self._wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen) -> None:
+        """Terminate, then kill a child that does not exit."""
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            logger.warning("Graceful termination failed, force killing process")
+            process.kill()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                logger.error("Process may still be running after kill")
+
+
+def run_command(cmd: List[str], **kwargs) -> ProcessResult:
+    """Run ``cmd`` once with a throwaway :class:`SubprocessRunner`."""
+    runner = SubprocessRunner()
+    try:
+        return runner.run(cmd, **kwargs)
+    finally:
+        runner.close()
+
+
+class AsyncSubprocess:
+    """Runs a command on the event loop, streaming its output as events.
+
+    The prompt is written to stdin concurrently with reading both pipes.
+    If the consumer is cancelled or stops iterating, the child is
+    terminated and killed after a grace period, without blocking the loop.
+    """
+
+    def __init__(
+        self,
+        cmd: List[str],
+        input: Optional[Union[str, bytes]] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        on_start: Optional[Callable[[asyncio.subprocess.Process], None]] = None
+    ):
+        """Initialize the subprocess.
+
+        Args:
+            cmd: Command and arguments
+            input: Data written to stdin (stdin is inherited when None)
+            cwd: Working directory
+            env: Environment for the child
+            timeout: Seconds before the child is terminated
+            on_start: Called with the process once the child is running
+        """
+        self.cmd = cmd
+        self.input = input.encode('utf-8') if isinstance(input, str) else input
+        self.cwd = cwd
+        self.env = env
+        self.timeout = timeout
+        self.on_start = on_start
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.returncode: Optional[int] = None
+        self.timed_out = False
+        self.duration = 0.0
+
+    async def events(self) -> AsyncIterator[StreamEvent]:
+        """Start the child and yield EVENT_TEXT (stdout) and EVENT_ERROR (stderr) events.
+
+        ``returncode``, ``timed_out`` and ``duration`` are set once iteration ends.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.timeout if self.timeout is not None else None
+
+        process = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.PIPE if self.input is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env
+        )
+        self.process = process
+        if self.on_start:
+            self.on_start(process)
+
+        # Both pipes feed one queue so neither can fill up and block the child
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.ensure_future(_pump(process.stdout, EVENT_TEXT, queue)),
+            asyncio.ensure_future(_pump(process.stderr, EVENT_ERROR, queue)),
+        ]
+        if self.input is not None:
+            tasks.append(asyncio.ensure_future(_feed(process.stdin, self.input)))
+
+        finished = False
+        try:
+            open_pipes = 2
+            while open_pipes:
+                remaining = deadline - loop.time() if deadline is not None else None
+                event = await asyncio.wait_for(queue.get(), timeout=remaining)
+                if event is None:
+                    open_pipes -= 1
+                    continue
+                yield event
+
+            remaining = deadline - loop.time() if deadline is not None else None
+            self.returncode = await asyncio.wait_for(process.wait(), timeout=remaining)
+            finished = True
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            logger.warning(f"{self.cmd[0]} timed out after {self.timeout} seconds")
+            await terminate(process)
+        except asyncio.CancelledError:
+            await terminate(process)
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            if not finished:
+                # The consumer stopped iterating; the child cannot be awaited here
+                terminate_later(process)
+            self.duration = loop.time() - start
+
+
+async def _pump(stream: asyncio.StreamReader, kind: str, queue: asyncio.Queue) -> None:
+    """Forward decoded chunks from a pipe to ``queue``, then None at EOF."""
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder('utf-8')(errors='replace'), translate=True
+    )
+    try:
+        while True:
+            data = await stream.read(READ_SIZE)
+            text = decoder.decode(data, final=not data)
+            if text:
+                await queue.put(StreamEvent(kind, text))
+            if not data:
+                break
+    finally:
+        queue.put_nowait(None)
+
+
+async def _feed(stdin: asyncio.StreamWriter, payload: bytes) -> None:
+    """Write ``payload`` to the child's stdin and close it."""
+    try:
+        stdin.write(payload)
+        await stdin.drain()
+        stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        # The child exited or stopped reading stdin
+        pass
+
+
+async def terminate(process: asyncio.subprocess.Process, grace: float = KILL_GRACE) -> None:
+    """Terminate ``process``, killing it if it does not exit within ``grace``."""
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), timeout=grace)
+    except ProcessLookupError:
+        pass
+    except asyncio.TimeoutError:
+        logger.warning("Graceful termination failed, force killing process")
+        try:
+            process.kill()
+        except ProcessLookupError:
+            return
+        await process.wait()
+
+
+def terminate_later(process: asyncio.subprocess.Process, grace: float = KILL_GRACE) -> None:
+    """Terminate ``process`` now and kill it if it is still running after ``grace``."""
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+    except ProcessLookupError:
+        return
+
+    def kill():
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    asyncio.get_event_loop().call_later(grace, kill)
@@ -0,0 +1,197 @@
+# ABOUTME: Spill-to-disk transcripts for large agent output
+# ABOUTME: Writes output past a threshold to .agent/transcripts and reads it back through mmap
+
+"""Agent output transcripts for Ralph Orchestrator."""
+
+import logging
+import mmap
+import re
+import time
+from pathlib import Path
+from typing import IO, List, Optional, Pattern, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPT_DIR = Path(".agent") / "transcripts"
+
+# Output below this many characters stays in memory only
+DEFAULT_SPILL_THRESHOLD = 1024 * 1024
+
+
+class TranscriptWriter:
+    """Collects output in memory until it crosses a threshold, then appends to a file."""
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
+        threshold: int = DEFAULT_SPILL_THRESHOLD
+    ):
+        """Initialize the writer.
+
+        Args:
+            directory: Directory transcripts are written to
+            name: File name stem, e.g. "iteration-00012-claude"
+            threshold: Characters kept in memory before spilling to disk
+        """
+        self.directory = directory
+        self.name = name
+        self.threshold = threshold
+        self.path: Optional[Path] = None
+        self._file: Optional[IO[bytes]] = None
+        self._pending: List[str] = []
+        self._pending_size = 0
+
+    def write(self, text: str) -> None:
+        if self._file is not None:
+            self._file.write(text.encode('utf-8'))
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size > self.threshold:
+            self._spill()
+
+    def close(self) -> Optional[Path]:
+        """Finish the transcript.
+
+        Returns:
+            The transcript file, or None if the output stayed in memory
+        """
+        self._pending = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.path
+
+    def _spill(self) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Keep transcripts out of git checkpoints
+            ignore_file = self.directory / ".gitignore"
+            if not ignore_file.exists():
+                ignore_file.write_text("*\n")
+            self.path, self._file = self._create()
+        except OSError as e:
+            # Keep going in memory; the capped output buffer still applies
+            logger.warning(f"Could not write transcript: {e}")
+            self.threshold = float('inf')
+            return
+        for chunk in self._pending:
+            self._file.write(chunk.encode('utf-8'))
+        self._pending = []
+        logger.info(f"Agent output exceeded {self.threshold} characters, writing to {self.path}")
+
+    def _create(self):
+        """Open a new transcript file without overwriting earlier ones."""
+        attempt = 1
+        while True:
+            suffix = f"-{attempt}" if attempt > 1 else ""
+            path = self.directory / f"{self.name}{suffix}.log"
+            try:
+                return path, open(path, 'xb')
+            except FileExistsError:
+                attempt += 1
+
+
+class TranscriptView:
+    """Read-only view of agent output, backed by a file or a string.
+
+    File-backed views are memory-mapped on demand, so head, tail and search
+    never load the whole transcript into memory.
+    """
+
+    def __init__(self, path: Optional[Path] = None, text: str = ""):
+        """Initialize the view.
+
+        Args:
+            path: Transcript file (takes precedence over ``text``)
+            text: In-memory output
+        """
+        self.path = path
+        self._text = text
+
+    def __len__(self) -> int:
+        """Size of the output (bytes for files, characters for text)."""
+        if self.path is None:
+            return len(self._text)
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def head(self, size: int = 500) -> str:
+        """Return the first ``size`` characters (bytes for files)."""
+        if self.path is None:
+            return self._text[:size]
+        with self._map() as data:
+            return bytes(data[:size]).decode('utf-8', errors='replace')
+
+    def tail(self, size: int = 500) -> str:
+        """Return the last ``size`` characters (bytes for files)."""
+        if self.path is None:
+            return self._text[-size:] if size else ""
+        with self._map() as data:
+            return bytes(data[max(len(data) - size, 0):]).decode('utf-8', errors='replace')
+
+    def search(self, pattern: Union[str, Pattern], ignore_case: bool = True) -> Optional[int]:
+        """Find ``pattern`` (a regular expression) in the output.
+
+        Returns:
+            Offset of the first match, or None
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if isinstance(pattern, re.Pattern):
+            pattern = pattern.pattern
+        if self.path is None:
+            match = re.search(pattern, self._text, flags)
+        else:
+            if isinstance(pattern, str):
+                pattern = pattern.encode('utf-8')
+            with self._map() as data:
+                match = re.search(pattern, data, flags)
+        return match.start() if match else None
+
+    def contains(self, *words: str, ignore_case: bool = True) -> bool:
+        """Whether any of ``words`` occurs in the output."""
+        if not words:
+            return False
+        return self.search('|'.join(re.escape(word) for word in words), ignore_case) is not None
+
+    def text(self) -> str:
+        """Load the whole output. Avoid this for large transcripts."""
+        if self.path is None:
+            return self._text
+        return self.path.read_text(encoding='utf-8', errors='replace')
+
+    def _map(self):
+        return _Mapping(self.path)
+
+
+class _Mapping:
+    """Context manager mapping a file read-only; empty files map to b''."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            return b''
+        return self._map
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def transcript_name(adapter_name: str, iteration: Optional[int] = None) -> str:
+    """File name stem for an adapter's output in one iteration."""
+    if iteration is not None:
+        return f"iteration-{iteration:05d}-{adapter_name}"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{adapter_name}"
@@ -0,0 +1,258 @@
+# ABOUTME: Bounded, content-addressed store for cached context artifacts
+# ABOUTME: Full SHA-256 keys, a JSON index, LRU eviction by size and entry count
+
+"""Cache store for Ralph Orchestrator.
+
+Artifacts (cached prompt prefixes, prompt summaries, ...) are stored as
+files named by the SHA-256 of their key under ``objects/``, and an index
+file records their sizes in least-recently-used order. When the store
+exceeds its size or entry cap the least recently used artifacts are
+deleted, so a long-lived project's cache stays bounded. Totals are kept
+as entries come and go, so statistics never touch the filesystem.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+logger = logging.getLogger('ralph-orchestrator.cache')
+
+INDEX_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 4096
+SAVE_INTERVAL = 30.0  # Minimum seconds between index saves for access-order-only changes
+
+
+def content_key(*parts: Union[str, bytes]) -> str:
+    """Full SHA-256 hex digest of ``parts``, usable as a store key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode('utf-8', 'surrogatepass') if isinstance(part, str) else part
+        # Length-prefixed, so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class CacheStore:
+    """Content-addressed artifact cache with LRU eviction."""
+
+    def __init__(
+        self,
+        root: Path = Path(".agent/cache/store"),
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        """Open (or create) the store.
+
+        Args:
+            root: Directory holding the index and the artifacts
+            max_bytes: Total artifact size kept before evicting
+            max_entries: Number of artifacts kept before evicting
+        """
+        self.root = root
+        self.objects = root / "objects"
+        self.index_file = root / "index.json"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # Key -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def get(self, key: str, namespace: str = "") -> Optional[bytes]:
+        """Return the artifact stored under ``key``, or None."""
+        key = self._address(key, namespace)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+        try:
+            data = self._path(key).read_bytes()
+        except OSError:
+            # Deleted behind our back; forget it
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._maybe_save()
+        return data
+
+    def get_text(self, key: str, namespace: str = "") -> Optional[str]:
+        data = self.get(key, namespace)
+        return data.decode('utf-8', 'surrogatepass') if data is not None else None
+
+    def put(self, data: Union[str, bytes], key: Optional[str] = None, namespace: str = "") -> str:
+        """Store ``data``, by default under its own content hash.
+
+        Args:
+            data: Artifact to store
+            key: Key to store it under (default: the content hash of ``data``)
+            namespace: Keeps keys of different artifact kinds apart
+
+        Returns:
+            The key the artifact can be fetched with
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8', 'surrogatepass')
+        content_addressed = key is None
+        key = key or content_key(data)
+        address = self._address(key, namespace)
+        if len(data) > self.max_bytes:
+            logger.debug(f"Not caching {len(data)} byte artifact, larger than the whole cache")
+            return key
+        with self._lock:
+            if content_addressed and address in self._entries:
+                # Same hash, same content: nothing to write
+                self._entries.move_to_end(address)
+                self._dirty = True
+                return key
+        path = self._path(address)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            self._write(path, data)
+        except OSError as e:
+            logger.warning(f"Could not cache artifact {address[:12]}: {e}")
+            return key
+        with self._lock:
+            self._forget(address)
+            self._entries[address] = len(data)
+            self._bytes += len(data)
+            self._evict()
+            self._save()
+        return key
+
+    def delete(self, key: str, namespace: str = "") -> None:
+        address = self._address(key, namespace)
+        with self._lock:
+            if address in self._entries:
+                self._forget(address)
+                self._remove(address)
+                self._save()
+
+    def flush(self) -> None:
+        """Save the index if the access order changed since the last save."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def _address(key: str, namespace: str) -> str:
+        # Namespaced keys are hashed again so every address is a fixed-length digest
+        return content_key(namespace, key) if namespace else key
+
+    def _path(self, address: str) -> Path:
+        # Two-character fan-out keeps directories small
+        return self.objects / address[:2] / address[2:]
+
+    def _forget(self, address: str) -> None:
+        size = self._entries.pop(address, None)
+        if size is not None:
+            self._bytes -= size
+            self._dirty = True
+
+    def _remove(self, address: str) -> None:
+        try:
+            self._path(address).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"Could not remove cached artifact {address[:12]}: {e}")
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            address, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._remove(address)
+            self.evictions += 1
+
+    def _maybe_save(self) -> None:
+        if self._dirty and time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self._save()
+
+    def _save(self) -> None:
+        self._last_save = time.monotonic()
+        try:
+            self._write(self.index_file, json.dumps({
+                'version': INDEX_VERSION,
+                'entries': list(self._entries.items())
+            }).encode())
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save cache index: {e}")
+
+    def _load(self) -> None:
+        entries = self._read_index()
+        if entries is None:
+            entries = self._scan()
+            self._dirty = True
+        self._entries = OrderedDict(entries)
+        self._bytes = sum(self._entries.values())
+        # The caps may have been lowered since the index was written
+        self._evict()
+        if self._dirty:
+            self._save()
+
+    def _read_index(self) -> Optional[Tuple[Tuple[str, int], ...]]:
+        if not self.index_file.exists():
+            return None
+        try:
+            data = json.loads(self.index_file.read_text())
+            if data.get('version') != INDEX_VERSION:
+                return None
+            return tuple((key, int(size)) for key, size in data['entries'])
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Cache index {self.index_file} unreadable, rebuilding: {e}")
+            return None
+
+    def _scan(self) -> Tuple[Tuple[str, int], ...]:
+        """Rebuild the index from the artifacts on disk, oldest first."""
+        found = []
+        for path in self.objects.glob("*/*"):
+            if path.suffix == '.tmp':
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_atime, path.parent.name + path.name, stat.st_size))
+        found.sort()
+        return tuple((address, size) for _, address, size in found)
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_file.write_bytes(data)
+            tmp_file.replace(path)
+        except OSError:
+            tmp_file.unlink(missing_ok=True)
+            raise
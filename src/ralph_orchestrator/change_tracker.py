@@ -0,0 +1,325 @@
+# ABOUTME: Workspace change tracking for Ralph Orchestrator checkpoints
+# ABOUTME: Records paths touched by the agent with inotify, falling back to git status
+
+"""Workspace change tracking for Ralph Orchestrator."""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import selectors
+import struct
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger('ralph-orchestrator.change_tracker')
+
+# Directories that are never watched
+SKIP_DIRS = {'.git', 'node_modules'}
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """Return libc if it provides inotify."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class ChangeTracker:
+    """Tracks which workspace paths changed since the last checkpoint.
+
+    On Linux, inotify watches every directory except SKIP_DIRS and
+    git-ignored ones, and a reader thread records touched paths. Elsewhere,
+    or when inotify runs out of watches, ``git status`` with the untracked
+    cache is used to find changes instead.
+
+    Paths are relative to the repository root. Paths recorded for removed
+    or moved-away directories end with ``/``.
+    """
+
+    def __init__(self, root: Path):
+        """Initialize the tracker.
+
+        Args:
+            root: Repository root to watch
+        """
+        self.root = root
+        self._libc = _load_libc()
+        self._fd: Optional[int] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._watches: Dict[int, str] = {}
+        self._watch_ids: Dict[str, int] = {}
+        self._touched: Set[str] = set()
+        self._overflowed = False
+        self._failed = self._libc is None
+
+    @classmethod
+    def for_repo(cls, path: Path) -> Optional['ChangeTracker']:
+        """Create a tracker rooted at the repository containing ``path``."""
+        result = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=str(path),
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            return None
+        return cls(Path(result.stdout.strip()))
+
+    @property
+    def backend(self) -> str:
+        return 'git-status' if self._failed else 'inotify'
+
+    def start(self) -> None:
+        """Start watching the workspace."""
+        if self._failed or self._thread:
+            return
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.info(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), using git status")
+            self._failed = True
+            return
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="ralph-change-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and release the inotify descriptor."""
+        if self._thread:
+            os.write(self._wake_w, b'x')
+            self._thread.join()
+            self._thread = None
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
+        self._watches.clear()
+        self._watch_ids.clear()
+
+    def reset(self) -> None:
+        """Forget recorded changes, e.g. after a full rescan."""
+        with self._lock:
+            self._touched.clear()
+            self._overflowed = False
+
+    def changed_paths(self, index_file: Path) -> Optional[List[str]]:
+        """Return and forget the paths changed since the last call.
+
+        Args:
+            index_file: Index that holds the last checkpoint, used by the
+                git status fallback
+
+        Returns:
+            Sorted paths, or None when changes were lost and a full rescan
+            is required
+        """
+        if self._failed:
+            paths = self._git_status(index_file)
+            if paths is not None:
+                with self._lock:
+                    self._touched = set(paths)
+            return paths
+
+        with self._lock:
+            touched, self._touched = self._touched, set()
+            overflowed, self._overflowed = self._overflowed, False
+        return None if overflowed else sorted(touched)
+
+    def touched_paths(self) -> List[str]:
+        """Paths touched since the last checkpoint (last known for git status)."""
+        with self._lock:
+            return sorted(self._touched)
+
+    def get_state(self, limit: int = 100) -> Dict[str, object]:
+        """Get tracker state for monitoring."""
+        touched = self.touched_paths()
+        return {
+            'backend': self.backend,
+            'touched_count': len(touched),
+            'touched': touched[:limit]
+        }
+
+    # -- git status fallback -------------------------------------------------
+
+    def _git_status(self, index_file: Path) -> Optional[List[str]]:
+        """List paths that differ from ``index_file`` using git status."""
+        env = os.environ.copy()
+        env['GIT_INDEX_FILE'] = str(index_file)
+        result = subprocess.run(
+            ["git", "-c", "core.untrackedCache=true", "status", "--porcelain", "-z",
+             "--untracked-files=all", "--no-renames"],
+            cwd=str(self.root),
+            env=env,
+            capture_output=True
+        )
+        if result.returncode != 0:
+            logger.warning(f"git status failed: {os.fsdecode(result.stderr).strip()}")
+            return None
+        # Each entry is "XY path"
+        return sorted(os.fsdecode(entry[3:]) for entry in result.stdout.split(b'\0') if entry)
+
+    # -- inotify -------------------------------------------------------------
+
+    def _run(self) -> None:
+        """Set up watches, then read events until stopped."""
+        try:
+            self._watch_tree('')
+        except OSError as e:
+            self._give_up(e)
+            return
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while True:
+                for key, _ in selector.select():
+                    if key.fd == self._wake_r:
+                        return
+                    try:
+                        self._read_events()
+                    except OSError as e:
+                        self._give_up(e)
+                        return
+
+    def _give_up(self, error: OSError) -> None:
+        """Switch to the git status fallback."""
+        logger.warning(f"inotify tracking stopped ({error}), using git status")
+        self._failed = True
+
+    def _read_events(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                with self._lock:
+                    self._overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._forget_watch(wd)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = f"{directory}{name}"
+
+            if not mask & IN_ISDIR:
+                with self._lock:
+                    self._touched.add(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                if name not in SKIP_DIRS:
+                    self._watch_tree(path + '/', record=True)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_tree(path + '/')
+                with self._lock:
+                    self._touched.add(path + '/')
+
+    def _watch_tree(self, top: str, record: bool = False) -> None:
+        """Watch ``top`` and its subdirectories, level by level.
+
+        Args:
+            top: Directory relative to the root, '' or ending in '/'
+            record: Record existing files as touched (for new directories)
+        """
+        level = [top]
+        while level:
+            subdirs: List[str] = []
+            for directory in self._unignored(level):
+                self._add_watch(directory)
+                try:
+                    entries = list(os.scandir(self.root / directory if directory else self.root))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            subdirs.append(f"{directory}{entry.name}/")
+                    elif record:
+                        with self._lock:
+                            self._touched.add(f"{directory}{entry.name}")
+            level = subdirs
+
+    def _add_watch(self, directory: str) -> None:
+        path = self.root / directory if directory else self.root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOSPC, errno.ENOMEM):
+                raise OSError(err, "inotify watch limit reached")
+            return
+        self._watches[wd] = directory
+        self._watch_ids[directory] = wd
+
+    def _unwatch_tree(self, top: str) -> None:
+        """Drop watches for a directory that was removed or moved away."""
+        for directory in [d for d in self._watch_ids if d.startswith(top)]:
+            wd = self._watch_ids.pop(directory)
+            self._watches.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _forget_watch(self, wd: int) -> None:
+        directory = self._watches.pop(wd, None)
+        if directory is not None and self._watch_ids.get(directory) == wd:
+            del self._watch_ids[directory]
+
+    def _unignored(self, directories: List[str]) -> List[str]:
+        """Filter out directories git ignores."""
+        candidates = [d for d in directories if d]
+        if not candidates:
+            return directories
+        result = subprocess.run(
+            ["git", "check-ignore", "--stdin", "-z"],
+            cwd=str(self.root),
+            input=b'\0'.join(os.fsencode(d) for d in candidates),
+            capture_output=True
+        )
+        ignored = {os.fsdecode(p) for p in result.stdout.split(b'\0') if p}
+        return [d for d in directories if d not in ignored]
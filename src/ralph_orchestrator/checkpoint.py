@@ -0,0 +1,278 @@
+# ABOUTME: Background git checkpoint engine for Ralph Orchestrator
+# ABOUTME: Snapshots the workspace on a worker thread with git plumbing and a private index
+
+"""Non-blocking git checkpoints for Ralph Orchestrator."""
+
+import logging
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .change_tracker import ChangeTracker
+
+logger = logging.getLogger('ralph-orchestrator.checkpoint')
+
+
+class CheckpointEngine:
+    """Creates git checkpoints on a dedicated thread.
+
+    Checkpoints are built with ``write-tree``/``commit-tree`` against a
+    private index and recorded on ``refs/ralph/checkpoints``, so they never
+    touch HEAD, the current branch or the user's index and cannot race the
+    agent's own commits. Requests that arrive while git is busy coalesce
+    into a single checkpoint of the latest state.
+
+    With a change tracker, only touched paths are restaged after the first
+    checkpoint instead of rescanning the whole workspace with ``add -A``.
+    """
+
+    REF = "refs/ralph/checkpoints"
+
+    def __init__(
+        self,
+        repo_dir: Optional[Path] = None,
+        on_checkpoint: Optional[Callable[[str, int], None]] = None,
+        tracker: Optional['ChangeTracker'] = None
+    ):
+        """Initialize the checkpoint engine.
+
+        Args:
+            repo_dir: Working tree to checkpoint (default: current directory)
+            on_checkpoint: Called with (commit id, iteration) after each checkpoint
+            tracker: Optional change tracker used to stage only touched paths
+        """
+        self.repo_dir = repo_dir or Path.cwd()
+        self.on_checkpoint = on_checkpoint
+        self.tracker = tracker
+        self.requested = 0
+        self.created = 0
+        self.coalesced = 0
+        self.failed = 0
+
+        self._index_file: Optional[Path] = None
+        self._indexed = False
+        self._pending: Optional[Tuple[int, str]] = None
+        self._busy = False
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- Public API ----------------------------------------------------------
+
+    def request(self, iteration: int, message: Optional[str] = None) -> None:
+        """Queue a checkpoint without waiting for git."""
+        with self._condition:
+            self.requested += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (iteration, message or f"Ralph checkpoint {iteration}")
+            self._condition.notify_all()
+        self._ensure_thread()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued checkpoints are written.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and not self._busy, timeout=timeout
+            )
+
+    def latest(self) -> Optional[str]:
+        """Return the newest checkpoint commit, if any."""
+        result = self._git("rev-parse", "--verify", "-q", self.REF)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def rollback(self) -> bool:
+        """Restore the working tree to the newest checkpoint.
+
+        Waits for in-flight checkpoints first. Files created since the
+        checkpoint are removed and changed files are restored; HEAD and the
+        current branch are left alone.
+
+        Returns:
+            True if the working tree was restored
+        """
+        self.flush()
+        with self._condition:
+            self._busy = True
+        try:
+            checkpoint = self.latest()
+            if not checkpoint:
+                logger.warning("No checkpoint to roll back to")
+                return False
+            current_tree = self._write_tree()
+            result = self._git(
+                "read-tree", "-m", "-u", current_tree, f"{checkpoint}^{{tree}}",
+                private_index=True
+            )
+            if result.returncode != 0:
+                logger.error(f"Failed to rollback: {result.stderr.strip()}")
+                return False
+            logger.info(f"Rolled back working tree to checkpoint {checkpoint[:8]}")
+            return True
+        finally:
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """Write any queued checkpoint and stop the worker thread."""
+        self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get checkpoint statistics."""
+        return {
+            "requested": self.requested,
+            "created": self.created,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+        }
+
+    # -- Worker thread -------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="ralph-checkpoints", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._stopping)
+                if self._pending is None:
+                    return
+                iteration, message = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                self._create(iteration, message)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Failed to create checkpoint: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _create(self, iteration: int, message: str) -> None:
+        """Snapshot the working tree onto the checkpoint ref."""
+        tree = self._write_tree()
+        parent = self.latest()
+        if parent is None:
+            head = self._git("rev-parse", "--verify", "-q", "HEAD")
+            parent = head.stdout.strip() if head.returncode == 0 else None
+        elif self._git("rev-parse", f"{parent}^{{tree}}").stdout.strip() == tree:
+            logger.debug("Workspace unchanged since last checkpoint")
+            return
+
+        parent_args: List[str] = ["-p", parent] if parent else []
+        commit = self._git("commit-tree", tree, *parent_args, "-m", message)
+        if commit.returncode != 0:
+            raise RuntimeError(commit.stderr.strip())
+        commit_id = commit.stdout.strip()
+
+        self._git("update-ref", "-m", message, self.REF, commit_id)
+        self.created += 1
+        logger.info(f"Created checkpoint {commit_id[:8]} for iteration {iteration}")
+        if self.on_checkpoint:
+            self.on_checkpoint(commit_id, iteration)
+
+    def _write_tree(self) -> str:
+        """Stage the working tree into the private index and write a tree."""
+        paths = None
+        if self.tracker and self._indexed:
+            paths = self.tracker.changed_paths(self._private_index())
+
+        if paths is None or not self._stage(paths):
+            # The first checkpoint of a run, or lost events, need a full scan
+            if self.tracker:
+                self.tracker.reset()
+            self._git("add", "-A", private_index=True)
+            self._indexed = True
+
+        result = self._git("write-tree", private_index=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return result.stdout.strip()
+
+    def _stage(self, paths: List[str]) -> bool:
+        """Stage only ``paths`` (relative to the tracker root) into the private index.
+
+        Returns:
+            False if staging failed and a full scan is needed
+        """
+        if not paths:
+            return True
+        root = self.tracker.root
+
+        # Directories that disappeared take their index entries with them
+        files = [p for p in paths if not p.endswith('/')]
+        gone_dirs = [p for p in paths if p.endswith('/') and not (root / p).is_dir()]
+        if gone_dirs:
+            listed = self._git("ls-files", "-z", "--", *gone_dirs, private_index=True, cwd=root)
+            files.extend(p for p in listed.stdout.split('\0') if p)
+
+        ignored = self._git(
+            "check-ignore", "--stdin", "-z",
+            private_index=True, cwd=root, input='\0'.join(files)
+        )
+        skip = {p for p in ignored.stdout.split('\0') if p}
+        staged = [p for p in files if p not in skip and not (root / p).is_dir()]
+
+        result = self._git(
+            "update-index", "--add", "--remove", "--replace", "-z", "--stdin",
+            private_index=True, cwd=root, input='\0'.join(staged)
+        )
+        if result.returncode != 0:
+            logger.debug(f"Incremental staging failed: {result.stderr.strip()}")
+            return False
+        logger.debug(f"Staged {len(staged)} changed paths")
+        return True
+
+    # -- Git helpers ---------------------------------------------------------
+
+    def _private_index(self) -> Path:
+        if self._index_file is None:
+            git_dir = self._git("rev-parse", "--path-format=absolute", "--git-dir").stdout.strip()
+            self._index_file = Path(git_dir) / "ralph-checkpoint.index"
+        return self._index_file
+
+    def _git(
+        self,
+        *args: str,
+        private_index: bool = False,
+        cwd: Optional[Path] = None,
+        input: Optional[str] = None
+    ) -> subprocess.CompletedProcess:
+        env = None
+        if private_index:
+            env = os.environ.copy()
+            env["GIT_INDEX_FILE"] = str(self._private_index())
+        result = subprocess.run(
+            ["git", *args],
+            cwd=str(cwd or self.repo_dir),
+            env=env,
+            input=os.fsencode(input) if input is not None else None,
+            capture_output=True
+        )
+        # Decode like os paths so unusual file names round-trip
+        return subprocess.CompletedProcess(
+            result.args, result.returncode,
+            os.fsdecode(result.stdout), os.fsdecode(result.stderr)
+        )
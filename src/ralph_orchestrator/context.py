@@ -3,14 +3,148 @@
 
 """Context management for Ralph Orchestrator."""
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
+from collections import Counter
 import hashlib
 import json
 import logging
+import os
+import selectors
+import sqlite3
+import threading
+import time
+
+from .tokens import TokenEstimator, get_estimator
+from .summarizer import RollingSummarizer, Summarize
+from .retrieval import RetrievalIndex
+from .cache_store import CacheStore, content_key
+from .prompt_layout import DYNAMIC, STABLE, TASKS, PromptCacheStats, PromptLayout, is_volatile
+from .prompt_diff import DELIVERY_MODES, SectionDiffer
+from .change_tracker import (
+    EVENT_HEADER, IN_CLOEXEC, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MODIFY,
+    IN_MOVED_FROM, IN_MOVED_TO, IN_NONBLOCK, IN_Q_OVERFLOW, _load_libc
+)
 
 logger = logging.getLogger('ralph-orchestrator.context')
 
+# Files modified this recently are re-hashed even when their stat is unchanged,
+# since a second write within the filesystem's timestamp granularity keeps the mtime
+RACY_WINDOW = 2.0
+
+# Quiet period after an inotify event before the change is reported
+WATCH_DEBOUNCE = 0.05
+
+
+@dataclass
+class PromptSection:
+    """A heading and the lines up to the next heading."""
+    
+    digest: str
+    text: str
+    important: List[str]  # Lines kept when the prompt is summarized
+
+
+@dataclass
+class PromptSnapshot:
+    """The prompt file as last read."""
+    
+    text: str
+    digest: str
+    stat_key: Tuple[int, int, int]  # (inode, mtime_ns, size)
+    sections: List[PromptSection] = field(default_factory=list)
+    version: int = 0
+
+
+class PromptWatcher:
+    """Reports edits to one file using inotify on its directory.
+    
+    The directory is watched rather than the file so that editors which
+    replace the file by renaming a new one over it are noticed too.
+    """
+    
+    def __init__(self, path: Path, on_change: Callable[[], None]):
+        self.path = path
+        self.on_change = on_change
+        self._libc = _load_libc()
+        self._fd: Optional[int] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+    
+    def start(self) -> bool:
+        """Start watching; returns False where inotify is unavailable."""
+        if self._libc is None or self._thread:
+            return self.active
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        directory = self.path.resolve().parent
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if self._libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return False
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="ralph-prompt-watcher", daemon=True)
+        self._thread.start()
+        return True
+    
+    def stop(self) -> None:
+        if self._thread:
+            os.write(self._wake_w, b'x')
+            self._thread.join()
+            self._thread = None
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
+    
+    def _run(self) -> None:
+        name = os.fsencode(self.path.name)
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while True:
+                changed = False
+                timeout = None
+                # Collect a burst of events (an editor save is several) into one report
+                while True:
+                    ready = selector.select(timeout)
+                    if not ready:
+                        break
+                    for key, _ in ready:
+                        if key.fd == self._wake_r:
+                            return
+                        changed = self._read_events(name) or changed
+                    if changed:
+                        timeout = WATCH_DEBOUNCE
+                try:
+                    self.on_change()
+                except Exception as e:
+                    logger.warning(f"Prompt change handler failed: {e}")
+    
+    def _read_events(self, name: bytes) -> bool:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            event_name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW or event_name == name:
+                changed = True
+        return changed
+
 
 class ContextManager:
     """Manage prompt context and optimization."""
@@ -18,20 +152,45 @@ class ContextManager:
     def __init__(
         self,
         prompt_file: Path,
-        max_context_size: int = 8000,
-        cache_dir: Path = Path(".agent/cache")
+        context_window: int = 200000,
+        context_threshold: float = 0.8,
+        cache_dir: Path = Path(".agent/cache"),
+        estimator: Optional[TokenEstimator] = None,
+        summarize: Optional[Summarize] = None,
+        retrieval_k: int = 5,
+        cache_store: Optional[CacheStore] = None,
+        prompt_delivery: str = "full"
     ):
         """Initialize context manager.
         
         Args:
             prompt_file: Path to the main prompt file
-            max_context_size: Maximum context size in characters
+            context_window: Model context window in tokens
+            context_threshold: Fraction of the context window the prompt may
+                fill; the rest is left for the agent's own work
             cache_dir: Directory for caching context
+            estimator: Token estimator (default: tiktoken if installed, else heuristic)
+            summarize: Optional (text, max_tokens) -> summary used to condense
+                older progress summaries instead of extractive ranking
+            retrieval_k: Past snippets relevant to the current task added to
+                the prompt (0 disables retrieval)
+            cache_store: Store for cached prefixes and summaries
+                (default: a bounded store under cache_dir)
+            prompt_delivery: "full" sends the whole prompt every iteration;
+                "delta" sends an agent session only the sections that changed
         """
+        if prompt_delivery not in DELIVERY_MODES:
+            raise ValueError(
+                f"Unknown prompt delivery {prompt_delivery!r}, expected one of {', '.join(DELIVERY_MODES)}"
+            )
         self.prompt_file = prompt_file
-        self.max_context_size = max_context_size
+        self.context_window = context_window
+        self.context_threshold = context_threshold
+        self.estimator = estimator or get_estimator()
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = cache_store or CacheStore(self.cache_dir / "store")
+        self._remove_legacy_cache()
         
         # Context components
         self.stable_prefix: Optional[str] = None
@@ -39,18 +198,160 @@ class ContextManager:
         self.error_history: List[str] = []
         self.success_patterns: List[str] = []
         
+        # Prior iterations are kept as a rolling, hierarchical summary
+        self.summarizer = RollingSummarizer(
+            self.cache_dir / "summary.json",
+            estimator=self.estimator,
+            summarize=summarize
+        )
+        self._prompt_summary: Optional[Tuple[Tuple[int, int, int], str]] = None
+        
+        # Prompts are laid out for provider prompt caching; hits are measured here
+        self.provider_cache = PromptCacheStats()
+        self._section_runs: Optional[Tuple[int, List[Tuple[str, str]]]] = None
+        
+        # Agent sessions that saw the last prompt can be sent just what changed
+        self.prompt_delivery = prompt_delivery
+        self.differ = SectionDiffer(estimator=self.estimator)
+        
+        # Every iteration is indexed so the most relevant past work can be recalled
+        self.retrieval_k = retrieval_k
+        self.retrieval: Optional[RetrievalIndex] = None
+        if retrieval_k > 0:
+            try:
+                self.retrieval = RetrievalIndex(self.cache_dir / "retrieval.db")
+            except sqlite3.Error as e:
+                logger.warning(f"Retrieval index unavailable ({e}), past work will not be recalled")
+        
+        # The prompt is re-read only when its stat or an inotify event says it changed
+        self.snapshot: Optional[PromptSnapshot] = None
+        self.version = 0  # Bumped whenever the prompt content changes
+        self.cache_stats: Counter = Counter()
+        self._dirty = False
+        self._watcher: Optional[PromptWatcher] = None
+        
         # Load initial prompt
         self._load_initial_prompt()
     
+    def _remove_legacy_cache(self) -> None:
+        """Delete prefix files written directly to cache_dir by older versions."""
+        for path in self.cache_dir.glob("prefix_*.txt"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    
     def _load_initial_prompt(self):
         """Load and analyze the initial prompt."""
-        if not self.prompt_file.exists():
+        if self.refresh() is None:
             logger.warning(f"Prompt file {self.prompt_file} not found")
-            return
+    
+    @property
+    def prompt_text(self) -> str:
+        """Current prompt file content ('' when it does not exist)."""
+        snapshot = self.refresh()
+        return snapshot.text if snapshot else ""
+    
+    def refresh(self) -> Optional[PromptSnapshot]:
+        """Return the prompt file, re-reading it only if it may have changed.
+        
+        The cache is keyed on inode, mtime and size and validated with a
+        content hash; only sections whose text changed are re-parsed.
+        
+        Returns:
+            The current snapshot, or None if the prompt file does not exist
+        """
+        try:
+            st = self.prompt_file.stat()
+        except FileNotFoundError:
+            if self.snapshot is not None:
+                self.snapshot = None
+                self.version += 1
+            return None
         
+        stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        racy = time.time() - st.st_mtime < RACY_WINDOW
+        snapshot = self.snapshot
+        if snapshot and snapshot.stat_key == stat_key and not self._dirty and not racy:
+            self.cache_stats['hits'] += 1
+            return snapshot
+        
+        self._dirty = False
         content = self.prompt_file.read_text()
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        if snapshot and snapshot.digest == digest:
+            # Touched or rewritten with the same content
+            snapshot.stat_key = stat_key
+            self.cache_stats['rehashed'] += 1
+            return snapshot
+        
+        self.version += 1
+        self.cache_stats['reloads'] += 1
+        self.snapshot = PromptSnapshot(
+            text=content,
+            digest=digest,
+            stat_key=stat_key,
+            sections=self._parse_sections(content, snapshot),
+            version=self.version
+        )
+        self._extract_stable_prefix(content)
+        return self.snapshot
+    
+    def watch(self, on_change: Optional[Callable[[], None]] = None) -> bool:
+        """Watch the prompt file for edits by the agent or a human.
+        
+        Args:
+            on_change: Called from the watcher thread after the file changed
         
-        # Extract stable prefix (instructions that don't change)
+        Returns:
+            True if inotify is watching; otherwise changes are found by stat
+        """
+        def changed():
+            self._dirty = True
+            if on_change:
+                on_change()
+        
+        if self._watcher is None:
+            self._watcher = PromptWatcher(self.prompt_file, changed)
+            if not self._watcher.start():
+                self._watcher = None
+                return False
+        return True
+    
+    def close(self) -> None:
+        """Stop watching the prompt file, save the summary statistics and close the index."""
+        self.summarizer.save(terms=True)
+        self.cache.flush()
+        if self.retrieval:
+            self.retrieval.close()
+            self.retrieval = None
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+    
+    def _parse_sections(self, content: str, previous: Optional[PromptSnapshot]) -> List[PromptSection]:
+        """Split the prompt at headings, reusing the parse of unchanged sections."""
+        known = {section.digest: section for section in previous.sections} if previous else {}
+        sections = []
+        lines: List[str] = []
+        for line in content.split('\n') + [None]:
+            if line is not None and not (line.startswith('#') and lines):
+                lines.append(line)
+                continue
+            text = '\n'.join(lines)
+            digest = hashlib.sha256(text.encode()).hexdigest()
+            section = known.get(digest)
+            if section is None:
+                section = PromptSection(digest, text, self._important_lines(lines))
+                self.cache_stats['sections_parsed'] += 1
+            else:
+                self.cache_stats['sections_reused'] += 1
+            sections.append(section)
+            lines = [line]
+        return sections
+    
+    def _extract_stable_prefix(self, content: str):
+        """Extract the stable prefix (instructions that don't change)."""
         lines = content.split('\n')
         stable_lines = []
         
@@ -66,30 +367,121 @@ class ContextManager:
         self.stable_prefix = '\n'.join(stable_lines)
         logger.info(f"Extracted stable prefix: {len(self.stable_prefix)} chars")
     
-    def get_prompt(self) -> str:
-        """Get the current prompt with optimizations."""
-        if not self.prompt_file.exists():
-            return ""
+    def get_prompt(self, task: Optional[str] = None, session: Optional[object] = None) -> str:
+        """Get the current prompt with optimizations.
         
-        base_content = self.prompt_file.read_text()
+        Args:
+            task: Description of the task being worked on; past work relevant
+                to it is recalled from the retrieval index
+            session: Agent conversation the prompt is for, if it persists
+                across iterations; in delta mode it may get only the changes.
+                Report what was delivered with confirm_delivery().
+        """
+        text = self.get_layout(task).render()
+        if self.prompt_delivery != "delta":
+            return text
+        pending = self.differ.prepare(text, session)
+        return pending.delta if pending.delta is not None else text
+    
+    @property
+    def full_prompt(self) -> Optional[str]:
+        """Full text of a delta from get_prompt(), for when the session was not resumed."""
+        pending = self.differ.pending
+        return pending.full if pending and pending.delta is not None else None
+    
+    def confirm_delivery(self, session: Optional[object], resumed: bool) -> None:
+        """Record which conversation received the last prompt in delta mode.
+        
+        Args:
+            session: Conversation the prompt went to (None for a one-shot call)
+            resumed: Whether that conversation had seen the previous prompt
+        """
+        if self.prompt_delivery == "delta":
+            self.differ.confirm(session, resumed)
+    
+    def get_layout(self, task: Optional[str] = None) -> PromptLayout:
+        """Assemble the prompt with the context that changes every iteration last.
+        
+        The prompt file comes first, in its own section order, so providers
+        can serve it from their cache up to the first section that changed;
+        the context added for this iteration follows it.
+        """
+        layout = PromptLayout()
+        snapshot = self.refresh()
+        if snapshot is None:
+            return layout
+        
+        base_content = snapshot.text
+        budget = self.token_budget
         
         # Check if we need to optimize
-        if len(base_content) > self.max_context_size:
-            return self._optimize_prompt(base_content)
+        used = self.estimator.count(base_content)
+        if used > budget:
+            layout.add(TASKS, self._optimize_prompt(base_content))
+            self.provider_cache.record_layout(layout)
+            return layout
         
-        # Add dynamic context if there's room
-        if self.dynamic_context:
-            context_addition = "\n\n## Previous Context\n" + "\n".join(self.dynamic_context[-3:])
-            if len(base_content) + len(context_addition) < self.max_context_size:
-                base_content += context_addition
+        for kind, text in self._split_sections(snapshot):
+            layout.add(kind, text)
         
-        # Add error history if relevant
-        if self.error_history:
-            error_addition = "\n\n## Recent Errors to Avoid\n" + "\n".join(self.error_history[-2:])
-            if len(base_content) + len(error_addition) < self.max_context_size:
-                base_content += error_addition
+        # Pack recent errors first (short, and they stop repeated mistakes),
+        # then past work relevant to the task, then as much of the previous
+        # context as still fits
+        error_addition, used = self._pack(
+            "\n\n## Recent Errors to Avoid\n", self.error_history[-2:], used, budget
+        )
+        relevant_addition = ""
+        if task and self.retrieval:
+            # Best match last: _pack keeps items from the end first
+            snippets = self.retrieval.search(task, self.retrieval_k)
+            relevant_addition, used = self._pack(
+                "\n\n## Relevant Past Work\n", [s.render() for s in reversed(snippets)], used, budget
+            )
+        context_addition, used = self._pack(
+            "\n\n## Previous Context\n", self.summarizer.entries(), used, budget
+        )
+        # Older summaries only change when they are merged, so they lead
+        layout.add(DYNAMIC, context_addition + relevant_addition + error_addition)
+        self.provider_cache.record_layout(layout)
+        return layout
+    
+    def _split_sections(self, snapshot: PromptSnapshot) -> List[Tuple[str, str]]:
+        """Split the prompt file, in order, into runs of stable and task sections."""
+        if self._section_runs and self._section_runs[0] == snapshot.version:
+            return self._section_runs[1]
+        runs: List[Tuple[str, str]] = []
+        for section in snapshot.sections:
+            kind = TASKS if is_volatile(section.text) else STABLE
+            if runs and runs[-1][0] == kind:
+                runs[-1] = (kind, runs[-1][1] + '\n' + section.text)
+            else:
+                runs.append((kind, ('\n' if runs else '') + section.text))
+        self._section_runs = (snapshot.version, runs)
+        return runs
+    
+    @property
+    def token_budget(self) -> int:
+        """Tokens the prompt and its added context may use."""
+        return int(self.context_window * self.context_threshold)
+    
+    def _pack(self, header: str, items: List[str], used: int, budget: int) -> Tuple[str, int]:
+        """Add the newest items that fit in the budget under a header.
         
-        return base_content
+        Returns:
+            The text to append ('' if nothing fits) and the new token total
+        """
+        count = self.estimator.count
+        total = used + count(header)
+        kept: List[str] = []
+        for item in reversed(items):
+            cost = count(item) + 1  # Plus the joining newline
+            if total + cost > budget:
+                break
+            kept.insert(0, item)
+            total += cost
+        if not kept:
+            return "", used
+        return header + "\n".join(kept), total
     
     def _optimize_prompt(self, content: str) -> str:
         """Optimize a prompt that's too large."""
@@ -98,20 +490,16 @@ class ContextManager:
         # Strategy 1: Use stable prefix caching
         if self.stable_prefix:
             # Cache the stable prefix
-            prefix_hash = hashlib.md5(self.stable_prefix.encode()).hexdigest()[:8]
-            cache_file = self.cache_dir / f"prefix_{prefix_hash}.txt"
-            
-            if not cache_file.exists():
-                cache_file.write_text(self.stable_prefix)
+            prefix_key = self.cache.put(self.stable_prefix, namespace="prefix")
             
             # Reference the cached prefix instead of including it
-            optimized = f"<!-- Using cached prefix {prefix_hash} -->\n"
+            optimized = f"<!-- Using cached prefix {prefix_key} -->\n"
             
             # Add the dynamic part
             dynamic_part = content[len(self.stable_prefix):]
             
-            # Truncate if still too large
-            if len(dynamic_part) > self.max_context_size - 100:
+            # Summarize if still too large
+            if self.estimator.count(dynamic_part) > self.token_budget - self.estimator.count(optimized):
                 dynamic_part = self._summarize_content(dynamic_part)
             
             optimized += dynamic_part
@@ -121,10 +509,49 @@ class ContextManager:
         return self._summarize_content(content)
     
     def _summarize_content(self, content: str) -> str:
-        """Summarize content to fit within limits."""
-        lines = content.split('\n')
+        """Summarize content to fit within limits.
+        
+        Structural lines (headings, tasks, TODOs) are always kept; the rest
+        of the budget goes to the highest-ranked of the remaining sentences.
+        """
+        key = (hash(content), len(content), self.token_budget)
+        if self._prompt_summary and self._prompt_summary[0] == key:
+            return self._prompt_summary[1]
         
-        # Keep headers and key instructions
+        # Summaries outlive the process, so a restart doesn't re-rank a huge prompt
+        store_key = content_key(content, str(self.token_budget), self.estimator.name)
+        summary = self.cache.get_text(store_key, namespace="prompt_summary")
+        if summary is not None:
+            self._prompt_summary = (key, summary)
+            return summary
+        
+        snapshot = self.snapshot
+        if snapshot and content == snapshot.text:
+            # Sections were already scanned when the prompt was loaded
+            important_lines = [line for section in snapshot.sections for line in section.important]
+        else:
+            important_lines = self._important_lines(content.split('\n'))
+        
+        summary = '\n'.join(important_lines)
+        spare = self.token_budget - self.estimator.count(summary) - 16
+        if spare > 0:
+            important = set(important_lines)
+            rest = '\n'.join(line for line in content.split('\n') if line not in important)
+            extra = self.summarizer.extract(rest, spare)
+            if extra:
+                summary += "\n\n" + extra
+        
+        # If still too long, truncate
+        if self.estimator.count(summary) > self.token_budget:
+            summary = self.estimator.truncate(summary, self.token_budget - 16) + "\n<!-- Content truncated -->"
+        
+        self.cache.put(summary, key=store_key, namespace="prompt_summary")
+        self._prompt_summary = (key, summary)
+        return summary
+    
+    @staticmethod
+    def _important_lines(lines: List[str]) -> List[str]:
+        """Keep headers and key instructions."""
         important_lines = []
         for line in lines:
             if any([
@@ -136,16 +563,9 @@ class ContextManager:
                 line.startswith('- [ ]'),  # Unchecked tasks
             ]):
                 important_lines.append(line)
-        
-        summary = '\n'.join(important_lines)
-        
-        # If still too long, truncate
-        if len(summary) > self.max_context_size:
-            summary = summary[:self.max_context_size - 100] + "\n<!-- Content truncated -->"
-        
-        return summary
+        return important_lines
     
-    def update_context(self, output: str):
+    def update_context(self, output: str, iteration: Optional[int] = None):
         """Update dynamic context based on agent output."""
         # Extract key information from output
         if "error" in output.lower():
@@ -163,16 +583,28 @@ class ContextManager:
             self.success_patterns.extend(success_lines[:1])
             self.success_patterns = self.success_patterns[-3:]
         
-        # Add to dynamic context (summarized)
-        if len(output) > 500:
-            summary = output[:200] + "..." + output[-200:]
-            self.dynamic_context.append(summary)
-        else:
-            self.dynamic_context.append(output)
+        # Fold the output into the rolling summary; its leaf is this iteration's summary
+        leaf = self.summarizer.add(output, iteration)
+        self.dynamic_context.append(leaf.text)
         
         # Keep dynamic context limited
         self.dynamic_context = self.dynamic_context[-5:]
     
+    def record_iteration(
+        self,
+        iteration: Optional[int],
+        output: str = "",
+        error: Optional[str] = None,
+        paths: Optional[List[str]] = None
+    ) -> None:
+        """Add an iteration's output, error and touched paths to the retrieval index."""
+        if not self.retrieval:
+            return
+        try:
+            self.retrieval.add(iteration, output, error, paths or ())
+        except sqlite3.Error as e:
+            logger.warning(f"Could not index iteration {iteration}: {e}")
+    
     def add_error_feedback(self, error: str):
         """Add error feedback to context."""
         self.error_history.append(f"Error: {error}")
@@ -183,6 +615,10 @@ class ContextManager:
         self.dynamic_context = []
         self.error_history = []
         self.success_patterns = []
+        self.summarizer.reset()
+        if self.retrieval:
+            self.retrieval.clear()
+        self.differ.reset()
         logger.info("Context reset")
     
     def get_stats(self) -> Dict:
@@ -192,5 +628,15 @@ class ContextManager:
             "dynamic_context_items": len(self.dynamic_context),
             "error_history_items": len(self.error_history),
             "success_patterns": len(self.success_patterns),
-            "cache_files": len(list(self.cache_dir.glob("*.txt")))
+            "cache": self.cache.get_stats(),
+            "token_budget": self.token_budget,
+            "prompt_tokens": self.estimator.count(self.snapshot.text) if self.snapshot else 0,
+            "tokens": self.estimator.get_stats(),
+            "summary": self.summarizer.get_stats(),
+            "retrieval": self.retrieval.get_stats() if self.retrieval else None,
+            "prompt_version": self.version,
+            "prompt_watch": 'inotify' if self._watcher else 'stat',
+            "prompt_cache": dict(self.cache_stats),
+            "provider_cache": self.provider_cache.get_stats(),
+            "delivery": {"mode": self.prompt_delivery, **self.differ.get_stats()}
         }
\ No newline at end of file
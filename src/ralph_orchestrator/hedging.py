@@ -0,0 +1,204 @@
+# ABOUTME: Hedged adapter execution for Ralph Orchestrator
+# ABOUTME: Races a backup adapter against a slow primary and keeps only the winner's edits
+
+"""Hedged (racing) adapter execution for Ralph Orchestrator."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .adapters.base import ToolAdapter, ToolResponse
+from .worktree import Worktree, git_common_dir, run_git, snapshot_worktree
+
+logger = logging.getLogger('ralph-orchestrator.hedging')
+
+
+class HedgePolicy:
+    """Decides how long to wait on an adapter before launching a backup.
+
+    The delay is the p95 of recent successful latencies for the adapter, so
+    only the slowest ~5% of calls get hedged once enough history exists.
+    """
+
+    def __init__(
+        self,
+        default_delay: float = 120.0,
+        percentile: float = 0.95,
+        min_samples: int = 5,
+        window: int = 50,
+        min_delay: float = 5.0
+    ):
+        """Initialize the hedge policy.
+
+        Args:
+            default_delay: Delay in seconds used until enough samples exist
+            percentile: Latency percentile that triggers a hedge
+            min_samples: Successful calls needed before using the percentile
+            window: Number of recent samples kept per adapter
+            min_delay: Lower bound on the hedge delay in seconds
+        """
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.hedges_launched = 0
+        self.hedges_won = 0
+
+    def record(self, adapter_name: str, latency: float, success: bool):
+        """Record the latency of a completed call."""
+        if success:
+            samples = self._latencies.setdefault(adapter_name, deque(maxlen=self.window))
+            samples.append(latency)
+
+    def delay_for(self, adapter_name: str) -> float:
+        """Seconds to wait on ``adapter_name`` before hedging."""
+        samples = self._latencies.get(adapter_name)
+        if not samples or len(samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return max(self.min_delay, ordered[index])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics."""
+        return {
+            "hedges_launched": self.hedges_launched,
+            "hedges_won": self.hedges_won,
+            "delays": {name: self.delay_for(name) for name in self._latencies}
+        }
+
+
+class HedgedExecutor:
+    """Runs adapters in scratch worktrees and races backups against slow calls."""
+
+    def __init__(self, policy: HedgePolicy, repo_dir: Optional[Path] = None, max_in_flight: int = 2):
+        """Initialize the executor.
+
+        Args:
+            policy: Policy that supplies hedge delays
+            repo_dir: Main working tree that receives the winner's edits
+            max_in_flight: Maximum adapters running at once for one iteration
+        """
+        self.policy = policy
+        self.repo_dir = repo_dir or Path.cwd()
+        self.max_in_flight = max_in_flight
+        self._worktrees: Dict[str, Worktree] = {}
+
+    async def execute(
+        self,
+        candidates: List[ToolAdapter],
+        prompt: str,
+        **kwargs
+    ) -> Tuple[ToolAdapter, ToolResponse]:
+        """Execute ``prompt`` on the candidates in order, hedging slow calls.
+
+        The first successful response wins; its workspace changes are applied
+        to the main working tree and every other attempt is cancelled.
+
+        Returns:
+            Tuple of (adapter that produced the response, response)
+        """
+        index_file = await git_common_dir(self.repo_dir) / "ralph-hedge.index"
+        snapshot = await snapshot_worktree(self.repo_dir, index_file, "Ralph hedge base")
+
+        pending = list(candidates)
+        running: Dict[asyncio.Task, Tuple[ToolAdapter, Worktree, float]] = {}
+        last: Tuple[ToolAdapter, ToolResponse] = (
+            candidates[0], ToolResponse(success=False, output="", error="No adapter ran")
+        )
+        last_launch = 0.0
+
+        async def launch():
+            nonlocal last_launch
+            adapter = pending.pop(0)
+            worktree = await self._worktree_for(adapter, snapshot)
+            call_kwargs = dict(kwargs, cwd=str(worktree.path))
+            if kwargs.get('prompt_file'):
+                call_kwargs['prompt_file'] = str(self._in_worktree(worktree, Path(kwargs['prompt_file'])))
+            task = asyncio.create_task(adapter.aexecute(prompt, **call_kwargs))
+            last_launch = time.time()
+            running[task] = (adapter, worktree, last_launch)
+            if len(running) > 1:
+                self.policy.hedges_launched += 1
+                logger.info(f"Hedging with {adapter.name}")
+
+        await launch()
+        try:
+            while running:
+                timeout = None
+                if pending and len(running) < self.max_in_flight:
+                    newest = max(running.values(), key=lambda entry: entry[2])[0]
+                    timeout = max(0.0, self.policy.delay_for(newest.name) - (time.time() - last_launch))
+
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    await launch()
+                    continue
+
+                for task in done:
+                    adapter, worktree, started = running.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        response = ToolResponse(success=False, output="", error=str(e))
+                    self.policy.record(adapter.name, time.time() - started, response.success)
+
+                    if response.success:
+                        if adapter is not candidates[0]:
+                            self.policy.hedges_won += 1
+                        await self._apply_changes(worktree, snapshot)
+                        return adapter, response
+                    logger.info(f"{adapter.name} failed: {response.error}")
+                    last = (adapter, response)
+
+                # A fast failure falls through to the next candidate immediately
+                if pending and len(running) < self.max_in_flight:
+                    await launch()
+            return last
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def _worktree_for(self, adapter: ToolAdapter, snapshot: str) -> Worktree:
+        """Return the adapter's scratch worktree, reset to ``snapshot``."""
+        worktree = self._worktrees.get(adapter.name)
+        if worktree is None:
+            worktree = await Worktree.create(self.repo_dir, f"hedge-{adapter.name}", snapshot)
+            self._worktrees[adapter.name] = worktree
+        await worktree.sync(snapshot)
+        return worktree
+
+    def _in_worktree(self, worktree: Worktree, path: Path) -> Path:
+        """Map a path in the main working tree into ``worktree``."""
+        try:
+            relative = path.resolve().relative_to(self.repo_dir.resolve())
+        except ValueError:
+            return path
+        return worktree.path / relative
+
+    async def _apply_changes(self, worktree: Worktree, snapshot: str):
+        """Apply the winner's edits to the main working tree."""
+        patch = await worktree.diff_since(snapshot)
+        if not patch:
+            return
+        result = await run_git(
+            "apply", "--binary", "--whitespace=nowarn", "-",
+            cwd=self.repo_dir, input=patch
+        )
+        if not result.ok:
+            logger.error(f"Failed to apply changes from {worktree.path}: {result.stderr.strip()}")
+
+    async def close(self):
+        """Remove scratch worktrees."""
+        for worktree in self._worktrees.values():
+            await worktree.remove()
+        self._worktrees.clear()
@@ -5,14 +5,11 @@
 import sys
 import logging
 import argparse
-import yaml
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
-from .orchestrator import RalphOrchestrator
-
 
 # Configuration defaults
 DEFAULT_MAX_ITERATIONS = 100
@@ -26,6 +23,16 @@ DEFAULT_CONTEXT_WINDOW = 200000  # 200K token context window
 DEFAULT_CONTEXT_THRESHOLD = 0.8  # Trigger summarization at 80% of context
 DEFAULT_METRICS_INTERVAL = 10  # Log metrics every 10 iterations
 DEFAULT_MAX_PROMPT_SIZE = 10485760  # 10MB max prompt file size
+DEFAULT_MAX_OUTPUT_SIZE = 10485760  # 10M characters of agent output kept per iteration
+DEFAULT_WORKERS = 1  # Serial loop; >1 runs parallel worktree workers
+DEFAULT_HEDGE_DELAY = 120.0  # Seconds before hedging until latency history exists
+DEFAULT_REPLAY_SPEED = 1.0  # Replay recorded sessions at their original pace
+DEFAULT_ITERATION_DELAY = 2.0  # Seconds between iterations; 0 for load tests
+DEFAULT_ROUTE_POLICY = "ucb"  # Bandit policy for --route (ucb or thompson)
+DEFAULT_TOKEN_ESTIMATOR = "auto"  # tiktoken when installed, else heuristic
+DEFAULT_SUMMARIZER = "extractive"  # Or an agent name to condense progress summaries
+DEFAULT_RETRIEVAL_K = 5  # Past snippets relevant to the current task added to the prompt
+DEFAULT_PROMPT_DELIVERY = "full"  # Or "delta": agent sessions get only the changed sections
 
 # Token costs per million (approximate)
 TOKEN_COSTS = {
@@ -50,8 +57,46 @@ class AgentType(Enum):
     CODEX = "codex"
     Q = "q"
     GEMINI = "gemini"
+    REPLAY = "replay"
+    MOCK = "mock"
     AUTO = "auto"
 
+# Agents that take an argument, written as "name:argument": (description, required)
+AGENT_ARGUMENTS = {
+    "replay": ("session file", True),
+    "mock": ("profile", False),
+}
+
+
+def split_agent_spec(spec: str) -> Tuple[str, Optional[str]]:
+    """Split an agent spec such as "replay:session.ralph" into name and argument."""
+    name, sep, argument = spec.partition(":")
+    if name in AGENT_ARGUMENTS:
+        return name, argument or None
+    return spec, None
+
+
+def agent_spec(choices: List[str]):
+    """Build an argparse type accepting ``choices`` and "name:argument" agents."""
+    def parse(value: str) -> str:
+        name, argument = split_agent_spec(value)
+        if name in AGENT_ARGUMENTS:
+            description, required = AGENT_ARGUMENTS[name]
+            if required and not argument:
+                raise argparse.ArgumentTypeError(
+                    f"{name} needs a {description}: --agent {name}:<{description}>"
+                )
+        elif name not in choices:
+            raise argparse.ArgumentTypeError(
+                f"invalid choice: {value!r} (choose from {', '.join(choices)}, "
+                + ", ".join(
+                    f"{n}:<{d}>" if required else f"{n}[:<{d}>]"
+                    for n, (d, required) in AGENT_ARGUMENTS.items()
+                ) + ")"
+            )
+        return value
+    return parse
+
 @dataclass
 class AdapterConfig:
     """Configuration for individual adapters"""
@@ -60,6 +105,11 @@ class AdapterConfig:
     env: Dict[str, str] = field(default_factory=dict)
     timeout: int = 300
     max_retries: int = 3
+    # Client-side provider limits, shared by the orchestrators of a process
+    # (or of the host, with rate_limit_store)
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    max_concurrent: Optional[int] = None
 
 @dataclass
 class RalphConfig:
@@ -81,8 +131,26 @@ class RalphConfig:
     metrics_interval: int = DEFAULT_METRICS_INTERVAL
     enable_metrics: bool = True
     max_prompt_size: int = DEFAULT_MAX_PROMPT_SIZE
+    max_output_size: int = DEFAULT_MAX_OUTPUT_SIZE
     allow_unsafe_paths: bool = False
     strict_mode: bool = False
+    workers: int = DEFAULT_WORKERS
+    hedge: bool = False
+    hedge_delay: float = DEFAULT_HEDGE_DELAY
+    claude_session: bool = False
+    replay_session: Optional[str] = None
+    replay_speed: float = DEFAULT_REPLAY_SPEED
+    record_session: Optional[str] = None
+    mock_profile: Optional[str] = None
+    iteration_delay: float = DEFAULT_ITERATION_DELAY
+    route: bool = False
+    route_policy: str = DEFAULT_ROUTE_POLICY
+    route_max_cost: Optional[float] = None
+    rate_limit_store: Optional[str] = None
+    token_estimator: str = DEFAULT_TOKEN_ESTIMATOR
+    summarizer: str = DEFAULT_SUMMARIZER
+    retrieval_k: int = DEFAULT_RETRIEVAL_K
+    prompt_delivery: str = DEFAULT_PROMPT_DELIVERY
     agent_args: List[str] = field(default_factory=list)
     adapters: Dict[str, AdapterConfig] = field(default_factory=dict)
     
@@ -93,12 +161,19 @@ class RalphConfig:
         if not config_file.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
         
+        import yaml
+        
         with open(config_file, 'r') as f:
             config_data = yaml.safe_load(f)
         
         # Convert agent string to AgentType enum
         if 'agent' in config_data:
-            config_data['agent'] = AgentType(config_data['agent'])
+            name, argument = split_agent_spec(config_data['agent'])
+            config_data['agent'] = AgentType(name)
+            if name == 'replay':
+                config_data['replay_session'] = argument
+            elif name == 'mock':
+                config_data['mock_profile'] = argument
         
         # Process adapter configurations
         if 'adapters' in config_data:
@@ -129,10 +204,29 @@ def main():
     
     parser.add_argument(
         "--agent", "-a",
-        type=str,
-        choices=["codex", "claude", "q", "gemini", "auto"],
+        type=agent_spec(["codex", "claude", "q", "gemini", "auto"]),
         default="codex",
-        help="AI agent to use (default: codex)"
+        help="AI agent to use: codex, claude, q, gemini, auto, replay:<session> or mock[:<profile>] (default: codex)"
+    )
+    
+    parser.add_argument(
+        "--iteration-delay",
+        type=float,
+        default=DEFAULT_ITERATION_DELAY,
+        help=f"Seconds to pause between iterations (default: {DEFAULT_ITERATION_DELAY})"
+    )
+    
+    parser.add_argument(
+        "--record",
+        metavar="SESSION",
+        help="Record agent responses to a session file for offline replay"
+    )
+    
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=DEFAULT_REPLAY_SPEED,
+        help="Replay speed relative to the recording, 0 for no delays (default: 1.0)"
     )
     
     parser.add_argument(
@@ -261,8 +355,9 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Create config
+    agent_name, agent_argument = split_agent_spec(args.agent)
     config = RalphConfig(
-        agent=AgentType(args.agent),
+        agent=AgentType(agent_name),
         prompt_file=args.prompt,
         max_iterations=args.max_iterations,
         max_runtime=args.max_runtime,
@@ -280,10 +375,16 @@ def main():
         enable_metrics=not args.no_metrics,
         max_prompt_size=args.max_prompt_size,
         allow_unsafe_paths=args.allow_unsafe_paths,
+        replay_session=agent_argument if agent_name == "replay" else None,
+        replay_speed=args.replay_speed,
+        record_session=args.record,
+        mock_profile=agent_argument if agent_name == "mock" else None,
+        iteration_delay=args.iteration_delay,
         agent_args=args.agent_args
     )
     
     # Run orchestrator
+    from .orchestrator import RalphOrchestrator
     orchestrator = RalphOrchestrator(config)
     return orchestrator.run()
 
@@ -25,6 +25,13 @@ class Metrics:
         """Get elapsed time in hours."""
         return (time.time() - self.start_time) / 3600
     
+    def iterations_per_hour(self) -> float:
+        """Calculate completed iterations per hour of wall-clock time."""
+        hours = self.elapsed_hours()
+        if hours <= 0:
+            return 0.0
+        return (self.successful_iterations + self.failed_iterations) / hours
+    
     def success_rate(self) -> float:
         """Calculate success rate."""
         total = self.successful_iterations + self.failed_iterations
@@ -42,7 +49,8 @@ class Metrics:
             "checkpoints": self.checkpoints,
             "rollbacks": self.rollbacks,
             "elapsed_hours": self.elapsed_hours(),
-            "success_rate": self.success_rate()
+            "success_rate": self.success_rate(),
+            "iterations_per_hour": self.iterations_per_hour()
         }
     
     def to_json(self) -> str:
@@ -98,10 +106,7 @@ class CostTracker:
         if tool not in self.COSTS:
             tool = "qchat"  # Default to free tier
         
-        costs = self.COSTS[tool]
-        input_cost = (input_tokens / 1000) * costs["input"]
-        output_cost = (output_tokens / 1000) * costs["output"]
-        total = input_cost + output_cost
+        total = self.estimate(tool, input_tokens, output_tokens)
         
         # Update tracking
         self.total_cost += total
@@ -120,6 +125,14 @@ class CostTracker:
         
         return total
     
+    @classmethod
+    def estimate(cls, tool: str, input_tokens: int, output_tokens: int) -> float:
+        """Price usage without recording it."""
+        costs = cls.COSTS.get(tool, cls.COSTS["qchat"])
+        input_cost = (input_tokens / 1000) * costs["input"]
+        output_cost = (output_tokens / 1000) * costs["output"]
+        return input_cost + output_cost
+    
     def get_summary(self) -> Dict:
         """Get cost summary."""
         return {
@@ -7,22 +7,32 @@ import os
 import sys
 import time
 import signal
+import threading
 import logging
-import subprocess
 import asyncio
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List, Callable, Set
+from collections import Counter
 from dataclasses import dataclass, field
 import json
 from datetime import datetime
 
-from .adapters.base import ToolAdapter, ToolResponse
-from .adapters.claude import ClaudeAdapter
-from .adapters.qchat import QChatAdapter
-from .adapters.gemini import GeminiAdapter
+from .adapters.base import (
+    EVENT_ERROR, EVENT_TEXT, EVENT_TOOL_RESULT, EVENT_TOOL_USE,
+    StreamEvent, ToolAdapter, ToolResponse
+)
+from .adapters.transcript import DEFAULT_TRANSCRIPT_DIR
+from .adapters.availability import AdapterRegistry, probe_adapters
 from .metrics import Metrics, CostTracker
 from .safety import SafetyGuard
 from .context import ContextManager
+from .tokens import get_estimator
+from .scheduler import TaskScheduler
+from .hedging import HedgePolicy, HedgedExecutor
+from .routing import AdapterRouter
+from .ratelimit import ProviderLimiter, ProviderLimits, get_limiter
+from .checkpoint import CheckpointEngine
+from .change_tracker import ChangeTracker
 
 # Setup logging
 logging.basicConfig(
@@ -30,6 +40,7 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('ralph-orchestrator')
+stream_logger = logging.getLogger('ralph-orchestrator.stream')
 
 
 class RalphOrchestrator:
@@ -46,7 +57,28 @@ class RalphOrchestrator:
         checkpoint_interval: int = 5,
         archive_dir: str = "./prompts/archive",
         verbose: bool = False,
-        strict_mode: bool = False
+        strict_mode: bool = False,
+        workers: int = 1,
+        hedge: bool = False,
+        hedge_delay: float = 120.0,
+        claude_session: bool = False,
+        context_window: int = 200000,
+        context_threshold: float = 0.8,
+        max_output_size: int = 10485760,
+        replay_session: Optional[str] = None,
+        replay_speed: float = 1.0,
+        record_session: Optional[str] = None,
+        mock_profile: Optional[str] = None,
+        iteration_delay: float = 2.0,
+        route: bool = False,
+        route_policy: str = "ucb",
+        route_max_cost: Optional[float] = None,
+        rate_limits: Optional[Dict[str, Any]] = None,
+        rate_limit_store: Optional[str] = None,
+        token_estimator: str = "auto",
+        summarizer: str = "extractive",
+        retrieval_k: int = 5,
+        prompt_delivery: str = "full"
     ):
         """Initialize the orchestrator.
         
@@ -60,6 +92,39 @@ class RalphOrchestrator:
             checkpoint_interval: Git checkpoint frequency
             archive_dir: Directory for prompt archives
             verbose: Enable verbose logging output
+            strict_mode: Never fall back to other adapters
+            workers: Number of parallel worktree workers (1 = serial loop)
+            hedge: Race a backup adapter against a slow primary instead of
+                falling back sequentially
+            hedge_delay: Hedge delay in seconds until latency history exists
+            claude_session: Keep one Claude session across iterations
+            context_window: Model context window in tokens
+            context_threshold: Fraction of the context window after which the
+                Claude session is restarted
+            max_output_size: Characters of agent output kept in memory per
+                iteration; the middle of longer output is dropped
+            replay_session: Session file to play back instead of running agents
+            replay_speed: Replay speed relative to the recording (0 = no delays)
+            record_session: Record every agent response to this session file
+            mock_profile: Profile file for the mock agent (default profile if None)
+            iteration_delay: Seconds to pause between iterations
+            route: Pick the adapter for each iteration by observed throughput
+                instead of always starting with primary_tool
+            route_policy: Routing bandit policy ("ucb" or "thompson")
+            route_max_cost: Cost ceiling per successful iteration for routing
+            rate_limits: Provider limits per adapter name (AdapterConfig,
+                ProviderLimits or dict with requests_per_minute,
+                tokens_per_minute and max_concurrent)
+            rate_limit_store: SQLite file to share the rate limits with
+                orchestrators in other processes
+            token_estimator: Token counting for context budgets ("auto",
+                "tiktoken" or "heuristic")
+            summarizer: How older progress summaries are condensed:
+                "extractive" (local TF-IDF ranking) or an agent name
+            retrieval_k: Snippets of past iterations relevant to the current
+                task added to the prompt (0 disables retrieval)
+            prompt_delivery: "full", or "delta" to send a resumed agent
+                session only the prompt sections that changed
         """
         # Handle both config object and individual parameters
         if hasattr(prompt_file_or_config, 'prompt_file'):
@@ -75,6 +140,27 @@ class RalphOrchestrator:
             self.archive_dir = Path(config.archive_dir if hasattr(config, 'archive_dir') else archive_dir)
             self.verbose = config.verbose if hasattr(config, 'verbose') else False
             self.strict_mode = config.strict_mode if hasattr(config, 'strict_mode') else False
+            self.workers = config.workers if hasattr(config, 'workers') else workers
+            self.hedge = config.hedge if hasattr(config, 'hedge') else hedge
+            self.hedge_delay = config.hedge_delay if hasattr(config, 'hedge_delay') else hedge_delay
+            self.claude_session = config.claude_session if hasattr(config, 'claude_session') else claude_session
+            self.context_window = config.context_window if hasattr(config, 'context_window') else context_window
+            self.context_threshold = config.context_threshold if hasattr(config, 'context_threshold') else context_threshold
+            self.max_output_size = config.max_output_size if hasattr(config, 'max_output_size') else max_output_size
+            self.replay_session = getattr(config, 'replay_session', replay_session)
+            self.replay_speed = getattr(config, 'replay_speed', replay_speed)
+            self.record_session = getattr(config, 'record_session', record_session)
+            self.mock_profile = getattr(config, 'mock_profile', mock_profile)
+            self.iteration_delay = getattr(config, 'iteration_delay', iteration_delay)
+            self.route = getattr(config, 'route', route)
+            self.route_policy = getattr(config, 'route_policy', route_policy)
+            self.route_max_cost = getattr(config, 'route_max_cost', route_max_cost)
+            self.rate_limits = getattr(config, 'adapters', rate_limits)
+            self.rate_limit_store = getattr(config, 'rate_limit_store', rate_limit_store)
+            self.token_estimator = getattr(config, 'token_estimator', token_estimator)
+            self.summarizer = getattr(config, 'summarizer', summarizer)
+            self.retrieval_k = getattr(config, 'retrieval_k', retrieval_k)
+            self.prompt_delivery = getattr(config, 'prompt_delivery', prompt_delivery)
         else:
             # Individual parameters
             self.prompt_file = Path(prompt_file_or_config if prompt_file_or_config else "PROMPT.md")
@@ -87,14 +173,80 @@ class RalphOrchestrator:
             self.archive_dir = Path(archive_dir)
             self.verbose = verbose
             self.strict_mode = strict_mode
+            self.workers = workers
+            self.hedge = hedge
+            self.hedge_delay = hedge_delay
+            self.claude_session = claude_session
+            self.context_window = context_window
+            self.context_threshold = context_threshold
+            self.max_output_size = max_output_size
+            self.replay_session = replay_session
+            self.replay_speed = replay_speed
+            self.record_session = record_session
+            self.mock_profile = mock_profile
+            self.iteration_delay = iteration_delay
+            self.route = route
+            self.route_policy = route_policy
+            self.route_max_cost = route_max_cost
+            self.rate_limits = rate_limits
+            self.rate_limit_store = rate_limit_store
+            self.token_estimator = token_estimator
+            self.summarizer = summarizer
+            self.retrieval_k = retrieval_k
+            self.prompt_delivery = prompt_delivery
         
         # Initialize components
         self.metrics = Metrics()
         self.cost_tracker = CostTracker() if track_costs else None
         self.safety_guard = SafetyGuard(max_iterations, max_runtime, max_cost)
-        self.context_manager = ContextManager(self.prompt_file)
+        # The prompt is packed to the model's token budget, not a character count
+        self.tokens = get_estimator(self.token_estimator)
+        self.context_manager = ContextManager(
+            self.prompt_file,
+            context_window=self.context_window,
+            context_threshold=self.context_threshold,
+            estimator=self.tokens,
+            summarize=self._agent_summarize if self.summarizer != 'extractive' else None,
+            retrieval_k=self.retrieval_k,
+            prompt_delivery=self.prompt_delivery
+        )
+        self._indexed_paths: Set[str] = set()  # Touched paths already in the retrieval index
+        self._task_prompt_version: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._summary_adapter: Optional[ToolAdapter] = None  # Adapter of a running agent summary
+        
+        # Adapter output is streamed to these subscribers as it arrives
+        self.stream_subscribers: List[Callable[[str, StreamEvent], None]] = [self._log_stream_event]
+        self.stream_events: Counter = Counter()
+        self.last_tool: Optional[str] = None
+        
+        # Large agent output is spilled to per-iteration transcripts
+        self.transcript_dir = Path.cwd() / DEFAULT_TRANSCRIPT_DIR
+        
+        # Provider limits are shared with every orchestrator in the process
+        # (or on the host, with a rate limit store); each run queues as one owner
+        self.rate_limiters: Dict[str, ProviderLimiter] = {}
+        self.rate_limit_owner = f"{os.getpid()}:{id(self)}"
+        for name, limits in (self.rate_limits or {}).items():
+            limits = ProviderLimits.from_config(limits)
+            if limits.enabled:
+                name = {'q': 'qchat'}.get(name, name)
+                self.rate_limiters[name] = get_limiter(name, limits, self.rate_limit_store)
+        self._rate_limited = False
+        
+        # Offline runs play back a recorded session; recording wraps real adapters
+        self.replay = None
+        if self.replay_session:
+            from .adapters.replay import ReplaySession
+            self.replay = ReplaySession(self.replay_session)
+            self.primary_tool = primary_tool = 'replay'
+        self.recorder = None
+        if self.record_session:
+            from .adapters.replay import SessionRecorder
+            self.recorder = SessionRecorder(self.record_session)
         
         # Initialize adapters
+        self.adapter_settings: Dict[str, Dict[str, Any]] = {}
         self.adapters = self._initialize_adapters()
 
         # Map CLI agent names to adapter names
@@ -102,10 +254,13 @@ class RalphOrchestrator:
             'codex': 'codex',
             'q': 'qchat',
             'claude': 'claude',
-            'gemini': 'gemini'
+            'gemini': 'gemini',
+            'replay': 'replay',
+            'mock': 'mock'
         }
 
         adapter_name = agent_mapping.get(primary_tool, primary_tool)
+        self.primary_adapter_name = adapter_name
         self.current_adapter = self.adapters.get(adapter_name)
 
         if not self.current_adapter:
@@ -114,73 +269,197 @@ class RalphOrchestrator:
         
         # Signal handling
         self.stop_requested = False
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+        self._install_signal_handlers()
         
-        # Task queue tracking
-        self.task_queue = []  # List of pending tasks extracted from prompt
+        # Task tracking - the DAG is persisted so restarts resume where they left off
+        self.task_scheduler = TaskScheduler(Path(".agent") / "tasks.json")
+        self.task_scheduler.load()
         self.current_task = None  # Currently executing task
-        self.completed_tasks = []  # List of completed tasks with results
         self.task_start_time = None  # Start time of current task
         
+        # Parallel worker pool (only used when workers > 1)
+        self.parallel_runner = None
+        
+        # Hedged execution races fallback adapters in scratch worktrees
+        self.hedge_policy = HedgePolicy(default_delay=self.hedge_delay) if self.hedge else None
+        self.hedged_executor = HedgedExecutor(self.hedge_policy) if self.hedge else None
+        
+        # Adaptive routing picks each iteration's adapter; stats carry over between runs
+        self.router = None
+        if self.route and self.strict_mode:
+            logger.warning("Strict mode enabled: ignoring adapter routing")
+        elif self.route:
+            self.router = AdapterRouter(
+                Path(".agent") / "routing.json",
+                policy=self.route_policy,
+                cost_ceiling=self.route_max_cost
+            )
+            self.router.load()
+        self._route_order: List[str] = []
+        
+        # Git checkpoints are written on a background thread and only restage
+        # the paths the agent touched
+        self.change_tracker = ChangeTracker.for_repo(Path.cwd())
+        self.checkpoint_engine = CheckpointEngine(
+            on_checkpoint=self._on_checkpoint,
+            tracker=self.change_tracker
+        )
+        
         # Create directories
         self.archive_dir.mkdir(parents=True, exist_ok=True)
         Path(".agent").mkdir(exist_ok=True)
         
         logger.info(f"Ralph Orchestrator initialized with {primary_tool}")
     
-    def _initialize_adapters(self) -> Dict[str, ToolAdapter]:
-        """Initialize available adapters."""
-        adapters = {}
+    def _create_adapter(self, name: str, available: Optional[bool] = None, dedicated: bool = False) -> ToolAdapter:
+        """Construct a new adapter instance by name, applying stored settings.
         
-        # Try to initialize each adapter
-        try:
+        Args:
+            name: Adapter name
+            available: Known availability, skipping the adapter's own check
+            dedicated: For the orchestrator's own calls (summaries): no
+                persistent session, not recorded, output not streamed to
+                subscribers
+        """
+        if name == 'codex':
             from .adapters.codex import CodexAdapter
-            adapter = CodexAdapter(verbose=self.verbose)
-            if adapter.available:
-                adapters['codex'] = adapter
-                logger.info("Codex adapter initialized")
-            else:
-                logger.warning("Codex CLI not available")
-        except Exception as e:
-            logger.warning(f"Codex adapter error: {e}")
-
-        try:
-            adapter = ClaudeAdapter(verbose=self.verbose)
-            if adapter.available:
-                adapters['claude'] = adapter
-                logger.info("Claude adapter initialized")
-            else:
-                logger.warning("Claude SDK not available")
-        except Exception as e:
-            logger.warning(f"Claude adapter error: {e}")
+            adapter = CodexAdapter(verbose=self.verbose, available=available)
+        elif name == 'claude':
+            from .adapters.claude import ClaudeAdapter
+            adapter = ClaudeAdapter(verbose=self.verbose, available=available)
+        elif name == 'qchat':
+            from .adapters.qchat import QChatAdapter
+            adapter = QChatAdapter(available=available)
+        elif name == 'gemini':
+            from .adapters.gemini import GeminiAdapter
+            adapter = GeminiAdapter(available=available)
+        elif name == 'replay' and self.replay:
+            from .adapters.replay import ReplayAdapter
+            adapter = ReplayAdapter(self.replay, speed=self.replay_speed, available=available)
+        elif name == 'mock':
+            from .adapters.mock import MockAdapter, MockProfile
+            profile = MockProfile.from_file(self.mock_profile) if self.mock_profile else None
+            adapter = MockAdapter(profile, available=available)
+        else:
+            raise ValueError(f"Unknown adapter: {name}")
         
-        try:
-            adapter = QChatAdapter()
-            if adapter.available:
-                adapters['qchat'] = adapter
-                logger.info("Q Chat adapter initialized")
-            else:
-                logger.warning("Q Chat CLI not available")
-        except Exception as e:
-            logger.warning(f"Q Chat adapter error: {e}")
+        settings = self.adapter_settings.get(name)
+        if settings and hasattr(adapter, 'configure'):
+            adapter.configure(**settings)
+        if self.claude_session and hasattr(adapter, 'enable_session') and not dedicated:
+            adapter.enable_session(self.context_window, self.context_threshold)
+        if self.recorder and not dedicated:
+            from .adapters.replay import RecordingAdapter
+            adapter = RecordingAdapter(adapter, self.recorder)
+        adapter.max_output_size = self.max_output_size
+        adapter.transcript_dir = self.transcript_dir
+        adapter.rate_limiter = self.rate_limiters.get(name)
+        adapter.rate_limit_owner = self.rate_limit_owner
+        if not dedicated:
+            adapter.subscribe(self._on_stream_event)
+        return adapter
+    
+    def _initialize_adapters(self) -> AdapterRegistry:
+        """Probe adapters concurrently; each adapter is built on first use."""
+        labels = {
+            'codex': 'Codex CLI',
+            'claude': 'Claude SDK',
+            'qchat': 'Q Chat CLI',
+            'gemini': 'Gemini CLI',
+            'replay': f'Replay of {self.replay_session}',
+            'mock': 'Mock agent',
+        }
         
-        try:
-            adapter = GeminiAdapter()
-            if adapter.available:
-                adapters['gemini'] = adapter
-                logger.info("Gemini adapter initialized")
+        if self.replay:
+            # Replays never touch the real agents, so skip probing for them
+            availability = {'replay': bool(self.replay.turns)}
+        elif self.primary_tool == 'mock':
+            availability = {'mock': True}
+        else:
+            availability = probe_adapters()
+        for name, available in availability.items():
+            if available:
+                logger.info(f"{labels.get(name, name)} available")
             else:
-                logger.warning("Gemini CLI not available")
-        except Exception as e:
-            logger.warning(f"Gemini adapter error: {e}")
+                logger.warning(f"{labels.get(name, name)} not available")
         
-        return adapters
+        return AdapterRegistry(availability, self._create_adapter)
+    
+    def configure_adapter(self, name: str, **settings) -> None:
+        """Configure an adapter and remember the settings for later instances."""
+        self.adapter_settings[name] = settings
+        adapter = self.adapters.loaded(name)
+        if adapter is not None and hasattr(adapter, 'configure'):
+            adapter.configure(**settings)
+    
+    def subscribe_stream(self, callback: Callable[[str, StreamEvent], None]) -> None:
+        """Receive (adapter name, event) for all adapter output as it streams."""
+        self.stream_subscribers.append(callback)
+    
+    def unsubscribe_stream(self, callback: Callable[[str, StreamEvent], None]) -> None:
+        if callback in self.stream_subscribers:
+            self.stream_subscribers.remove(callback)
+    
+    def _on_stream_event(self, adapter_name: str, event: StreamEvent) -> None:
+        """Track streamed adapter output and fan it out to subscribers."""
+        self.stream_events[event.kind] += 1
+        if event.kind == EVENT_TEXT:
+            self.stream_events['text_chars'] += len(event.text)
+        elif event.kind == EVENT_TOOL_USE:
+            self.last_tool = event.data.get('name')
+        
+        for callback in list(self.stream_subscribers):
+            try:
+                callback(adapter_name, event)
+            except Exception as e:
+                logger.debug(f"Stream subscriber failed: {e}")
+    
+    def _log_stream_event(self, adapter_name: str, event: StreamEvent) -> None:
+        """Log streamed adapter output."""
+        if event.kind == EVENT_TOOL_USE:
+            stream_logger.info(f"[{adapter_name}] tool use: {event.data.get('name')}")
+        elif event.kind == EVENT_TOOL_RESULT and event.data.get('is_error'):
+            stream_logger.info(f"[{adapter_name}] tool error: {event.text[:200]}")
+        elif event.kind in (EVENT_TEXT, EVENT_ERROR):
+            stream_logger.debug(f"[{adapter_name}] {event.kind}: {event.text[:200]}")
+    
+    def _create_worker_adapter(self) -> ToolAdapter:
+        """Create a private instance of the primary adapter for a worker."""
+        return self._create_adapter(self.primary_adapter_name, available=True)
+    
+    @property
+    def task_queue(self) -> List[Dict[str, Any]]:
+        """Pending tasks in dispatch order."""
+        return self.task_scheduler.pending()
+    
+    @property
+    def completed_tasks(self) -> List[Dict[str, Any]]:
+        """Completed tasks, oldest first."""
+        return self.task_scheduler.completed()
+    
+    def _install_signal_handlers(self) -> None:
+        """Route SIGINT and SIGTERM to _signal_handler, unless something replaced it."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            if signal.getsignal(signum) != self._signal_handler:
+                signal.signal(signum, self._signal_handler)
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals."""
         logger.info(f"Received signal {signum}, initiating graceful shutdown...")
         self.stop_requested = True
+        # Adapters install no handlers of their own; stop their children from here
+        adapters = list(self.adapters.instances())
+        if self.parallel_runner:
+            adapters += [worker.adapter for worker in self.parallel_runner.workers]
+        if self._summary_adapter:
+            adapters.append(self._summary_adapter)
+        for adapter in adapters:
+            try:
+                adapter.interrupt()
+            except Exception as e:
+                logger.debug(f"Interrupting {adapter.name} failed: {e}")
     
     def run(self) -> None:
         """Run the main orchestration loop."""
@@ -198,6 +477,25 @@ class RalphOrchestrator:
         start_time = time.time()
         self._start_time = start_time  # Store for state retrieval
         
+        # Edits to the prompt file by the agent or a human are picked up as they happen
+        self._loop = asyncio.get_running_loop()
+        if self.context_manager.watch(self._on_prompt_file_changed):
+            logger.info(f"Watching {self.prompt_file} for changes")
+        
+        if self.workers > 1:
+            from .parallel import ParallelRunner
+            self.parallel_runner = ParallelRunner(self, self.workers)
+            await self.parallel_runner.run()
+            self.context_manager.close()
+            await self._close_adapters()
+            if self.router:
+                self.router.save()
+            self._print_summary()
+            return
+        
+        if self.change_tracker:
+            self.change_tracker.start()
+        
         while not self.stop_requested:
             # Check safety limits
             safety_check = self.safety_guard.check(
@@ -221,9 +519,11 @@ class RalphOrchestrator:
                 
                 if success:
                     self.metrics.successful_iterations += 1
+                    self.safety_guard.record_success()
                 else:
                     self.metrics.failed_iterations += 1
-                    self._handle_failure()
+                    self.safety_guard.record_failure()
+                    await self._handle_failure()
                 
                 # Checkpoint if needed
                 if self.metrics.iterations % self.checkpoint_interval == 0:
@@ -235,12 +535,35 @@ class RalphOrchestrator:
                 self._handle_error(e)
             
             # Brief pause between iterations
-            await asyncio.sleep(2)
+            if self.iteration_delay > 0:
+                await asyncio.sleep(self.iteration_delay)
+        
+        self.context_manager.close()
+        if self.hedged_executor:
+            await self.hedged_executor.close()
+        await self._close_adapters()
+        if self.router:
+            self.router.save()
+        
+        # Let queued checkpoints land before reporting them
+        await asyncio.get_running_loop().run_in_executor(None, self.checkpoint_engine.stop)
+        if self.change_tracker:
+            self.change_tracker.stop()
         
         # Final summary
         self._print_summary()
     
     
+    async def _close_adapters(self) -> None:
+        """Close persistent adapter sessions."""
+        for adapter in self.adapters.instances():
+            try:
+                await adapter.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing {adapter.name} adapter: {e}")
+        if self.recorder:
+            self.recorder.close()
+    
     def _execute_iteration(self) -> bool:
         """Execute a single iteration (sync wrapper)."""
         try:
@@ -252,91 +575,306 @@ class RalphOrchestrator:
     
     async def _aexecute_iteration(self) -> bool:
         """Execute a single iteration asynchronously."""
-        # Get the current prompt
-        prompt = self.context_manager.get_prompt()
-        
-        # Extract tasks from prompt if task queue is empty
-        if not self.task_queue and not self.current_task:
-            self._extract_tasks_from_prompt(prompt)
+        # Sync the task DAG with the prompt file (no-op while it is unchanged)
+        self._sync_tasks()
         
         # Update current task status
         self._update_current_task('in_progress')
         
-        # Try primary adapter with prompt file path
-        response = await self.current_adapter.aexecute(
-            prompt, 
-            prompt_file=str(self.prompt_file),
-            verbose=self.verbose
-        )
+        if self.router:
+            self._route()
+        adapter = self.current_adapter
+        hedging = self.hedged_executor is not None and len(self.adapters) > 1 and not self.strict_mode
         
-        if not response.success and len(self.adapters) > 1 and not self.strict_mode:
+        # Get the current prompt, with past work relevant to the task. An agent
+        # session that saw the previous prompt may be sent only what changed.
+        task = self.current_task['description'] if self.current_task else None
+        session = self._session_key(adapter, {'id': adapter.session_id}) if not hedging else None
+        prompt = self.context_manager.get_prompt(task, session=session)
+        full_prompt = self.context_manager.full_prompt or prompt
+        
+        if hedging:
+            # Race fallbacks against a slow primary; the loser's edits are discarded
+            candidates = [
+                a for a in [self.current_adapter] + [fallback for _, fallback in self._fallbacks()]
+                if await self._breaker_allows(a)
+            ]
+            if candidates:
+                start = time.time()
+                adapter, response = await self.hedged_executor.execute(
+                    candidates,
+                    full_prompt,
+                    prompt_file=str(self.prompt_file),
+                    verbose=self.verbose,
+                    iteration=self.metrics.iterations
+                )
+                self._record_outcome(adapter, response, time.time() - start)
+            else:
+                response = self._circuit_open_response(adapter)
+            self.context_manager.confirm_delivery(None, False)
+        else:
+            # Try primary adapter with prompt file path
+            response = await self._run_adapter(self.current_adapter, prompt, full_prompt)
+            delivered = response.metadata.get('session')
+            self.context_manager.confirm_delivery(
+                self._session_key(adapter, delivered), bool(delivered and delivered.get('resumed'))
+            )
+        
+        if not hedging and not response.success and len(self.adapters) > 1 and not self.strict_mode:
             # Try fallback adapters (only if not in strict mode)
-            for name, adapter in self.adapters.items():
-                if adapter != self.current_adapter:
-                    logger.info(f"Falling back to {name}")
-                    response = await adapter.aexecute(
-                        prompt,
-                        prompt_file=str(self.prompt_file),
-                        verbose=self.verbose
-                    )
-                    if response.success:
-                        break
+            for name, fallback in self._fallbacks():
+                logger.info(f"Falling back to {name}")
+                response = await self._run_adapter(fallback, full_prompt)
+                if response.success:
+                    adapter = fallback
+                    break
         elif not response.success and self.strict_mode:
             # In strict mode, log that we're not falling back
             logger.warning(f"Strict mode enabled: not falling back from {self.primary_tool} despite failure")
         
+        self._rate_limited = bool(response.metadata.get('rate_limited'))
+        if response.metadata.get('replay_exhausted'):
+            logger.info("Replay session finished, stopping")
+            self.stop_requested = True
+        
         # Log the response output (already streamed to console if verbose)
         if response.success and response.output:
             # Log a preview for the logs
-            output_preview = response.output[:500] if len(response.output) > 500 else response.output
-            logger.debug(f"Agent response preview: {output_preview}")
-            if len(response.output) > 500:
-                logger.debug(f"... (total {len(response.output)} characters)")
+            output_view = response.view
+            logger.debug(f"Agent response preview: {output_view.head(500)}")
+            if len(output_view) > 500:
+                logger.debug(f"... (total {len(output_view)} characters)")
+            if response.transcript:
+                logger.info(f"Full agent output written to {response.transcript}")
         
         # Track costs if enabled
-        if self.cost_tracker and response.success:
-            if response.tokens_used:
-                tokens = response.tokens_used
-            else:
-                tokens = self._estimate_tokens(response.output)
-            
-            cost = self.cost_tracker.add_usage(
-                self.current_adapter.name,
-                tokens,
-                tokens // 4  # Rough output estimate
-            )
-            logger.info(f"Estimated cost: ${cost:.4f} (total: ${self.cost_tracker.total_cost:.4f})")
+        self._track_cost(adapter, response)
         
-        # Update context if needed
+        # Update context if needed (off the event loop: an agent summarizer blocks)
         if response.success and len(response.output) > 1000:
-            self.context_manager.update_context(response.output)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.context_manager.update_context, response.output, self.metrics.iterations
+            )
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.context_manager.record_iteration, self.metrics.iterations,
+            response.output if response.success else "", response.error, self._new_touched_paths()
+        )
         
         # Update task status based on response
-        if response.success and self.current_task:
-            # Check if response indicates task completion
-            output_lower = response.output.lower() if response.output else ""
-            if any(word in output_lower for word in ['completed', 'finished', 'done', 'committed']):
-                self._update_current_task('completed')
+        if response.success and self.current_task and self._indicates_completion(response):
+            self._update_current_task('completed')
         
         return response.success
     
-    def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count from text."""
-        # Rough estimate: 1 token per 4 characters
-        return len(text) // 4
+    async def _run_adapter(
+        self, adapter: ToolAdapter, prompt: str, full_prompt: Optional[str] = None
+    ) -> ToolResponse:
+        """Run one adapter for this iteration unless its circuit breaker is open.
+        
+        Args:
+            adapter: Adapter to run
+            prompt: Prompt to send, possibly a delta for the adapter's session
+            full_prompt: Full prompt, used by the adapter if its session was not resumed
+        """
+        if not await self._breaker_allows(adapter):
+            return self._circuit_open_response(adapter)
+        start = time.time()
+        kwargs = {'full_prompt': full_prompt} if full_prompt is not None and full_prompt != prompt else {}
+        response = await adapter.aexecute(
+            prompt,
+            prompt_file=str(self.prompt_file),
+            verbose=self.verbose,
+            iteration=self.metrics.iterations,
+            **kwargs
+        )
+        self._record_outcome(adapter, response, time.time() - start)
+        return response
+    
+    @staticmethod
+    def _session_key(adapter: ToolAdapter, session: Optional[Dict[str, Any]]) -> Optional[Tuple[str, int]]:
+        """Identify an adapter's conversation across calls (None if there is none)."""
+        if not session or session.get('id') is None:
+            return None
+        return (adapter.name, session['id'])
+    
+    async def _breaker_allows(self, adapter: ToolAdapter) -> bool:
+        """Check the adapter's breaker; a half-open breaker first re-probes availability."""
+        breaker = self.safety_guard.breaker(adapter.name)
+        if not breaker.allow():
+            return False
+        if breaker.state != breaker.HALF_OPEN:
+            return True
+        
+        loop = asyncio.get_running_loop()
+        try:
+            available = await asyncio.wait_for(
+                loop.run_in_executor(None, adapter.check_availability), timeout=15
+            )
+        except Exception as e:
+            logger.debug(f"{adapter.name} availability probe failed: {e}")
+            available = False
+        if not available:
+            logger.info(f"{adapter.name} still unavailable, keeping its circuit open")
+            breaker.record_failure()
+            return False
+        return True
+    
+    def _circuit_open_response(self, adapter: ToolAdapter) -> ToolResponse:
+        return ToolResponse(
+            success=False,
+            output="",
+            error=f"Circuit breaker for {adapter.name} is open",
+            metadata={"circuit_open": True}
+        )
+    
+    def _record_outcome(self, adapter: ToolAdapter, response: ToolResponse, latency: float) -> None:
+        """Feed a call's outcome to the adapter's circuit breaker and the router."""
+        breaker = self.safety_guard.breaker(adapter.name)
+        if response.success:
+            breaker.record_success()
+        elif response.metadata.get('rate_limited'):
+            # A 429 says nothing about the adapter's health; its limiter holds the next calls
+            pass
+        else:
+            timed_out = bool(response.metadata.get('timeout')) or 'timed out' in (response.error or '')
+            breaker.record_failure(timed_out=timed_out)
+        self._record_route(adapter, response, latency)
+    
+    def _route(self) -> None:
+        """Point current_adapter at the router's pick for this iteration."""
+        self._route_order = self.router.rank(list(self.adapters))
+        for name in self._route_order:
+            try:
+                adapter = self.adapters[name]
+            except KeyError:
+                continue
+            if adapter is not self.current_adapter:
+                logger.info(f"Routing iteration {self.metrics.iterations} to {name}")
+                self.current_adapter = adapter
+            return
+    
+    def _fallbacks(self):
+        """Yield (name, adapter) for the adapters to try after current_adapter."""
+        names = self._route_order if self.router else list(self.adapters)
+        for name in names:
+            try:
+                adapter = self.adapters[name]
+            except KeyError:
+                continue
+            if adapter is not self.current_adapter:
+                yield name, adapter
+    
+    def _record_route(self, adapter: ToolAdapter, response: ToolResponse, latency: float) -> None:
+        if not self.router:
+            return
+        cost = response.cost
+        if cost is None:
+            tokens = self._usage_tokens(response)
+            cost = CostTracker.estimate(self._cost_name(adapter, response), tokens, tokens // 4)
+        self.router.record(adapter.name, response.success, latency, cost)
+    
+    def _usage_tokens(self, response: ToolResponse) -> int:
+        if response.tokens_used:
+            return response.tokens_used
+        if response.transcript:
+            # Spilled output is estimated from its length rather than read back
+            return self._estimate_tokens(len(response.view))
+        return self.tokens.count(response.output)
+    
+    def _cost_name(self, adapter: ToolAdapter, response: ToolResponse) -> str:
+        # Replayed responses are priced as the adapter that recorded them
+        return response.metadata.get('replayed_from', adapter.name)
+    
+    def _agent_summarize(self, text: str, max_tokens: int) -> str:
+        """Condense progress notes with the configured summarizer agent.
+        
+        Called from an executor thread. The agent runs in an adapter of its
+        own, so the shared adapter's session and stream subscribers are left
+        alone, on the orchestrator's event loop when one is running.
+        """
+        name = {'q': 'qchat'}.get(self.summarizer, self.summarizer)
+        if name not in self.adapters:
+            raise RuntimeError(f"summarizer agent {self.summarizer} is not available")
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Waiting on the loop from the loop itself would never return
+            raise RuntimeError("agent summaries cannot be made on the event loop thread")
+        
+        adapter = self._create_adapter(name, available=True, dedicated=True)
+        prompt = (
+            f"Summarize these progress notes from earlier iterations in at most {max_tokens} "
+            "tokens. Keep concrete facts: what was done, what failed and what is left. "
+            "Reply with the summary only and do not modify any files.\n\n" + text
+        )
+        
+        async def summarize() -> ToolResponse:
+            try:
+                return await adapter.aexecute(prompt, verbose=False)
+            finally:
+                await adapter.aclose()
+        
+        self._summary_adapter = adapter
+        try:
+            loop = self._loop
+            if loop is not None and loop.is_running():
+                response = asyncio.run_coroutine_threadsafe(summarize(), loop).result()
+            else:
+                response = asyncio.run(summarize())
+        finally:
+            self._summary_adapter = None
+        if not response.success:
+            raise RuntimeError(response.error or "summarizer agent failed")
+        return response.output
+    
+    def _track_cost(self, adapter: ToolAdapter, response: ToolResponse):
+        """Record the cost and prompt-cache usage of a successful response."""
+        if response.success:
+            self.context_manager.provider_cache.record_usage(response.metadata.get('usage'))
+        if not self.cost_tracker or not response.success:
+            return
+        
+        tokens = self._usage_tokens(response)
+        cost = self.cost_tracker.add_usage(
+            self._cost_name(adapter, response),
+            tokens,
+            tokens // 4  # Rough output estimate
+        )
+        logger.info(f"Estimated cost: ${cost:.4f} (total: ${self.cost_tracker.total_cost:.4f})")
+    
+    def _indicates_completion(self, response: ToolResponse) -> bool:
+        """Check if a response indicates the task was completed."""
+        # Searches the transcript in place instead of lowercasing a copy of it
+        return response.view.contains('completed', 'finished', 'done', 'committed')
+    
+    def _estimate_tokens(self, length: int) -> int:
+        """Estimate token count from an output length."""
+        # Uses the characters per token observed by the estimator so far
+        return self.tokens.tokens_for_length(length)
     
-    def _handle_failure(self):
+    async def _handle_failure(self):
         """Handle iteration failure."""
         logger.warning("Iteration failed, attempting recovery")
         
-        # Simple exponential backoff
-        backoff = min(2 ** self.metrics.failed_iterations, 60)
-        logger.info(f"Backing off for {backoff} seconds")
-        time.sleep(backoff)
+        # Simple exponential backoff, scaled by the iteration delay (2s -> 2, 4, 8...)
+        backoff = min(self.iteration_delay * 2 ** (self.metrics.failed_iterations - 1), 60)
+        
+        # With every adapter's breaker open, wait for the first one to allow a trial instead
+        breakers = [self.safety_guard.breaker(name) for name in self.adapters]
+        if breakers and all(b.state == b.OPEN for b in breakers):
+            backoff = min(b.get_stats()['retry_in'] for b in breakers)
+        elif self._rate_limited:
+            # The provider limiter already waits out the retry-after on the next call
+            backoff = 0
+        if backoff > 0:
+            logger.info(f"Backing off for {backoff} seconds")
+            await asyncio.sleep(backoff)
         
         # Consider rollback after multiple failures
         if self.metrics.failed_iterations > 3:
-            self._rollback_checkpoint()
+            await self._rollback_checkpoint()
     
     def _handle_error(self, error: Exception):
         """Handle iteration error."""
@@ -351,35 +889,18 @@ class RalphOrchestrator:
             self._reset_state()
     
     def _create_checkpoint(self):
-        """Create a git checkpoint."""
-        try:
-            subprocess.run(
-                ["git", "add", "-A"],
-                check=True,
-                capture_output=True
-            )
-            subprocess.run(
-                ["git", "commit", "-m", f"Ralph checkpoint {self.metrics.iterations}"],
-                check=True,
-                capture_output=True
-            )
-            self.metrics.checkpoints += 1
-            logger.info(f"Created checkpoint {self.metrics.checkpoints}")
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to create checkpoint: {e}")
+        """Queue a git checkpoint; the engine writes it in the background."""
+        self.checkpoint_engine.request(self.metrics.iterations)
     
-    def _rollback_checkpoint(self):
-        """Rollback to previous checkpoint."""
-        try:
-            subprocess.run(
-                ["git", "reset", "--hard", "HEAD~1"],
-                check=True,
-                capture_output=True
-            )
-            logger.info("Rolled back to previous checkpoint")
+    def _on_checkpoint(self, commit_id: str, iteration: int):
+        """Record a checkpoint written by the checkpoint engine."""
+        self.metrics.checkpoints += 1
+    
+    async def _rollback_checkpoint(self):
+        """Rollback the working tree to the latest checkpoint."""
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self.checkpoint_engine.rollback):
             self.metrics.rollbacks += 1
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to rollback: {e}")
     
     def _archive_prompt(self):
         """Archive the current prompt."""
@@ -414,6 +935,7 @@ class RalphOrchestrator:
         logger.info(f"Errors: {self.metrics.errors}")
         logger.info(f"Checkpoints: {self.metrics.checkpoints}")
         logger.info(f"Rollbacks: {self.metrics.rollbacks}")
+        logger.info(f"Throughput: {self.metrics.iterations_per_hour():.1f} iterations/hour")
         
         if self.cost_tracker:
             logger.info(f"Total cost: ${self.cost_tracker.total_cost:.4f}")
@@ -421,6 +943,10 @@ class RalphOrchestrator:
             for tool, cost in self.cost_tracker.costs_by_tool.items():
                 logger.info(f"  {tool}: ${cost:.4f}")
         
+        prompt_cache = self.context_manager.provider_cache
+        if prompt_cache.hit_ratio is not None:
+            logger.info(f"Prompt cache hit ratio: {prompt_cache.hit_ratio:.1%} of input tokens")
+        
         # Save metrics to file
         metrics_dir = Path(".agent") / "metrics"
         metrics_dir.mkdir(parents=True, exist_ok=True)
@@ -432,95 +958,96 @@ class RalphOrchestrator:
             "errors": self.metrics.errors,
             "checkpoints": self.metrics.checkpoints,
             "rollbacks": self.metrics.rollbacks,
+            "iterations_per_hour": self.metrics.iterations_per_hour(),
         }
         
+        if self.parallel_runner:
+            metrics_data["parallel"] = self.parallel_runner.get_state()
+        
         if self.cost_tracker:
             metrics_data["cost"] = {
                 "total": self.cost_tracker.total_cost,
                 "by_tool": self.cost_tracker.costs_by_tool
             }
         
+        metrics_data["prompt_cache"] = prompt_cache.get_stats()
+        
         metrics_file.write_text(json.dumps(metrics_data, indent=2))
         logger.info(f"Metrics saved to {metrics_file}")
     
+    def _sync_tasks(self) -> bool:
+        """Re-extract tasks if the prompt changed since they were last extracted.
+        
+        Returns:
+            True if the task DAG was updated
+        """
+        text = self.context_manager.prompt_text
+        if self.context_manager.version == self._task_prompt_version:
+            return False
+        self._task_prompt_version = self.context_manager.version
+        self._extract_tasks_from_prompt(text)
+        return True
+    
+    def _new_touched_paths(self) -> List[str]:
+        """Paths touched since they were last added to the retrieval index."""
+        if not self.change_tracker:
+            return []
+        # Our own state under .agent/ says nothing about the agent's work
+        touched = {path for path in self.change_tracker.touched_paths() if not path.startswith('.agent/')}
+        new = sorted(touched - self._indexed_paths)
+        self._indexed_paths = touched
+        return new
+    
+    def _on_prompt_file_changed(self):
+        """Called from the prompt watcher thread; reloads on the event loop."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._reload_prompt)
+    
     def _extract_tasks_from_prompt(self, prompt: str):
-        """Extract tasks from the prompt text."""
-        import re
-        
-        # Look for task patterns in the prompt
-        # Common patterns: "- [ ] task", "1. task", "Task: description"
-        task_patterns = [
-            r'^\s*-\s*\[\s*\]\s*(.+)$',  # Checkbox tasks
-            r'^\s*\d+\.\s*(.+)$',  # Numbered tasks
-            r'^Task:\s*(.+)$',  # Task: format
-            r'^TODO:\s*(.+)$',  # TODO: format
-        ]
-        
-        lines = prompt.split('\n')
-        for line in lines:
-            for pattern in task_patterns:
-                match = re.match(pattern, line, re.MULTILINE)
-                if match:
-                    task = {
-                        'id': len(self.task_queue) + len(self.completed_tasks) + 1,
-                        'description': match.group(1).strip(),
-                        'status': 'pending',
-                        'created_at': datetime.now().isoformat(),
-                        'completed_at': None,
-                        'iteration': None
-                    }
-                    self.task_queue.append(task)
-                    break
+        """Extract tasks from the prompt text into the task DAG."""
+        self.task_scheduler.load_from_prompt(prompt)
         
-        # If no tasks found, create a general task
-        if not self.task_queue and not self.completed_tasks:
-            self.task_queue.append({
-                'id': 1,
-                'description': 'Execute orchestrator instructions',
-                'status': 'pending',
-                'created_at': datetime.now().isoformat(),
-                'completed_at': None,
-                'iteration': None
-            })
+        # Re-parsing replaces task records; follow the current task to its new record
+        if self.current_task:
+            task = self.task_scheduler.tasks.get(self.current_task['key'])
+            if task is None or task['status'] == 'completed':
+                self.current_task = None
+                self.task_start_time = None
+            else:
+                self.current_task = task
     
     def _update_current_task(self, status: str = 'in_progress'):
         """Update the current task status."""
-        if not self.current_task and self.task_queue:
-            self.current_task = self.task_queue.pop(0)
-            self.current_task['status'] = 'in_progress'
-            self.current_task['iteration'] = self.metrics.iterations
-            self.task_start_time = time.time()
-        elif self.current_task:
+        if not self.current_task:
+            self.current_task = self.task_scheduler.claim(self.metrics.iterations)
+            if self.current_task:
+                self.task_start_time = time.time()
+        elif status == 'completed':
+            self.task_scheduler.complete(self.current_task)
+            self.current_task = None
+            self.task_start_time = None
+        else:
             self.current_task['status'] = status
-            if status == 'completed':
-                self.current_task['completed_at'] = datetime.now().isoformat()
-                self.completed_tasks.append(self.current_task)
-                self.current_task = None
-                self.task_start_time = None
     
     def _reload_prompt(self):
         """Reload the prompt file to pick up any changes."""
-        logger.info("Reloading prompt file due to external update")
-        # The context manager will automatically reload on next get_prompt() call
-        # Clear the context manager's cache to force reload
-        if hasattr(self.context_manager, '_load_initial_prompt'):
-            self.context_manager._load_initial_prompt()
-        
-        # Extract new tasks if the prompt has changed significantly
-        prompt = self.context_manager.get_prompt()
-        
-        # Only re-extract tasks if we don't have a current task or queue
-        if not self.current_task and not self.task_queue:
-            self._extract_tasks_from_prompt(prompt)
+        # Merge the new prompt into the DAG, keeping progress on known tasks
+        if self._sync_tasks():
+            logger.info(f"Prompt file changed (version {self.context_manager.version}), tasks re-extracted")
     
     def get_task_status(self) -> Dict[str, Any]:
         """Get current task queue status."""
+        task_queue = self.task_scheduler.pending()
+        completed_tasks = self.task_scheduler.completed()
         return {
             'current_task': self.current_task,
-            'task_queue': self.task_queue,
-            'completed_tasks': self.completed_tasks[-10:],  # Last 10 completed
-            'queue_length': len(self.task_queue),
-            'completed_count': len(self.completed_tasks),
+            'task_queue': task_queue,
+            'in_progress': self.task_scheduler.in_progress(),
+            'completed_tasks': completed_tasks[-10:],  # Last 10 completed
+            'queue_length': len(task_queue),
+            'ready_count': self.task_scheduler.ready_count,
+            'completed_count': len(completed_tasks),
             'current_iteration': self.metrics.iterations,
             'task_duration': (time.time() - self.task_start_time) if self.task_start_time else None
         }
@@ -547,5 +1074,16 @@ class RalphOrchestrator:
             'cost': {
                 'total': self.cost_tracker.total_cost if self.cost_tracker else 0,
                 'limit': self.max_cost if self.track_costs else None
+            },
+            'parallel': self.parallel_runner.get_state() if self.parallel_runner else None,
+            'hedging': self.hedge_policy.get_stats() if self.hedge_policy else None,
+            'routing': self.router.get_stats() if self.router else None,
+            'context': self.context_manager.get_stats(),
+            'circuit_breakers': self.safety_guard.breaker_stats(),
+            'rate_limits': {name: limiter.get_stats() for name, limiter in self.rate_limiters.items()},
+            'changes': self.change_tracker.get_state() if self.change_tracker else None,
+            'stream': {
+                'events': dict(self.stream_events),
+                'last_tool': self.last_tool
             }
         }
\ No newline at end of file
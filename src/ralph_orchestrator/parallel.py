@@ -0,0 +1,390 @@
+# ABOUTME: Parallel worktree workers for Ralph Orchestrator
+# ABOUTME: Runs several agent iterations concurrently and merges results through a queue
+
+"""Parallel worker mode for Ralph Orchestrator."""
+
+import asyncio
+import logging
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .adapters.base import ToolAdapter
+from .metrics import Metrics
+from .worktree import Worktree, current_branch, run_git
+
+if TYPE_CHECKING:
+    from .orchestrator import RalphOrchestrator
+
+logger = logging.getLogger('ralph-orchestrator.parallel')
+
+# Give up on a work item after this many merge conflicts
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class WorkItem:
+    """A unit of work handed to a worker."""
+    id: int
+    attempts: int = 0
+    task: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class WorkerState:
+    """Per-worker bookkeeping."""
+    name: str
+    worktree: Worktree
+    adapter: ToolAdapter
+    metrics: Metrics = field(default_factory=Metrics)
+    current_item: Optional[WorkItem] = None
+    merges: int = 0
+    conflicts: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "name": self.name,
+            "path": str(self.worktree.path),
+            "adapter": self.adapter.name,
+            "current_item": self.current_item.id if self.current_item else None,
+            "current_task": self.current_item.task if self.current_item else None,
+            "merges": self.merges,
+            "conflicts": self.conflicts,
+            "metrics": self.metrics.to_dict()
+        }
+
+
+class IntegrationQueue:
+    """Serializes merges of worker branches into a dedicated integration worktree.
+
+    Merges never run in the user's working tree, so uncommitted edits there
+    cannot make them fail. The integrated result is fast-forwarded onto the
+    base branch whenever the user's checkout allows it.
+    """
+
+    def __init__(self, repo_dir: Path, base_branch: str):
+        """Initialize the integration queue.
+
+        Args:
+            repo_dir: Main working tree that holds the base branch
+            base_branch: Branch worker commits are merged into
+        """
+        self.repo_dir = repo_dir
+        self.base_branch = base_branch
+        self.worktree: Optional[Worktree] = None
+        self.merged = 0
+        self.conflicts = 0
+        self._published = True  # Whether base_branch has every merge so far
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def branch(self) -> str:
+        """Branch holding the integrated work, which workers start from."""
+        return self.worktree.branch if self.worktree else self.base_branch
+
+    async def start(self):
+        """Create the integration worktree and start the background integration task."""
+        if not self.worktree:
+            self.worktree = await Worktree.create(self.repo_dir, "integration", self.base_branch)
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background integration task and hand the result to the base branch."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if not self.worktree:
+            return
+        if self._published or await self._publish():
+            await self.worktree.remove()
+        else:
+            # Keep the branch so no integrated work is lost
+            await run_git("worktree", "remove", "--force", str(self.worktree.path), cwd=self.repo_dir)
+            logger.warning(
+                f"Could not fast-forward {self.base_branch}; the integrated work is on "
+                f"branch {self.worktree.branch}, merge it with: git merge {self.worktree.branch}"
+            )
+        self.worktree = None
+
+    async def submit(self, branch: str) -> bool:
+        """Queue ``branch`` for merging and wait for the outcome.
+
+        Returns:
+            True if the branch merged cleanly, False on conflict
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((branch, future))
+        return await future
+
+    async def _run(self):
+        """Merge queued branches one at a time."""
+        while True:
+            branch, future = await self._queue.get()
+            try:
+                merged = await self._merge(branch)
+            except Exception as e:
+                logger.error(f"Integration of {branch} failed: {e}")
+                merged = False
+            if not future.done():
+                future.set_result(merged)
+
+    async def _merge(self, branch: str) -> bool:
+        """Merge ``branch`` into the integration branch, aborting on conflict."""
+        result = await run_git(
+            "merge", "--no-ff", "--no-edit", "-m", f"Ralph: integrate {branch}", branch,
+            cwd=self.worktree.path
+        )
+        if result.ok:
+            self.merged += 1
+            self._published = await self._publish()
+            logger.info(f"Integrated {branch} into {self.worktree.branch}")
+            return True
+
+        await run_git("merge", "--abort", cwd=self.worktree.path)
+        self.conflicts += 1
+        logger.warning(f"Merge conflict integrating {branch}, re-queueing its work")
+        return False
+
+    async def _publish(self) -> bool:
+        """Fast-forward the user's checkout of the base branch to the integration branch.
+
+        Git refuses, leaving the checkout untouched, when the user has moved
+        the branch or has uncommitted changes to files the merge would update.
+        """
+        result = await run_git("merge", "--ff-only", "--quiet", self.worktree.branch, cwd=self.repo_dir)
+        if not result.ok:
+            logger.debug(f"Fast-forward of {self.base_branch} postponed: {result.stderr.strip()}")
+        return result.ok
+
+
+class ParallelRunner:
+    """Runs orchestrator iterations across several git worktrees."""
+
+    def __init__(self, orchestrator: 'RalphOrchestrator', workers: int):
+        """Initialize the parallel runner.
+
+        Args:
+            orchestrator: Orchestrator whose config, metrics and costs are shared
+            workers: Number of concurrent workers
+        """
+        self.orchestrator = orchestrator
+        self.num_workers = workers
+        self.repo_dir = Path.cwd()
+        self.workers: List[WorkerState] = []
+        self.integration: Optional[IntegrationQueue] = None
+        self._pending: Deque[WorkItem] = deque()
+        self._prompt_lock = asyncio.Lock()
+        self._next_id = 0
+        self._start_time = time.time()
+
+    async def run(self):
+        """Run workers until a safety limit or stop request ends the loop."""
+        orch = self.orchestrator
+        base_branch = await current_branch(self.repo_dir)
+        self.integration = IntegrationQueue(self.repo_dir, base_branch)
+
+        try:
+            await self.integration.start()
+            for index in range(self.num_workers):
+                worktree = await Worktree.create(self.repo_dir, f"worker-{index + 1}", self.integration.branch)
+                adapter = orch._create_worker_adapter()
+                self.workers.append(WorkerState(f"worker-{index + 1}", worktree, adapter))
+            # Ctrl-C must still stop the run (and every worker's agent) once workers exist
+            orch._install_signal_handlers()
+
+            logger.info(f"Running {self.num_workers} parallel workers on {base_branch}")
+            await asyncio.gather(*(self._worker_loop(worker) for worker in self.workers))
+        finally:
+            await self.integration.stop()
+            for worker in self.workers:
+                await worker.adapter.aclose()
+                await worker.worktree.remove()
+
+    def _next_item(self) -> Optional[WorkItem]:
+        """Return the next work item, or None when the run should stop."""
+        orch = self.orchestrator
+        if orch.stop_requested:
+            return None
+
+        if self._pending:
+            return self._pending.popleft()
+
+        safety_check = orch.safety_guard.check(
+            orch.metrics.iterations,
+            time.time() - self._start_time,
+            orch.cost_tracker.total_cost if orch.cost_tracker else 0
+        )
+        if not safety_check.passed:
+            logger.warning(f"Safety limit reached: {safety_check.reason}")
+            return None
+
+        self._next_id += 1
+        orch.metrics.iterations += 1
+
+        # Hand each concurrent call its own ready task from the DAG
+        orch._sync_tasks()
+        task = orch.task_scheduler.claim(orch.metrics.iterations)
+        return WorkItem(id=self._next_id, task=task)
+
+    async def _worker_loop(self, worker: WorkerState):
+        """Pull work items and run them in the worker's worktree."""
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            worker.current_item = item
+            item.attempts += 1
+            worker.metrics.iterations += 1
+            logger.info(f"{worker.name}: starting work item {item.id} (attempt {item.attempts})")
+
+            try:
+                success, merged = await self._run_item(worker, item)
+            except Exception as e:
+                logger.error(f"{worker.name}: error in work item {item.id}: {e}")
+                worker.metrics.errors += 1
+                self.orchestrator.metrics.errors += 1
+                success, merged = False, True
+
+            worker.current_item = None
+            if not merged and item.attempts < MAX_ATTEMPTS:
+                # Conflicting work goes back to the front of the queue
+                self._pending.appendleft(item)
+                continue
+            if not merged:
+                logger.warning(f"Dropping work item {item.id} after {item.attempts} conflicts")
+                success = False
+
+            if item.task and not success:
+                self.orchestrator.task_scheduler.release(item.task)
+
+            if success:
+                worker.metrics.successful_iterations += 1
+                self.orchestrator.metrics.successful_iterations += 1
+            else:
+                worker.metrics.failed_iterations += 1
+                self.orchestrator.metrics.failed_iterations += 1
+
+    async def _run_item(self, worker: WorkerState, item: WorkItem) -> Tuple[bool, bool]:
+        """Run one work item and integrate its commits.
+
+        Returns:
+            Tuple of (agent succeeded, work integrated or nothing to integrate)
+        """
+        orch = self.orchestrator
+        base = self.integration.branch
+        await worker.worktree.sync(base)
+
+        prompt_file, original_prompt = self._prepare_prompt(worker)
+        prompt = orch.context_manager.get_prompt(item.task['description'] if item.task else None)
+        if item.task:
+            prompt += (
+                f"\n\n## Assigned Task\n"
+                f"Other agents are working on other tasks in parallel. "
+                f"Focus this iteration only on: {item.task['description']}"
+            )
+
+        response = await worker.adapter.aexecute(
+            prompt,
+            prompt_file=str(prompt_file),
+            verbose=orch.verbose,
+            cwd=str(worker.worktree.path),
+            iteration=item.id
+        )
+        orch._track_cost(worker.adapter, response)
+        await asyncio.get_running_loop().run_in_executor(
+            None, orch.context_manager.record_iteration, item.id,
+            response.output if response.success else "", response.error
+        )
+        if not response.success:
+            return False, True
+
+        # Prompt edits are carried back to the user's prompt file below, not merged
+        exclude = [prompt_file.relative_to(worker.worktree.path).as_posix()]
+        await worker.worktree.commit_all(
+            f"Ralph {worker.name} work item {item.id}", exclude=exclude
+        )
+        if await worker.worktree.has_commits_since(base):
+            merged = await self.integration.submit(worker.worktree.branch)
+            if not merged:
+                worker.conflicts += 1
+                return True, False
+            worker.merges += 1
+        await self._carry_prompt_edits(prompt_file, original_prompt)
+
+        if item.task:
+            if orch._indicates_completion(response):
+                orch.task_scheduler.complete(item.task)
+            else:
+                orch.task_scheduler.release(item.task)
+        return True, True
+
+    def _prepare_prompt(self, worker: WorkerState) -> Tuple[Path, str]:
+        """Copy the user's current prompt file into the worktree.
+
+        The copy replaces any committed version, so the agent sees the
+        checkboxes other workers have already ticked.
+
+        Returns:
+            Tuple of (prompt path inside the worktree, text written there)
+        """
+        prompt_file = self.orchestrator.prompt_file
+        relative = prompt_file if not prompt_file.is_absolute() else Path(prompt_file.name)
+        target = worker.worktree.path / relative
+        text = prompt_file.read_text() if prompt_file.exists() else ""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+        return target, text
+
+    async def _carry_prompt_edits(self, copy: Path, original: str) -> None:
+        """Apply the agent's edits of its prompt copy to the user's prompt file.
+
+        Other workers may have updated the prompt file since the copy was
+        made, so the edits are three-way merged with ``git merge-file``. If
+        they conflict, the user's file is left as it is.
+        """
+        edited = copy.read_text() if copy.exists() else original
+        if edited == original:
+            return
+        prompt_file = self.orchestrator.prompt_file
+        async with self._prompt_lock:
+            current = prompt_file.read_text() if prompt_file.exists() else ""
+            if current == original:
+                prompt_file.write_text(edited)
+                return
+            with tempfile.TemporaryDirectory(prefix="ralph-prompt-") as tmp:
+                paths = [Path(tmp) / name for name in ("current", "original", "edited")]
+                for path, text in zip(paths, (current, original, edited)):
+                    path.write_text(text)
+                result = await run_git("merge-file", "-p", *(str(path) for path in paths))
+            if result.ok:
+                prompt_file.write_text(result.stdout)
+            else:
+                logger.warning(f"Agent edits to {prompt_file} conflict with newer changes; not applied")
+
+    def iterations_per_hour(self) -> float:
+        """Throughput across all workers."""
+        elapsed = (time.time() - self._start_time) / 3600
+        completed = sum(
+            w.metrics.successful_iterations + w.metrics.failed_iterations for w in self.workers
+        )
+        return completed / elapsed if elapsed > 0 else 0.0
+
+    def get_state(self) -> Dict[str, Any]:
+        """Get worker pool state for monitoring."""
+        return {
+            "workers": [worker.to_dict() for worker in self.workers],
+            "pending_items": len(self._pending),
+            "merged": self.integration.merged if self.integration else 0,
+            "conflicts": self.integration.conflicts if self.integration else 0,
+            "iterations_per_hour": self.iterations_per_hour()
+        }
@@ -0,0 +1,160 @@
+# ABOUTME: Section-level diffs of the prompt between iterations of one agent session
+# ABOUTME: Sends "changes since your last turn" instead of the full prompt, with periodic resyncs
+
+"""Delta prompt delivery for Ralph Orchestrator.
+
+An agent that keeps its conversation across iterations has already seen
+the previous prompt, and usually only a few checkboxes changed since. The
+prompt is split into heading-delimited sections, each hashed; the next
+turn gets only the sections that were added, removed or changed (as line
+diffs). Every ``resync_every`` turns, and whenever the delta would not be
+smaller, the full prompt is sent again.
+"""
+
+import difflib
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .tokens import TokenEstimator, get_estimator
+
+logger = logging.getLogger('ralph-orchestrator.prompt_diff')
+
+DELIVERY_MODES = ("full", "delta")
+DEFAULT_RESYNC_EVERY = 10  # Deltas sent before the full prompt is resent
+DELTA_HEADER = "## Changes Since Your Last Turn\n"
+
+# Sections are keyed by (heading, occurrence), mapped to their digest and text
+Sections = Dict[Tuple[str, int], Tuple[str, str]]
+
+
+def split_sections(text: str) -> Sections:
+    """Split markdown at headings and hash each section."""
+    sections: Sections = {}
+    seen: Dict[str, int] = {}
+    lines: List[str] = []
+
+    def close():
+        body = '\n'.join(lines)
+        heading = lines[0] if lines and lines[0].startswith('#') else ''
+        index = seen.get(heading, 0)
+        seen[heading] = index + 1
+        sections[(heading, index)] = (hashlib.sha256(body.encode('utf-8', 'surrogatepass')).hexdigest(), body)
+
+    for line in text.split('\n'):
+        if line.startswith('#') and lines:
+            close()
+            lines = []
+        lines.append(line)
+    close()
+    return sections
+
+
+@dataclass
+class PendingPrompt:
+    """A prompt handed out but not yet confirmed as delivered."""
+
+    session: Optional[object]
+    sections: Sections
+    full: str
+    delta: Optional[str]  # None when the full prompt is to be sent
+
+
+class SectionDiffer:
+    """Decides between a full prompt and a delta for each turn of a session."""
+
+    def __init__(self, resync_every: int = DEFAULT_RESYNC_EVERY, estimator: Optional[TokenEstimator] = None):
+        self.resync_every = resync_every
+        self.estimator = estimator or get_estimator()
+        self.session: Optional[object] = None  # Conversation that holds ``baseline``
+        self.baseline: Optional[Sections] = None
+        self.deltas_since_resync = 0
+        self.pending: Optional[PendingPrompt] = None
+        self.full_sends = 0
+        self.delta_sends = 0
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+
+    def prepare(self, text: str, session: Optional[object]) -> PendingPrompt:
+        """Work out what to send to ``session`` (None: a fresh conversation)."""
+        sections = split_sections(text)
+        delta = None
+        if (session is not None and session == self.session and self.baseline is not None
+                and self.deltas_since_resync < self.resync_every):
+            delta = self._render(self.baseline, sections)
+            if len(delta) >= len(text):
+                delta = None
+        self.pending = PendingPrompt(session, sections, text, delta)
+        return self.pending
+
+    def confirm(self, session: Optional[object], resumed: bool) -> None:
+        """Record what reached the agent.
+
+        Args:
+            session: Conversation the prompt went to, None if it was a one-shot call
+            resumed: Whether that conversation had seen our previous prompts
+        """
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return
+        sent_delta = pending.delta is not None and resumed and session == pending.session
+        if sent_delta:
+            self.delta_sends += 1
+            self.deltas_since_resync += 1
+            self.bytes_saved += len(pending.full) - len(pending.delta)
+            self.tokens_saved += self.estimator.count(pending.full) - self.estimator.count(pending.delta)
+        else:
+            self.full_sends += 1
+            self.deltas_since_resync = 0
+        if session is None:
+            self.reset()
+        else:
+            self.session = session
+            self.baseline = pending.sections
+
+    def reset(self) -> None:
+        """Forget the baseline; the next prompt is sent in full."""
+        self.session = None
+        self.baseline = None
+        self.deltas_since_resync = 0
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "full_sends": self.full_sends,
+            "delta_sends": self.delta_sends,
+            "bytes_saved": self.bytes_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+    def _render(self, before: Sections, after: Sections) -> str:
+        parts: List[str] = []
+        for key, (digest, body) in after.items():
+            previous = before.get(key)
+            if previous is None:
+                parts.append(f"### Added section\n{body.strip()}")
+            elif previous[0] != digest:
+                parts.append(f"### Changed: {key[0] or '(preamble)'}\n```diff\n{_line_diff(previous[1], body)}\n```")
+        for key in before:
+            if key not in after:
+                parts.append(f"### Removed: {key[0] or '(preamble)'}")
+        if not parts:
+            return DELTA_HEADER + "The prompt is unchanged since your last turn; continue with the next task."
+        return (
+            DELTA_HEADER
+            + "Everything else in the prompt is as in your last turn.\n\n"
+            + "\n\n".join(parts)
+        )
+
+
+def _line_diff(before: str, after: str) -> str:
+    """Changed lines only: '-' for removed, '+' for added."""
+    old, new = before.split('\n'), after.split('\n')
+    lines = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        lines.extend(f"-{line}" for line in old[i1:i2])
+        lines.extend(f"+{line}" for line in new[j1:j2])
+    return '\n'.join(lines)
@@ -0,0 +1,116 @@
+# ABOUTME: Lays prompts out with per-iteration context last for provider prompt caching
+# ABOUTME: Tracks cache breakpoints, prefix reuse and the cache-hit ratio from reported usage
+
+"""Prompt layout for Ralph Orchestrator.
+
+Claude and Gemini cache the longest prefix a prompt shares with recent
+requests and bill it at a fraction of the price. A prompt is therefore
+assembled from segments with context that changes every iteration last.
+The prompt file keeps its own section order, since reordering the user's
+instructions could change their meaning; its sections are marked stable
+or tasks so cache breakpoints fall where the agent's edits begin. The
+adapter's orchestration preamble, which never changes, goes in front.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Segment kinds
+STABLE = "stable"
+TASKS = "tasks"
+DYNAMIC = "dynamic"
+
+_TASK_MARKERS = ('- [ ]', '- [x]', '- [X]', '* [ ]', '* [x]', 'TODO')
+
+
+def is_volatile(section: str) -> bool:
+    """Whether a prompt file section holds state the agent updates (tasks, TODOs)."""
+    return any(marker in section for marker in _TASK_MARKERS)
+
+
+@dataclass
+class PromptSegment:
+    """A run of prompt text with one stability."""
+
+    kind: str
+    text: str
+
+
+@dataclass
+class PromptLayout:
+    """Prompt segments in the order they are sent."""
+
+    segments: List[PromptSegment] = field(default_factory=list)
+
+    def add(self, kind: str, text: str) -> None:
+        if text:
+            self.segments.append(PromptSegment(kind, text))
+
+    def render(self) -> str:
+        return "".join(segment.text for segment in self.segments)
+
+    @property
+    def breakpoints(self) -> List[int]:
+        """Character offsets where the cacheable prefix ends a segment kind.
+
+        A provider that accepts explicit cache markers should place them
+        here; everything after the last breakpoint changes per iteration.
+        """
+        offsets: List[int] = []
+        offset = 0
+        for index, segment in enumerate(self.segments):
+            offset += len(segment.text)
+            following = self.segments[index + 1].kind if index + 1 < len(self.segments) else None
+            if segment.kind != DYNAMIC and following != segment.kind:
+                offsets.append(offset)
+        return offsets
+
+    @property
+    def cacheable(self) -> str:
+        """The prompt up to the last breakpoint."""
+        end = self.breakpoints[-1] if self.breakpoints else 0
+        return self.render()[:end]
+
+
+class PromptCacheStats:
+    """Measures how much of each prompt providers could serve from their cache."""
+
+    def __init__(self):
+        self.prompts = 0
+        self.prefix_reuses = 0  # Prompts whose cacheable prefix matched the previous one
+        self.input_tokens = 0  # Uncached input tokens reported by providers
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self._last_prefix: Optional[str] = None
+
+    def record_layout(self, layout: PromptLayout) -> None:
+        digest = hashlib.sha256(layout.cacheable.encode('utf-8', 'surrogatepass')).hexdigest()
+        self.prompts += 1
+        if digest == self._last_prefix:
+            self.prefix_reuses += 1
+        self._last_prefix = digest
+
+    def record_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Add provider-reported usage (Anthropic field names)."""
+        if not usage:
+            return
+        self.input_tokens += usage.get('input_tokens') or 0
+        self.cache_read_tokens += usage.get('cache_read_input_tokens') or 0
+        self.cache_write_tokens += usage.get('cache_creation_input_tokens') or 0
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        """Share of reported input tokens served from the provider's cache."""
+        total = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        return self.cache_read_tokens / total if total else None
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "prompts": self.prompts,
+            "prefix_reuses": self.prefix_reuses,
+            "input_tokens": self.input_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "hit_ratio": round(self.hit_ratio, 3) if self.hit_ratio is not None else None,
+        }
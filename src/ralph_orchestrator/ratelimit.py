@@ -0,0 +1,459 @@
+# ABOUTME: Client-side rate limiting of agent providers shared by every orchestrator on a host
+# ABOUTME: Token buckets for requests and tokens per minute, a concurrency cap and fair queueing
+
+"""Provider rate limiting for Ralph Orchestrator.
+
+Each provider (adapter) gets one :class:`ProviderLimiter` per process,
+shared by every orchestrator in it. With a ``store`` path the limiter
+state lives in a SQLite database instead, so orchestrators in different
+processes draw from the same buckets. Limits come from the ``adapters``
+section of ``ralph.yml``::
+
+    adapters:
+      claude:
+        requests_per_minute: 50
+        tokens_per_minute: 400000
+        max_concurrent: 4
+
+Waiting calls are served one owner (orchestrator) at a time, least
+recently served first, so a run with many workers cannot starve the
+others. A provider 429 blocks the provider for its retry-after period.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger('ralph-orchestrator.ratelimit')
+
+POLL_INTERVAL = 0.1  # Seconds between checks while another call is ahead in the queue
+MAX_WAIT = 1.0  # Longest single sleep; waiters re-check so released slots are picked up
+# In-process waiters are also woken as soon as a slot frees up; only the shared store is polled
+STALE_AFTER = 30.0  # Waiters that stop polling for this long are dropped from the queue
+DEFAULT_RETRY_AFTER = 60.0  # Block after a 429 that does not say how long to wait
+
+# Only unambiguous phrasing: a bare "429" also turns up in line numbers and sizes
+_RATE_LIMITED = re.compile(
+    r"\b(?:http(?:/[\d.]+)?|status(?:[ _]code)?|error[ _]code)\W{0,3}429\b|\b429 too many requests"
+    r"|too many requests|rate[ _-]?limit(?:ed\b|[ _]exceeded|_error|[ _]reached)"
+    r"|quota[ _]exceeded|resource[ _]exhausted",
+    re.IGNORECASE
+)
+_RETRY_AFTER = re.compile(
+    r"(?:retry[ _-]?after|try again in|retry in)\D{0,10}(\d+(?:\.\d+)?)\s*(ms|milliseconds?)?",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ProviderLimits:
+    """Limits for one provider; None means unlimited."""
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    max_concurrent: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Any) -> 'ProviderLimits':
+        """Read the limits from an AdapterConfig, a dict or a ProviderLimits."""
+        if isinstance(config, dict):
+            return cls(**{k: config.get(k) for k in cls.__dataclass_fields__})
+        return cls(**{k: getattr(config, k, None) for k in cls.__dataclass_fields__})
+
+    @property
+    def enabled(self) -> bool:
+        return any((self.requests_per_minute, self.tokens_per_minute, self.max_concurrent))
+
+
+def is_rate_limited(error: Optional[str]) -> bool:
+    """Check whether an adapter error looks like a provider rate limit."""
+    return bool(error and _RATE_LIMITED.search(error))
+
+
+def retry_after(error: Optional[str]) -> float:
+    """Seconds to wait according to a rate limit error, or DEFAULT_RETRY_AFTER."""
+    match = _RETRY_AFTER.search(error or "")
+    if not match:
+        return DEFAULT_RETRY_AFTER
+    seconds = float(match.group(1))
+    return seconds / 1000 if match.group(2) else seconds
+
+
+class MemoryStore:
+    """Limiter state for the orchestrators of this process."""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def transact(self, provider: str, update: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._lock:
+            return update(self._states.setdefault(provider, {}))
+
+
+class SQLiteStore:
+    """Limiter state in a SQLite database shared by orchestrator processes."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limiter_state (provider TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def transact(self, provider: str, update: Callable[[Dict[str, Any]], Any]) -> Any:
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so read-modify-write is atomic
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT state FROM limiter_state WHERE provider = ?", (provider,)
+            ).fetchone()
+            state = json.loads(row[0]) if row else {}
+            result = update(state)
+            conn.execute(
+                "INSERT OR REPLACE INTO limiter_state (provider, state) VALUES (?, ?)",
+                (provider, json.dumps(state, separators=(',', ':')))
+            )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+
+
+class Lease:
+    """A granted call; report its usage with :meth:`settle` before it is released."""
+
+    def __init__(self, lease_id: str, tokens: int):
+        self.id = lease_id
+        self.tokens = tokens  # Tokens reserved when the call was granted
+        self.waited = 0.0
+        self.tokens_used: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+    def settle(self, response) -> None:
+        """Record a response's token usage and whether the provider rate limited it."""
+        if response.tokens_used:
+            self.tokens_used = response.tokens_used
+        else:
+            self.tokens_used = self.tokens + len(response.view) // 4
+        if not response.success and is_rate_limited(response.error):
+            self.retry_after = retry_after(response.error)
+            response.metadata["rate_limited"] = True
+
+
+class ProviderLimiter:
+    """Token buckets, a concurrency cap and a fair queue for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        limits: ProviderLimits,
+        store: Optional[Union[MemoryStore, SQLiteStore]] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """Initialize the limiter.
+
+        Args:
+            provider: Provider (adapter) name; also the key in a shared store
+            limits: Requests and tokens per minute and concurrent calls
+            store: Where the limiter state lives (default: this process only)
+            clock: Wall clock, shared by all processes using the store
+        """
+        self.provider = provider
+        self.limits = limits
+        self.store = store or MemoryStore()
+        self.clock = clock
+        self.granted = 0
+        self.throttled = 0  # Calls that had to wait
+        self.waited = 0.0
+        self.rate_limited = 0  # 429s reported by the provider
+        # Futures of in-process waiters, resolved when a slot may have freed up
+        self._wakeups: Dict[asyncio.Future, asyncio.AbstractEventLoop] = {}
+        self._wakeups_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def session(self, owner: str, tokens: int = 0) -> AsyncIterator[Lease]:
+        """Wait for a slot, hold it for the body and release it afterwards.
+
+        Args:
+            owner: Queue owner, e.g. one orchestrator; owners are served in turn
+            tokens: Tokens the call is expected to use (prompt and output)
+        """
+        lease = await self.acquire(owner, tokens)
+        try:
+            yield lease
+        finally:
+            await self._run(self._release, lease)
+            self._wake()
+
+    async def acquire(self, owner: str, tokens: int = 0) -> Lease:
+        """Wait until the provider's limits allow another call."""
+        lease = Lease(uuid.uuid4().hex, tokens)
+        ticket = {"owner": owner, "pid": os.getpid(), "tokens": tokens}
+        start = time.monotonic()
+        try:
+            while True:
+                # Registered before checking, so a release in between is not missed
+                wakeup = self._wakeup()
+                try:
+                    wait = await self._run(self._try_grant, lease.id, ticket)
+                    if wait <= 0:
+                        break
+                    await self._sleep(wait, wakeup)
+                finally:
+                    self._discard(wakeup)
+        except BaseException:
+            # Cancelled while queued: give up the place in the queue
+            await asyncio.shield(self._run(self._forget, lease.id))
+            self._wake()
+            raise
+        # With more than one slot, the next in line may fit too
+        self._wake()
+
+        lease.waited = time.monotonic() - start
+        self.granted += 1
+        if lease.waited > POLL_INTERVAL:
+            self.throttled += 1
+            self.waited += lease.waited
+            logger.info(f"Waited {lease.waited:.1f}s for the {self.provider} rate limit")
+        return lease
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics."""
+        def snapshot(state):
+            self._refill(state, self.clock())
+            return {
+                "waiting": len(state.get("waiting", {})),
+                "active": len(state.get("active", {})),
+                "requests_available": _round(state.get("requests")),
+                "tokens_available": _round(state.get("tokens")),
+                "blocked_for": round(max(state.get("blocked_until", 0.0) - self.clock(), 0.0), 1),
+            }
+        return {
+            "limits": {k: getattr(self.limits, k) for k in ProviderLimits.__dataclass_fields__},
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "waited": round(self.waited, 1),
+            "rate_limited": self.rate_limited,
+            **self.store.transact(self.provider, snapshot)
+        }
+
+    def _wakeup(self) -> Optional[asyncio.Future]:
+        if isinstance(self.store, SQLiteStore):
+            # Other processes cannot wake us; the shared store is polled
+            return None
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._wakeups_lock:
+            self._wakeups[future] = loop
+        return future
+
+    def _discard(self, wakeup: Optional[asyncio.Future]) -> None:
+        if wakeup is not None:
+            with self._wakeups_lock:
+                self._wakeups.pop(wakeup, None)
+
+    async def _sleep(self, wait: float, wakeup: Optional[asyncio.Future]) -> None:
+        if wakeup is None:
+            await asyncio.sleep(wait)
+            return
+        try:
+            await asyncio.wait_for(wakeup, wait)
+        except asyncio.TimeoutError:
+            pass
+
+    def _wake(self) -> None:
+        """Have every in-process waiter re-check; they may be on other event loops."""
+        with self._wakeups_lock:
+            wakeups = list(self._wakeups.items())
+        for future, loop in wakeups:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, future)
+
+    async def _run(self, method, *args):
+        update = lambda state: method(state, *args)  # noqa: E731
+        if isinstance(self.store, SQLiteStore):
+            # Waiting on the database lock must not stall the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.store.transact, self.provider, update)
+        return self.store.transact(self.provider, update)
+
+    def _try_grant(self, state: Dict[str, Any], lease_id: str, ticket: Dict[str, Any]) -> float:
+        """Grant the call if it is next in line and within limits.
+
+        Returns:
+            0 when granted, otherwise seconds to wait before asking again
+        """
+        now = self.clock()
+        self._refill(state, now)
+        self._prune(state, now)
+        waiting = state.setdefault("waiting", {})
+        queued = waiting.setdefault(lease_id, {**ticket, "queued": now})
+        queued["seen"] = now
+
+        if self._next_in_line(state) != lease_id:
+            return POLL_INTERVAL
+
+        wait = self._wait_for_capacity(state, ticket["tokens"], now)
+        if wait > 0:
+            return min(wait, MAX_WAIT)
+
+        del waiting[lease_id]
+        if state.get("requests") is not None:
+            state["requests"] -= 1
+        if state.get("tokens") is not None:
+            state["tokens"] -= ticket["tokens"]
+        state.setdefault("active", {})[lease_id] = {"pid": ticket["pid"], "started": now}
+        state.setdefault("served", {})[ticket["owner"]] = now
+        return 0.0
+
+    def _wait_for_capacity(self, state: Dict[str, Any], tokens: int, now: float) -> float:
+        limits = self.limits
+        blocked = state.get("blocked_until", 0.0) - now
+        if blocked > 0:
+            return blocked
+        if limits.max_concurrent and len(state.get("active", {})) >= limits.max_concurrent:
+            return POLL_INTERVAL
+        wait = 0.0
+        if limits.requests_per_minute and state["requests"] < 1:
+            wait = (1 - state["requests"]) * 60 / limits.requests_per_minute
+        if limits.tokens_per_minute:
+            # A call larger than the whole bucket goes through once the bucket is full
+            needed = min(tokens, limits.tokens_per_minute)
+            if state["tokens"] < needed:
+                wait = max(wait, (needed - state["tokens"]) * 60 / limits.tokens_per_minute)
+        return wait
+
+    def _next_in_line(self, state: Dict[str, Any]) -> Optional[str]:
+        """The oldest call of the owner served least recently."""
+        heads: Dict[str, Tuple[float, str]] = {}
+        for lease_id, ticket in state["waiting"].items():
+            head = heads.get(ticket["owner"])
+            if head is None or ticket["queued"] < head[0]:
+                heads[ticket["owner"]] = (ticket["queued"], lease_id)
+        if not heads:
+            return None
+        served = state.get("served", {})
+        owner = min(heads, key=lambda o: (served.get(o, 0.0), heads[o][0]))
+        return heads[owner][1]
+
+    def _release(self, state: Dict[str, Any], lease: Lease) -> None:
+        now = self.clock()
+        self._refill(state, now)
+        state.get("active", {}).pop(lease.id, None)
+        tpm = self.limits.tokens_per_minute
+        if tpm and lease.tokens_used is not None:
+            # Settle the reservation against actual usage; overuse is paid back over time
+            state["tokens"] = max(state["tokens"] - (lease.tokens_used - lease.tokens), -tpm)
+        if lease.retry_after is not None:
+            self.rate_limited += 1
+            state["blocked_until"] = max(state.get("blocked_until", 0.0), now + lease.retry_after)
+            if state.get("requests") is not None:
+                state["requests"] = 0.0
+            logger.warning(f"{self.provider} rate limited the orchestrator, pausing it for {lease.retry_after:g}s")
+
+    def _forget(self, state: Dict[str, Any], lease_id: str) -> None:
+        state.get("waiting", {}).pop(lease_id, None)
+
+    def _refill(self, state: Dict[str, Any], now: float) -> None:
+        elapsed = max(now - state.get("updated", now), 0.0)
+        state["updated"] = now
+        for key, per_minute in (
+            ("requests", self.limits.requests_per_minute),
+            ("tokens", self.limits.tokens_per_minute),
+        ):
+            if not per_minute:
+                state[key] = None
+            elif state.get(key) is None:
+                state[key] = float(per_minute)
+            else:
+                state[key] = min(state[key] + elapsed * per_minute / 60, float(per_minute))
+
+    def _prune(self, state: Dict[str, Any], now: float) -> None:
+        """Drop queue entries of waiters that went away and slots of dead processes."""
+        waiting = state.get("waiting", {})
+        for lease_id in [i for i, t in waiting.items() if now - t["seen"] > STALE_AFTER]:
+            del waiting[lease_id]
+        active = state.get("active", {})
+        for lease_id in [i for i, a in active.items() if not _pid_alive(a["pid"])]:
+            logger.warning(f"Releasing {self.provider} slot held by exited process {active[lease_id]['pid']}")
+            del active[lease_id]
+        served = state.get("served", {})
+        for owner in [o for o, t in served.items() if now - t > 3600]:
+            del served[owner]
+
+
+_limiters: Dict[Tuple[str, Optional[str]], ProviderLimiter] = {}
+_stores: Dict[str, SQLiteStore] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(
+    provider: str,
+    limits: ProviderLimits,
+    store_path: Optional[Union[str, Path]] = None
+) -> ProviderLimiter:
+    """Return the process-wide limiter for a provider, creating it on first use.
+
+    Args:
+        provider: Provider (adapter) name
+        limits: Limits to apply; replace those of an existing limiter
+        store_path: SQLite database shared with other processes (None for this process only)
+    """
+    path = str(Path(store_path).expanduser().resolve()) if store_path else None
+    with _registry_lock:
+        limiter = _limiters.get((provider, path))
+        if limiter is None:
+            store = None
+            if path:
+                store = _stores.get(path)
+                if store is None:
+                    store = _stores[path] = SQLiteStore(path)
+            limiter = _limiters[(provider, path)] = ProviderLimiter(provider, limits, store)
+        else:
+            limiter.limits = limits
+        return limiter
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
@@ -0,0 +1,250 @@
+# ABOUTME: BM25 retrieval over past iteration outputs, errors and touched paths
+# ABOUTME: Backed by an incrementally updated SQLite FTS5 index in .agent/cache
+
+"""Relevance-ranked retrieval for Ralph Orchestrator.
+
+Every iteration's output is split into paragraph-sized snippets and added,
+together with its error and the paths it touched, to a SQLite FTS5 table.
+Before an iteration, the snippets that best match the current task are
+ranked with FTS5's built-in BM25 and injected into the prompt.
+
+Ranking costs a few microseconds per matching snippet, so queries are kept
+bounded as the index grows. Each term's document frequency is kept in an
+ordinary indexed table, updated as snippets are added, so the task's
+rarest terms can be chosen first with cheap key lookups. At most
+``MAX_CANDIDATES`` of the newest snippets matching them are ranked. FTS5
+still reads every posting of the chosen terms once per query to weigh
+them, so a task made only of very common terms costs more.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger('ralph-orchestrator.retrieval')
+
+SNIPPET_CHARS = 600  # Target snippet size; paragraphs are packed up to this
+MAX_QUERY_TERMS = 12  # Terms of the task looked up in the index
+MAX_CANDIDATES = 100  # Snippets ranked per query, however many match
+KIND_OUTPUT = "output"
+KIND_ERROR = "error"
+KIND_PATHS = "paths"
+
+# Same split as the unicode61 tokenizer, which treats '_' as a separator
+_WORD = re.compile(r'[^\W_]{3,}')
+_STOPWORDS = frozenset(
+    "the and for that this with from are was were been have has had not but you your "
+    "can will would should could into then than there their them they its also just "
+    "all any some more most such only other which what when where who how about add "
+    "make sure use using new".split()
+)
+
+
+@dataclass
+class Snippet:
+    """A retrieved piece of an earlier iteration."""
+
+    iteration: Optional[int]
+    kind: str
+    text: str
+    score: float  # BM25 relevance, higher is better
+
+    def render(self) -> str:
+        label = f"Iteration {self.iteration}" if self.iteration is not None else "Earlier"
+        if self.kind != KIND_OUTPUT:
+            label += f" ({self.kind})"
+        return f"{label}: {self.text}"
+
+
+class RetrievalIndex:
+    """On-disk BM25 index of iteration outputs, errors and touched paths."""
+
+    def __init__(self, path: Path = Path(".agent/cache/retrieval.db")):
+        """Open (or create) the index.
+
+        Raises:
+            sqlite3.OperationalError: If SQLite was built without FTS5
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Written from the executor after each iteration, queried on the event loop
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # No stemming, so query terms can be looked up in the vocabulary as written
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS snippets USING fts5("
+            "text, kind UNINDEXED, iteration UNINDEXED, tokenize='unicode61')"
+        )
+        has_terms = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'terms'"
+        ).fetchone()
+        # Snippets containing each term; fts5vocab computes this by scanning the index
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, doc INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        if not has_terms:
+            # Index created before the terms table existed
+            self._conn.execute("CREATE VIRTUAL TABLE temp.vocab USING fts5vocab(main, snippets, row)")
+            self._conn.execute("INSERT INTO terms SELECT term, doc FROM temp.vocab")
+            self._conn.execute("DROP TABLE temp.vocab")
+        self.queries = 0
+        self.hits = 0
+        self.query_time = 0.0
+        self.max_query_time = 0.0
+        self.rows = self._conn.execute("SELECT count(*) FROM snippets").fetchone()[0]
+
+    def add(
+        self,
+        iteration: Optional[int],
+        output: str = "",
+        error: Optional[str] = None,
+        paths: Iterable[str] = ()
+    ) -> int:
+        """Index one iteration.
+
+        Returns:
+            Number of snippets added
+        """
+        rows = [(text, KIND_OUTPUT, iteration) for text in self._snippets(output)]
+        if error:
+            rows.append((error[:SNIPPET_CHARS * 2], KIND_ERROR, iteration))
+        paths = sorted(paths)
+        if paths:
+            rows.append((" ".join(paths)[:SNIPPET_CHARS * 4], KIND_PATHS, iteration))
+        if not rows:
+            return 0
+        frequency = Counter(term for text, _, _ in rows for term in set(_WORD.findall(text.lower())))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO snippets (text, kind, iteration) VALUES (?, ?, ?)", rows)
+            self._conn.executemany(
+                "INSERT INTO terms (term, doc) VALUES (?, ?) "
+                "ON CONFLICT (term) DO UPDATE SET doc = doc + excluded.doc",
+                frequency.items()
+            )
+            self._conn.execute("COMMIT")
+            self.rows += len(rows)
+        return len(rows)
+
+    def search(self, query: str, k: int = 5) -> List[Snippet]:
+        """Return up to ``k`` snippets ranked by BM25 relevance to ``query``."""
+        terms = self._terms(query)
+        if not terms or k <= 0:
+            return []
+        start = time.perf_counter()
+        with self._lock:
+            try:
+                rows = self._query(terms, k)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Retrieval query failed: {e}")
+                return []
+        elapsed = time.perf_counter() - start
+        self.queries += 1
+        self.hits += len(rows)
+        self.query_time += elapsed
+        self.max_query_time = max(self.max_query_time, elapsed)
+        # FTS5's bm25() is negative, more negative meaning more relevant
+        return [Snippet(iteration, kind, text, -score) for text, kind, iteration, score in rows]
+
+    def _query(self, terms: List[str], k: int) -> List[tuple]:
+        placeholders = ", ".join("?" * len(terms))
+        frequency = dict(self._conn.execute(
+            f"SELECT term, doc FROM terms WHERE term IN ({placeholders})", terms
+        ).fetchall())
+        if not frequency:
+            return []
+
+        # Rarest terms first: they carry most of the BM25 weight and the fewest postings
+        chosen: List[str] = []
+        postings = 0
+        for term in sorted(frequency, key=frequency.get):
+            if chosen and postings + frequency[term] > MAX_CANDIDATES:
+                break
+            chosen.append(term)
+            postings += frequency[term]
+        # Quoting makes every term a literal, whatever FTS5 syntax it resembles
+        match = " OR ".join(f'"{term}"' for term in chosen)
+
+        # FTS5 walks the postings newest first and stops after MAX_CANDIDATES,
+        # so only those are ranked even when a term is in every snippet
+        rows = self._conn.execute(
+            "SELECT text, kind, iteration, score FROM ("
+            "SELECT text, kind, iteration, rank AS score FROM snippets "
+            "WHERE snippets MATCH ? ORDER BY rowid DESC LIMIT ?"
+            ") ORDER BY score LIMIT ?",
+            (match, MAX_CANDIDATES, k * 2)
+        ).fetchall()
+
+        # The same error or output repeated across iterations is only worth one slot
+        results, seen = [], set()
+        for row in rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                results.append(row)
+        return results[:k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM snippets")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("COMMIT")
+            self.rows = 0
+
+    def close(self) -> None:
+        with self._lock:
+            # Merge FTS5 segments so the next run's queries stay fast
+            self._conn.execute("INSERT INTO snippets (snippets) VALUES ('optimize')")
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "snippets": self.rows,
+            "queries": self.queries,
+            "hits": self.hits,
+            "avg_query_ms": round(self.query_time / self.queries * 1000, 3) if self.queries else None,
+            "max_query_ms": round(self.max_query_time * 1000, 3) if self.queries else None,
+        }
+
+    @staticmethod
+    def _terms(query: str) -> List[str]:
+        """The query's distinct terms, longest (usually most specific) first."""
+        terms = []
+        for word in _WORD.findall(query.lower()):
+            if word not in _STOPWORDS and word not in terms:
+                terms.append(word)
+        return sorted(terms, key=len, reverse=True)[:MAX_QUERY_TERMS]
+
+    @staticmethod
+    def _snippets(text: str) -> List[str]:
+        """Pack paragraphs into snippets of about SNIPPET_CHARS."""
+        snippets: List[str] = []
+        current = ""
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            while len(paragraph) > SNIPPET_CHARS:
+                # Break long paragraphs at a sentence or word boundary
+                cut = max(paragraph.rfind('. ', 0, SNIPPET_CHARS), paragraph.rfind(' ', 0, SNIPPET_CHARS))
+                cut = cut + 1 if cut > SNIPPET_CHARS // 2 else SNIPPET_CHARS
+                if current:
+                    snippets.append(current)
+                    current = ""
+                snippets.append(paragraph[:cut].strip())
+                paragraph = paragraph[cut:].strip()
+            if current and len(current) + len(paragraph) + 1 > SNIPPET_CHARS:
+                snippets.append(current)
+                current = ""
+            current = f"{current}\n{paragraph}" if current else paragraph
+        if current:
+            snippets.append(current)
+        return snippets
@@ -0,0 +1,191 @@
+# ABOUTME: Latency-aware adapter routing for Ralph Orchestrator
+# ABOUTME: Picks the adapter for each iteration with a UCB or Thompson sampling bandit
+
+"""Adaptive adapter routing for Ralph Orchestrator."""
+
+import json
+import logging
+import math
+import random
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('ralph-orchestrator.routing')
+
+POLICIES = ("ucb", "thompson")
+
+
+@dataclass
+class ArmStats:
+    """What the router knows about one adapter."""
+
+    pulls: float = 0.0
+    successes: float = 0.0
+    latency: Optional[float] = None  # EWMA of successful call latency in seconds
+    cost: float = 0.0  # Total cost of all calls
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.pulls if self.pulls else 0.0
+
+    @property
+    def cost_per_success(self) -> Optional[float]:
+        return self.cost / self.successes if self.successes else None
+
+
+class AdapterRouter:
+    """Routes iterations to the adapter with the best expected throughput.
+
+    Throughput is success rate divided by EWMA latency (successful
+    iterations per second). The UCB policy adds an exploration bonus to the
+    success rate; Thompson sampling draws it from a Beta posterior. Adapters
+    that have never run are tried first, and adapters whose cost per
+    successful iteration exceeds the ceiling are only used when nothing
+    else fits. Stats persist in ``state_file`` so later runs start warm.
+    """
+
+    def __init__(
+        self,
+        state_file: Path = Path(".agent/routing.json"),
+        policy: str = "ucb",
+        cost_ceiling: Optional[float] = None,
+        exploration: float = 1.0,
+        alpha: float = 0.2,
+        window: int = 200,
+        save_interval: float = 30.0,
+        seed: Optional[int] = None
+    ):
+        """Initialize the router.
+
+        Args:
+            state_file: JSON file the stats are persisted to
+            policy: "ucb" or "thompson"
+            cost_ceiling: Maximum cost per successful iteration (None for no limit)
+            exploration: Weight of the UCB exploration bonus
+            alpha: EWMA weight of the newest latency sample
+            window: Pulls remembered per adapter; older evidence is scaled down
+            save_interval: Minimum seconds between saves while running
+            seed: Random seed for Thompson sampling
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.state_file = state_file
+        self.policy = policy
+        self.cost_ceiling = cost_ceiling
+        self.exploration = exploration
+        self.alpha = alpha
+        self.window = window
+        self.save_interval = save_interval
+        self.arms: Dict[str, ArmStats] = {}
+        self.decisions = 0
+        self._rng = random.Random(seed)
+        self._last_save = time.monotonic()
+
+    def rank(self, names: List[str]) -> List[str]:
+        """Order adapters best first; the head is the adapter for the next iteration."""
+        if not names:
+            return []
+        self.decisions += 1
+        arms = {name: self.arms.setdefault(name, ArmStats()) for name in names}
+
+        # Adapters over the cost ceiling go last, cheapest first
+        affordable = [n for n in names if not self._over_budget(arms[n])]
+        expensive = sorted(
+            (n for n in names if n not in affordable),
+            key=lambda n: arms[n].cost_per_success
+        )
+
+        total = sum(arm.pulls for arm in arms.values())
+        # Adapters without a success are assumed to be as fast as the others
+        known = [arm.latency for arm in arms.values() if arm.latency is not None]
+        prior = sum(known) / len(known) if known else 1.0
+        scores = {name: self._score(arms[name], total, prior) for name in affordable}
+        ranked = sorted(affordable, key=lambda n: scores[n], reverse=True)
+        return ranked + expensive
+
+    def record(self, name: str, success: bool, latency: float, cost: float = 0.0) -> None:
+        """Record the outcome of one adapter call."""
+        arm = self.arms.setdefault(name, ArmStats())
+        if arm.pulls >= self.window:
+            # Keep a sliding view so a long run can follow a changing adapter
+            scale = (self.window - 1) / arm.pulls
+            arm.pulls *= scale
+            arm.successes *= scale
+            arm.cost *= scale
+        arm.pulls += 1
+        arm.cost += cost
+        if success:
+            arm.successes += 1
+            arm.latency = latency if arm.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * arm.latency
+            )
+
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def load(self) -> bool:
+        """Load persisted stats.
+
+        Returns:
+            True if stats were restored
+        """
+        if not self.state_file.exists():
+            return False
+        try:
+            data = json.loads(self.state_file.read_text())
+            self.arms = {name: ArmStats(**stats) for name, stats in data.get('arms', {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not load routing state from {self.state_file}: {e}")
+            return False
+        logger.info(f"Restored routing stats for {', '.join(self.arms) or 'no adapters'}")
+        return True
+
+    def save(self) -> None:
+        """Persist the stats atomically."""
+        self._last_save = time.monotonic()
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps({
+                'policy': self.policy,
+                'arms': {name: asdict(arm) for name, arm in self.arms.items()}
+            }, indent=2))
+            tmp_file.replace(self.state_file)
+        except OSError as e:
+            logger.warning(f"Could not save routing state: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics."""
+        return {
+            "policy": self.policy,
+            "decisions": self.decisions,
+            "adapters": {
+                name: {
+                    "pulls": round(arm.pulls, 1),
+                    "success_rate": round(arm.success_rate, 3),
+                    "latency": round(arm.latency, 3) if arm.latency is not None else None,
+                    "cost_per_success": (
+                        round(arm.cost_per_success, 4) if arm.cost_per_success is not None else None
+                    ),
+                }
+                for name, arm in self.arms.items()
+            }
+        }
+
+    def _over_budget(self, arm: ArmStats) -> bool:
+        if self.cost_ceiling is None or arm.cost_per_success is None:
+            return False
+        return arm.cost_per_success > self.cost_ceiling
+
+    def _score(self, arm: ArmStats, total_pulls: float, prior_latency: float) -> float:
+        if arm.pulls < 1:
+            return math.inf
+        if self.policy == "thompson":
+            rate = self._rng.betavariate(arm.successes + 1, arm.pulls - arm.successes + 1)
+        else:
+            bonus = self.exploration * math.sqrt(2 * math.log(max(total_pulls, 1)) / arm.pulls)
+            rate = min(arm.success_rate + bonus, 1.0)
+        latency = arm.latency if arm.latency is not None else prior_latency
+        return rate / max(latency, 1e-3)
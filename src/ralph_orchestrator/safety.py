@@ -3,9 +3,11 @@
 
 """Safety mechanisms for Ralph Orchestrator."""
 
+from collections import Counter
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 import logging
+import time
 
 logger = logging.getLogger('ralph-orchestrator.safety')
 
@@ -17,6 +19,106 @@ class SafetyCheckResult:
     reason: Optional[str] = None
 
 
+class CircuitBreaker:
+    """Per-adapter circuit breaker.
+    
+    Closed: calls go through and consecutive failures are counted. Open:
+    calls are refused until the reset timeout passes. Half-open: one trial
+    call is let through; success closes the breaker, failure reopens it
+    with the reset timeout doubled (up to ``max_reset_timeout``).
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 60.0,
+        max_reset_timeout: float = 900.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the breaker.
+        
+        Args:
+            name: Adapter name
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds an open breaker waits before a trial call
+            max_reset_timeout: Upper bound for the backed-off reset timeout
+            clock: Time source
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.failures = 0
+        self.timeouts = 0
+        self.refused = 0
+        self.transitions: Counter = Counter()
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now; moves open breakers to half-open when due."""
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                self.refused += 1
+                return False
+            self._transition(self.HALF_OPEN)
+        return True
+    
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self.reset_timeout = self.base_reset_timeout
+            self._transition(self.CLOSED)
+    
+    def record_failure(self, timed_out: bool = False) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if timed_out:
+            self.timeouts += 1
+        if self.state == self.HALF_OPEN:
+            # The trial failed; wait longer before the next one
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters."""
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "refused": self.refused,
+            "reset_timeout": self.reset_timeout,
+            "retry_in": retry_in,
+            "transitions": dict(self.transitions)
+        }
+    
+    def _open(self) -> None:
+        self.opened_at = self.clock()
+        self._transition(self.OPEN)
+    
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.transitions[f"{self.state}->{state}"] += 1
+        log = logger.warning if state == self.OPEN else logger.info
+        log(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+
+
 class SafetyGuard:
     """Safety guardrails for orchestration."""
     
@@ -25,7 +127,9 @@ class SafetyGuard:
         max_iterations: int = 100,
         max_runtime: int = 14400,  # 4 hours
         max_cost: float = 10.0,
-        consecutive_failure_limit: int = 5
+        consecutive_failure_limit: int = 5,
+        breaker_threshold: int = 3,
+        breaker_reset_timeout: float = 60.0
     ):
         """Initialize safety guard.
         
@@ -34,12 +138,33 @@ class SafetyGuard:
             max_runtime: Maximum runtime in seconds
             max_cost: Maximum allowed cost in dollars
             consecutive_failure_limit: Max consecutive failures before stopping
+            breaker_threshold: Consecutive adapter failures that open its breaker
+            breaker_reset_timeout: Seconds before an open breaker is retried
         """
         self.max_iterations = max_iterations
         self.max_runtime = max_runtime
         self.max_cost = max_cost
         self.consecutive_failure_limit = consecutive_failure_limit
         self.consecutive_failures = 0
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+    
+    def breaker(self, adapter_name: str) -> CircuitBreaker:
+        """Circuit breaker for an adapter, created on first use."""
+        breaker = self.breakers.get(adapter_name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                adapter_name,
+                failure_threshold=self.breaker_threshold,
+                reset_timeout=self.breaker_reset_timeout
+            )
+            self.breakers[adapter_name] = breaker
+        return breaker
+    
+    def breaker_stats(self) -> Dict[str, Dict[str, Any]]:
+        """State of every adapter's circuit breaker."""
+        return {name: breaker.get_stats() for name, breaker in self.breakers.items()}
     
     def check(
         self,
@@ -112,4 +237,4 @@ class SafetyGuard:
     
     def reset(self):
         """Reset safety counters."""
-        self.consecutive_failures = 0
\ No newline at end of file
+        self.consecutive_failures = 0
@@ -0,0 +1,339 @@
+# ABOUTME: Task dependency scheduler for Ralph Orchestrator
+# ABOUTME: Parses PROMPT.md checkboxes into a persisted DAG and hands out ready tasks by priority
+
+"""Task DAG scheduler for Ralph Orchestrator."""
+
+import hashlib
+import heapq
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('ralph-orchestrator.scheduler')
+
+# Task line patterns: checkboxes carry nesting and completion state
+CHECKBOX_PATTERN = re.compile(r'^(\s*)[-*]\s*\[([ xX]?)\]\s*(.+)$')
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+LEGACY_PATTERNS = [
+    re.compile(r'^\s*\d+\.\s*(.+)$'),  # Numbered tasks
+    re.compile(r'^Task:\s*(.+)$'),  # Task: format
+    re.compile(r'^TODO:\s*(.+)$'),  # TODO: format
+]
+
+# Inline annotations, e.g. "(depends: setup-db, 2)", "[priority: high]", "<!-- id: api -->"
+ANNOTATION_PATTERN = re.compile(
+    r'(?:\(|\[|<!--)\s*(depends|priority|id)\s*:\s*(.*?)\s*(?:\)|\]|-->)',
+    re.IGNORECASE
+)
+
+PRIORITY_NAMES = {'critical': 0, 'high': 1, 'medium': 2, 'normal': 2, 'low': 3}
+DEFAULT_PRIORITY = 2
+
+
+def _slugify(text: str) -> str:
+    """Build a short identifier from a task description."""
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:40].rstrip('-') or 'task'
+
+
+class TaskScheduler:
+    """Dependency-aware task scheduler backed by a ready-heap.
+
+    Tasks are parsed from markdown: headings group tasks into sections,
+    nested checkboxes become subtasks that their parent depends on, and
+    inline annotations add explicit dependencies and priorities.
+    """
+
+    def __init__(self, state_file: Path = Path(".agent/tasks.json")):
+        """Initialize the scheduler.
+
+        Args:
+            state_file: Where the task DAG is persisted between runs
+        """
+        self.state_file = state_file
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.prompt_hash: Optional[str] = None
+        self._dependents: Dict[str, List[str]] = {}
+        self._waiting_on: Dict[str, int] = {}
+        self._ready: List[Tuple[int, int, str]] = []
+
+    # -- Parsing -------------------------------------------------------------
+
+    def parse(self, prompt: str) -> Dict[str, Dict[str, Any]]:
+        """Parse prompt text into task records keyed by task key."""
+        tasks: Dict[str, Dict[str, Any]] = {}
+        by_number: Dict[int, str] = {}
+        section = None
+        stack: List[Tuple[int, str]] = []  # (indent, key) of open checkbox parents
+        now = datetime.now().isoformat()
+
+        for line in prompt.split('\n'):
+            heading = HEADING_PATTERN.match(line)
+            if heading:
+                section = heading.group(2)
+                stack = []
+                continue
+
+            checkbox = CHECKBOX_PATTERN.match(line)
+            if checkbox:
+                indent = len(checkbox.group(1).expandtabs(4))
+                done = checkbox.group(2).lower() == 'x'
+                text = checkbox.group(3)
+            else:
+                text = None
+                for pattern in LEGACY_PATTERNS:
+                    match = pattern.match(line)
+                    if match:
+                        text = match.group(1)
+                        break
+                if text is None:
+                    continue
+                indent, done = None, False
+
+            annotations = {name.lower(): value for name, value in ANNOTATION_PATTERN.findall(text)}
+            description = ANNOTATION_PATTERN.sub('', text).strip()
+            if not description:
+                continue
+
+            key = annotations.get('id') or _slugify(description)
+            base_key, suffix = key, 2
+            while key in tasks:
+                key = f"{base_key}-{suffix}"
+                suffix += 1
+
+            number = len(tasks) + 1
+            by_number[number] = key
+            tasks[key] = {
+                'id': number,
+                'key': key,
+                'description': description,
+                'section': section,
+                'priority': self._parse_priority(annotations.get('priority')),
+                'depends_on': [d.strip() for d in annotations.get('depends', '').split(',') if d.strip()],
+                'parent': None,
+                'status': 'completed' if done else 'pending',
+                'created_at': now,
+                'completed_at': now if done else None,
+                'iteration': None
+            }
+
+            if indent is not None:
+                while stack and stack[-1][0] >= indent:
+                    stack.pop()
+                if stack:
+                    parent_key = stack[-1][1]
+                    tasks[key]['parent'] = parent_key
+                    # A parent is only ready once its subtasks are done
+                    tasks[parent_key]['depends_on'].append(key)
+                stack.append((indent, key))
+
+        # Resolve dependency references given by number or key
+        for task in tasks.values():
+            resolved = []
+            for ref in task['depends_on']:
+                target = by_number.get(int(ref)) if ref.isdigit() else (ref if ref in tasks else None)
+                if target and target != task['key'] and target not in resolved:
+                    resolved.append(target)
+                elif not target:
+                    logger.warning(f"Task '{task['key']}' depends on unknown task '{ref}'")
+            task['depends_on'] = resolved
+
+        return tasks
+
+    @staticmethod
+    def _parse_priority(value: Optional[str]) -> int:
+        """Convert a priority annotation to a heap rank (lower runs first)."""
+        if not value:
+            return DEFAULT_PRIORITY
+        value = value.strip().lower()
+        if value.lstrip('p').isdigit():
+            return int(value.lstrip('p'))
+        return PRIORITY_NAMES.get(value, DEFAULT_PRIORITY)
+
+    # -- Loading and persistence ---------------------------------------------
+
+    def load_from_prompt(self, prompt: str) -> None:
+        """Build the DAG from prompt text, keeping progress for known tasks."""
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+        if prompt_hash == self.prompt_hash and self.tasks:
+            return
+
+        parsed = self.parse(prompt)
+        if not parsed:
+            parsed['execute-orchestrator-instructions'] = {
+                'id': 1,
+                'key': 'execute-orchestrator-instructions',
+                'description': 'Execute orchestrator instructions',
+                'section': None,
+                'priority': DEFAULT_PRIORITY,
+                'depends_on': [],
+                'parent': None,
+                'status': 'pending',
+                'created_at': datetime.now().isoformat(),
+                'completed_at': None,
+                'iteration': None
+            }
+
+        for key, task in parsed.items():
+            previous = self.tasks.get(key)
+            if previous and task['status'] != 'completed':
+                for field in ('status', 'created_at', 'completed_at', 'iteration'):
+                    task[field] = previous[field]
+
+        self.tasks = parsed
+        self.prompt_hash = prompt_hash
+        self._rebuild()
+        self.save()
+
+    def load(self) -> bool:
+        """Load a persisted DAG.
+
+        Returns:
+            True if a saved DAG was restored
+        """
+        if not self.state_file.exists():
+            return False
+        try:
+            data = json.loads(self.state_file.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load task state from {self.state_file}: {e}")
+            return False
+
+        self.tasks = {task['key']: task for task in data.get('tasks', [])}
+        self.prompt_hash = data.get('prompt_hash')
+        for task in self.tasks.values():
+            # Work that was running when the last process died starts over
+            if task['status'] == 'in_progress':
+                task['status'] = 'pending'
+        self._rebuild()
+        logger.info(f"Restored {len(self.tasks)} tasks from {self.state_file}")
+        return True
+
+    def save(self) -> None:
+        """Persist the DAG atomically."""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps({
+            'prompt_hash': self.prompt_hash,
+            'tasks': list(self.tasks.values())
+        }, indent=2))
+        tmp_file.replace(self.state_file)
+
+    def _rebuild(self) -> None:
+        """Recompute dependency counts and the ready heap."""
+        self._dependents = {key: [] for key in self.tasks}
+        self._waiting_on = {}
+        for key, task in self.tasks.items():
+            pending_deps = [d for d in task['depends_on'] if self.tasks[d]['status'] != 'completed']
+            self._waiting_on[key] = len(pending_deps)
+            for dep in task['depends_on']:
+                self._dependents[dep].append(key)
+
+        self._break_cycles()
+        self._ready = [
+            self._heap_entry(task) for key, task in self.tasks.items()
+            if task['status'] == 'pending' and self._waiting_on[key] == 0
+        ]
+        heapq.heapify(self._ready)
+
+    def _break_cycles(self) -> None:
+        """Drop dependency edges that would leave tasks waiting forever."""
+        while True:
+            stuck = self._stuck_tasks()
+            if not stuck:
+                return
+
+            # Follow unfinished dependencies until a task repeats; the last
+            # edge walked closes a cycle. Sorted, so every run drops the same edge.
+            walked: List[str] = []
+            key = min(stuck)
+            while key not in walked:
+                walked.append(key)
+                key = min(d for d in self.tasks[key]['depends_on'] if d in stuck)
+
+            dependent = walked[-1]
+            logger.warning(f"Dependency cycle: ignoring '{dependent}' -> '{key}'")
+            self.tasks[dependent]['depends_on'].remove(key)
+            self._dependents[key].remove(dependent)
+            self._waiting_on[dependent] -= 1
+
+    def _stuck_tasks(self) -> set:
+        """Tasks that can never become ready (Kahn's algorithm leftovers)."""
+        remaining = dict(self._waiting_on)
+        queue = [key for key, count in remaining.items() if count == 0]
+        while queue:
+            key = queue.pop()
+            if self.tasks[key]['status'] == 'completed':
+                continue
+            for dependent in self._dependents[key]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+        # Completed tasks never wait; only edges to unfinished tasks were counted
+        return {
+            key for key, count in remaining.items()
+            if count > 0 and self.tasks[key]['status'] != 'completed'
+        }
+
+    @staticmethod
+    def _heap_entry(task: Dict[str, Any]) -> Tuple[int, int, str]:
+        return (task['priority'], task['id'], task['key'])
+
+    # -- Scheduling ----------------------------------------------------------
+
+    def claim(self, iteration: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Take the highest-priority ready task and mark it in progress."""
+        while self._ready:
+            _, _, key = heapq.heappop(self._ready)
+            task = self.tasks.get(key)
+            if task and task['status'] == 'pending':
+                task['status'] = 'in_progress'
+                task['iteration'] = iteration
+                self.save()
+                return task
+        return None
+
+    def release(self, task: Dict[str, Any]) -> None:
+        """Return an unfinished task to the ready heap."""
+        task = self.tasks.get(task['key'], task)
+        if task['status'] == 'in_progress':
+            task['status'] = 'pending'
+            heapq.heappush(self._ready, self._heap_entry(task))
+            self.save()
+
+    def complete(self, task: Dict[str, Any]) -> None:
+        """Mark a task completed and release the tasks waiting on it."""
+        task = self.tasks.get(task['key'], task)
+        if task['status'] == 'completed':
+            return
+        task['status'] = 'completed'
+        task['completed_at'] = datetime.now().isoformat()
+        for dependent in self._dependents.get(task['key'], []):
+            self._waiting_on[dependent] -= 1
+            if self._waiting_on[dependent] == 0 and self.tasks[dependent]['status'] == 'pending':
+                heapq.heappush(self._ready, self._heap_entry(self.tasks[dependent]))
+        self.save()
+
+    # -- Queries -------------------------------------------------------------
+
+    @property
+    def ready_count(self) -> int:
+        return sum(1 for _, _, key in self._ready if self.tasks[key]['status'] == 'pending')
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Tasks not yet started, in dispatch order."""
+        tasks = [t for t in self.tasks.values() if t['status'] == 'pending']
+        return sorted(tasks, key=lambda t: (self._waiting_on.get(t['key'], 0) > 0, t['priority'], t['id']))
+
+    def in_progress(self) -> List[Dict[str, Any]]:
+        return [t for t in self.tasks.values() if t['status'] == 'in_progress']
+
+    def completed(self) -> List[Dict[str, Any]]:
+        tasks = [t for t in self.tasks.values() if t['status'] == 'completed']
+        return sorted(tasks, key=lambda t: t['completed_at'] or '')
+
+    def is_empty(self) -> bool:
+        return not self.tasks
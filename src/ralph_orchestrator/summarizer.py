@@ -0,0 +1,280 @@
+# ABOUTME: Rolling, hierarchical summary of agent output across iterations
+# ABOUTME: Extractive TF-IDF sentence ranking by default, optionally a cheap agent for merges
+
+"""Incremental summarization for Ralph Orchestrator.
+
+Every iteration's output becomes a leaf summary of its highest-ranked
+sentences. Whenever ``fanout`` summaries of one level accumulate they are
+merged into a single summary one level up, like a binary counter, so the
+summary of a long run stays logarithmic in its length and each update only
+processes the new output (merges only touch summaries of bounded size).
+Sentences are ranked by TF-IDF against all outputs seen so far.
+"""
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .tokens import TokenEstimator, get_estimator
+
+logger = logging.getLogger('ralph-orchestrator.summarizer')
+
+SUMMARY_VERSION = 1
+MAX_TERMS = 50000  # Document frequencies kept; the rarest terms are dropped beyond this
+SAVE_TERMS_EVERY = 20  # Updates between saves of the document frequencies
+MIN_RELATIVE_SCORE = 0.3  # Sentences scoring below this share of the best are left out
+MAX_SEEN_SENTENCES = 20000  # Sentences remembered to recognise boilerplate repeated across outputs
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9`"\'(\[])|\n+')
+_TERM = re.compile(r'[a-z][a-z0-9_]{2,}')
+_STOPWORDS = frozenset(
+    "the and for that this with from are was were been have has had not but you your "
+    "can will would should could into then than there their them they its also just "
+    "all any some more most such only other which what when where who how about now "
+    "let i'll i've here use using used".split()
+)
+# Sentences reporting outcomes are what later iterations need most
+_SIGNALS = re.compile(
+    r'\b(error|fail(?:ed|ing|ure)?|fixed|passed|passing|done|complete[d]?|implemented|'
+    r'added|created|updated|removed|todo|blocked|next)\b',
+    re.IGNORECASE
+)
+
+Summarize = Callable[[str, int], str]
+
+
+@dataclass
+class SummaryNode:
+    """Summary of a run of consecutive iterations."""
+
+    level: int
+    first: Optional[int]  # First and last iteration covered
+    last: Optional[int]
+    text: str
+
+    @property
+    def label(self) -> str:
+        if self.first is None:
+            return "Earlier"
+        if self.first == self.last:
+            return f"Iteration {self.first}"
+        return f"Iterations {self.first}-{self.last}"
+
+
+class RollingSummarizer:
+    """Keeps a hierarchical summary of prior iterations."""
+
+    def __init__(
+        self,
+        state_file: Path = Path(".agent/cache/summary.json"),
+        estimator: Optional[TokenEstimator] = None,
+        leaf_tokens: int = 300,
+        fanout: int = 4,
+        summarize: Optional[Summarize] = None
+    ):
+        """Initialize the summarizer.
+
+        Args:
+            state_file: JSON file the summary is persisted to
+            estimator: Token estimator for the summary budgets
+            leaf_tokens: Token budget of one iteration's summary; merged
+                summaries get twice as much
+            fanout: Summaries of one level merged into one of the next
+            summarize: Optional (text, max_tokens) -> summary used for merges,
+                e.g. a cheap agent; extractive ranking is used if it fails
+        """
+        self.state_file = state_file
+        self.estimator = estimator or get_estimator()
+        self.leaf_tokens = leaf_tokens
+        self.fanout = max(fanout, 2)
+        self.summarize = summarize
+        self.nodes: List[SummaryNode] = []  # Oldest first; levels never increase left to right
+        self.documents = 0
+        self.document_frequency: Counter = Counter()
+        self._seen: Dict[int, None] = {}  # Insertion-ordered set of sentence hashes
+        self._updates = 0
+        self.load()
+
+    def add(self, output: str, iteration: Optional[int] = None) -> SummaryNode:
+        """Summarize one iteration's output and fold it into the hierarchy."""
+        sentences = self._sentences(output)
+        terms = [self._terms(s) for s in sentences]
+        self.documents += 1
+        self.document_frequency.update(set(t for sentence_terms in terms for t in sentence_terms))
+
+        # Sentences repeated from earlier outputs ("Reading the file...") carry little news
+        keys = [hash(sentence.lower()) for sentence in sentences]
+        repeated = [key in self._seen for key in keys]
+        leaf = SummaryNode(0, iteration, iteration, self._extract(sentences, terms, self.leaf_tokens, repeated))
+        for key in keys:
+            self._seen[key] = None
+        while len(self._seen) > MAX_SEEN_SENTENCES:
+            del self._seen[next(iter(self._seen))]
+        self.nodes.append(leaf)
+        self._merge()
+
+        self._updates += 1
+        self.save(terms=self._updates % SAVE_TERMS_EVERY == 0)
+        return leaf
+
+    def entries(self) -> List[str]:
+        """Rendered summaries, oldest (most condensed) first."""
+        return [f"{node.label}: {node.text}" for node in self.nodes if node.text]
+
+    def extract(self, text: str, max_tokens: int) -> str:
+        """Extractive summary of arbitrary text within a token budget."""
+        sentences = self._sentences(text)
+        return self._extract(sentences, [self._terms(s) for s in sentences], max_tokens)
+
+    def reset(self) -> None:
+        """Forget the summaries; term statistics are kept."""
+        self.nodes = []
+        self.save()
+
+    def load(self) -> bool:
+        """Restore a persisted summary.
+
+        Returns:
+            True if a summary was restored
+        """
+        if not self.state_file.exists():
+            return False
+        try:
+            data = json.loads(self.state_file.read_text())
+            if data.get('version', 0) > SUMMARY_VERSION:
+                return False
+            self.nodes = [SummaryNode(**node) for node in data.get('nodes', [])]
+            terms = self._terms_file()
+            if terms.exists():
+                term_data = json.loads(terms.read_text())
+                self.documents = term_data.get('documents', 0)
+                self.document_frequency = Counter(term_data.get('df', {}))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not load summary from {self.state_file}: {e}")
+            return False
+        return True
+
+    def save(self, terms: bool = False) -> None:
+        """Persist the summary (small) and optionally the term statistics (larger)."""
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            self._write(self.state_file, {
+                'version': SUMMARY_VERSION,
+                'nodes': [asdict(node) for node in self.nodes]
+            })
+            if terms:
+                if len(self.document_frequency) > MAX_TERMS:
+                    self.document_frequency = Counter(dict(self.document_frequency.most_common(MAX_TERMS)))
+                self._write(self._terms_file(), {
+                    'documents': self.documents,
+                    'df': self.document_frequency
+                })
+        except OSError as e:
+            logger.warning(f"Could not save summary: {e}")
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "nodes": len(self.nodes),
+            "levels": max((node.level for node in self.nodes), default=-1) + 1,
+            "documents": self.documents,
+            "terms": len(self.document_frequency),
+            "tokens": sum(self.estimator.count(entry) for entry in self.entries()),
+        }
+
+    def _merge(self) -> None:
+        """Merge the newest ``fanout`` summaries while they share a level."""
+        while len(self.nodes) >= self.fanout:
+            group = self.nodes[-self.fanout:]
+            level = group[0].level
+            if any(node.level != level for node in group):
+                return
+            text = "\n".join(node.text for node in group if node.text)
+            merged = SummaryNode(level + 1, group[0].first, group[-1].last, self._condense(text))
+            self.nodes[-self.fanout:] = [merged]
+
+    def _condense(self, text: str) -> str:
+        budget = self.leaf_tokens * 2
+        if self.estimator.count(text) <= budget:
+            return text
+        if self.summarize:
+            try:
+                summary = self.summarize(text, budget).strip()
+                if summary:
+                    return self.estimator.truncate(summary, budget)
+            except Exception as e:
+                logger.warning(f"Summarizer failed, using extractive summary: {e}")
+        return self.extract(text, budget)
+
+    def _extract(
+        self,
+        sentences: List[str],
+        terms: List[List[str]],
+        max_tokens: int,
+        repeated: Optional[List[bool]] = None
+    ) -> str:
+        """Pick the highest-ranked sentences that fit, in their original order."""
+        if not sentences:
+            return ""
+        idf = self._idf
+        scores = []
+        for index, (sentence, sentence_terms) in enumerate(zip(sentences, terms)):
+            counts = Counter(sentence_terms)
+            score = sum((1 + math.log(tf)) * idf(term) for term, tf in counts.items())
+            score /= math.sqrt(len(sentence_terms) or 1)
+            if _SIGNALS.search(sentence):
+                score *= 1.5
+            if index >= len(sentences) - 3:
+                # Agents state their conclusions last
+                score *= 1.25
+            if repeated and repeated[index]:
+                score *= 0.2
+            scores.append(score)
+
+        chosen, used = set(), 0
+        seen = set()
+        floor = max(scores) * MIN_RELATIVE_SCORE
+        for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+            if scores[index] < floor:
+                break
+            sentence = sentences[index]
+            key = sentence.lower()
+            if key in seen:
+                continue
+            cost = self.estimator.count(sentence) + 1
+            if used + cost > max_tokens:
+                continue
+            chosen.add(index)
+            seen.add(key)
+            used += cost
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def _idf(self, term: str) -> float:
+        return math.log((1 + self.documents) / (1 + self.document_frequency.get(term, 0))) + 1
+
+    @staticmethod
+    def _sentences(text: str) -> List[str]:
+        sentences = []
+        for sentence in _SENTENCE_SPLIT.split(text):
+            sentence = sentence.strip(" \t-*#>")
+            # Skip separators, bare code punctuation and similar noise
+            if len(sentence) >= 12 and sum(c.isalpha() for c in sentence) >= len(sentence) // 3:
+                sentences.append(sentence[:400])
+        return sentences
+
+    @staticmethod
+    def _terms(sentence: str) -> List[str]:
+        return [t for t in _TERM.findall(sentence.lower()) if t not in _STOPWORDS]
+
+    def _terms_file(self) -> Path:
+        return self.state_file.with_name(self.state_file.stem + "_terms.json")
+
+    @staticmethod
+    def _write(path: Path, data: Dict[str, object]) -> None:
+        tmp_file = path.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(data))
+        tmp_file.replace(path)
@@ -0,0 +1,187 @@
+# ABOUTME: Token counting for context budgeting in Ralph Orchestrator
+# ABOUTME: Exact BPE counts with tiktoken when installed, a calibrated heuristic otherwise
+
+"""Token estimation for Ralph Orchestrator.
+
+:func:`get_estimator` returns a shared :class:`TokenEstimator`. Counts are
+memoized per text, and texts larger than ``CHUNK_SIZE`` are counted in
+content-defined chunks of lines that are memoized separately, so re-counting a
+multi-MB prompt after a small edit only tokenizes the chunks that changed.
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator
+
+logger = logging.getLogger('ralph-orchestrator.tokens')
+
+ESTIMATORS = ("auto", "tiktoken", "heuristic")
+DEFAULT_ENCODING = "cl100k_base"
+CHUNK_SIZE = 64 * 1024  # Typical characters per separately memoized chunk of a large text
+BOUNDARY_MODULUS = 1024  # About one chunk boundary per this many lines
+MEMO_CHARS = 32 * 1024 * 1024  # Characters of memoized texts kept, on top of the entry cap
+
+# Characters per token measured with cl100k_base: English prose is ~4.2,
+# source code ~3.3 (symbols are mostly tokens of their own)
+PROSE_CHARS_PER_TOKEN = 4.2
+CODE_CHARS_PER_TOKEN = 3.3
+_CODE_SYMBOLS = "{}()[];=<>_/\\|:*&\"'"
+# Non-ASCII text (accents, CJK, emoji) costs roughly a token per two extra UTF-8 bytes
+TOKENS_PER_EXTRA_BYTE = 0.5
+
+
+class TokenEstimator(ABC):
+    """Counts tokens, memoizing results per text."""
+
+    name = "base"
+
+    def __init__(self, memo_size: int = 4096, memo_chars: int = MEMO_CHARS):
+        self.memo_size = memo_size
+        self.memo_chars = memo_chars
+        self.chars_per_token = PROSE_CHARS_PER_TOKEN  # Observed ratio, for length-only estimates
+        self.hits = 0
+        self.misses = 0
+        self._memo: "OrderedDict[str, int]" = OrderedDict()
+        self._memo_length = 0  # Characters of the memoized texts
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """Number of tokens in ``text``."""
+        if not text:
+            return 0
+        if len(text) <= CHUNK_SIZE:
+            return self._memoized(text, self._count)
+        return self._memoized(text, lambda t: sum(self._memoized(c, self._count) for c in _chunks(t)))
+
+    def tokens_for_length(self, length: int) -> int:
+        """Estimate the tokens of a text known only by its length."""
+        return int(length / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` to at most ``max_tokens`` tokens, keeping its head."""
+        if max_tokens <= 0:
+            return ""
+        tokens = self.count(text)
+        end = len(text)
+        while tokens > max_tokens and end > 0:
+            # Shrink proportionally, with a margin so this rarely takes a second pass
+            end = int(end * max_tokens / tokens * 0.98)
+            tokens = self.count(text[:end])
+        return text[:end]
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "estimator": self.name,
+            "chars_per_token": round(self.chars_per_token, 2),
+            "memo_hits": self.hits,
+            "memo_misses": self.misses,
+        }
+
+    def _memoized(self, text: str, counter: Callable[[str], int]) -> int:
+        # Keyed on the text itself, so different texts never share a count. str
+        # caches its hash and equal keys are compared by identity first, so
+        # repeated lookups of the same prompt object are O(1)
+        with self._lock:
+            tokens = self._memo.get(text)
+            if tokens is not None:
+                self._memo.move_to_end(text)
+                self.hits += 1
+                return tokens
+        tokens = counter(text)
+        with self._lock:
+            self.misses += 1
+            if len(text) > self.memo_chars:
+                # Would evict everything else, including its own chunks
+                return tokens
+            if text not in self._memo:
+                self._memo_length += len(text)
+            self._memo[text] = tokens
+            while self._memo and (len(self._memo) > self.memo_size or self._memo_length > self.memo_chars):
+                evicted, _ = self._memo.popitem(last=False)
+                self._memo_length -= len(evicted)
+            if tokens and 1024 <= len(text) <= CHUNK_SIZE:
+                self.chars_per_token = 0.9 * self.chars_per_token + 0.1 * (len(text) / tokens)
+        return tokens
+
+    @abstractmethod
+    def _count(self, text: str) -> int:
+        """Tokenize ``text``; called only on memo misses."""
+
+
+class HeuristicEstimator(TokenEstimator):
+    """Estimates tokens from the share of code symbols and multi-byte characters."""
+
+    name = "heuristic"
+
+    def _count(self, text: str) -> int:
+        length = len(text)
+        # str.count and encode run in C, which keeps this fast on multi-MB text
+        symbols = sum(text.count(c) for c in _CODE_SYMBOLS)
+        extra_bytes = len(text.encode('utf-8', 'surrogatepass')) - length
+        ascii_chars = length - extra_bytes  # Close enough: multi-byte characters are rare in prompts
+        density = min(symbols / length * 8, 1.0)  # ~12% symbols is typical of code
+        chars_per_token = PROSE_CHARS_PER_TOKEN - density * (PROSE_CHARS_PER_TOKEN - CODE_CHARS_PER_TOKEN)
+        return max(1, round(max(ascii_chars, 0) / chars_per_token + extra_bytes * TOKENS_PER_EXTRA_BYTE))
+
+
+class TiktokenEstimator(TokenEstimator):
+    """Exact BPE counts with tiktoken."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING, memo_size: int = 4096):
+        import tiktoken
+        # Raises if the encoding is neither cached locally nor downloadable
+        self.encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+        super().__init__(memo_size)
+
+    def _count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+
+_estimators: Dict[str, TokenEstimator] = {}
+_estimators_lock = threading.Lock()
+
+
+def get_estimator(name: str = "auto") -> TokenEstimator:
+    """Return the shared estimator for ``name`` (auto, tiktoken or heuristic)."""
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown token estimator {name!r}, expected one of {', '.join(ESTIMATORS)}")
+    with _estimators_lock:
+        estimator = _estimators.get(name)
+        if estimator is None:
+            estimator = _estimators[name] = _create(name)
+        return estimator
+
+
+def _create(name: str) -> TokenEstimator:
+    if name != "heuristic":
+        try:
+            return TiktokenEstimator()
+        except Exception as e:
+            if name == "tiktoken":
+                raise
+            logger.debug(f"tiktoken unavailable ({e}), estimating tokens heuristically")
+    return HeuristicEstimator()
+
+
+def _chunks(text: str) -> Iterator[str]:
+    """Split at content-defined line boundaries.
+
+    A chunk ends after a line whose hash hits BOUNDARY_MODULUS, so after an
+    edit the boundaries downstream are unchanged and those chunks stay memoized.
+    """
+    start = pos = 0
+    while pos < len(text):
+        newline = text.find('\n', pos)
+        end = len(text) if newline == -1 else newline + 1
+        line = text[pos:end]
+        pos = end
+        size = pos - start
+        if (size >= CHUNK_SIZE * 4 or pos == len(text)
+                or (size >= CHUNK_SIZE // 4 and hash(line) % BOUNDARY_MODULUS == 0)):
+            yield text[start:pos]
+            start = pos
@@ -3,6 +3,12 @@
 
 """Web UI module for Ralph Orchestrator monitoring."""
 
-from .server import WebMonitor
+__all__ = ['WebMonitor']
 
-__all__ = ['WebMonitor']
\ No newline at end of file
+
+def __getattr__(name):
+    # The server pulls in FastAPI and uvicorn; import it only when used
+    if name == 'WebMonitor':
+        from .server import WebMonitor
+        return WebMonitor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -24,15 +24,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("RALPH_TOKEN_EXPIRE_MINUTES", "1440"
 DEFAULT_USERNAME = os.getenv("RALPH_WEB_USERNAME", "admin")
 DEFAULT_PASSWORD_HASH = os.getenv("RALPH_WEB_PASSWORD_HASH", None)
 
-# If no password hash is provided, generate one for the default password
-if not DEFAULT_PASSWORD_HASH:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    default_password = os.getenv("RALPH_WEB_PASSWORD", "admin123")
-    DEFAULT_PASSWORD_HASH = pwd_context.hash(default_password)
-
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+
+def get_default_password_hash() -> str:
+    """Return the default admin password hash.
+
+    Without RALPH_WEB_PASSWORD_HASH the default password is hashed on first
+    use rather than at import time, since bcrypt is deliberately slow.
+    """
+    global DEFAULT_PASSWORD_HASH
+    if not DEFAULT_PASSWORD_HASH:
+        default_password = os.getenv("RALPH_WEB_PASSWORD", "admin123")
+        DEFAULT_PASSWORD_HASH = pwd_context.hash(default_password)
+    return DEFAULT_PASSWORD_HASH
+
 # HTTP Bearer token authentication
 security = HTTPBearer()
 
@@ -63,7 +70,7 @@ class AuthManager:
         self.users = {
             DEFAULT_USERNAME: {
                 "username": DEFAULT_USERNAME,
-                "hashed_password": DEFAULT_PASSWORD_HASH,
+                "hashed_password": None,  # Filled in by get_default_password_hash()
                 "is_active": True,
                 "is_admin": True
             }
@@ -82,6 +89,8 @@ class AuthManager:
         user = self.users.get(username)
         if not user:
             return None
+        if user["hashed_password"] is None:
+            user["hashed_password"] = get_default_password_hash()
         if not self.verify_password(password, user["hashed_password"]):
             return None
         if not user.get("is_active", True):
@@ -51,6 +51,7 @@ class OrchestratorMonitor:
         self.database = DatabaseManager()
         self.active_runs: Dict[str, int] = {}  # Maps orchestrator_id to run_id
         self.active_iterations: Dict[str, int] = {}  # Maps orchestrator_id to iteration_id
+        self.stream_callbacks: Dict[str, Any] = {}  # Maps orchestrator_id to its stream subscriber
         
     async def start_monitoring(self):
         """Start background monitoring tasks."""
@@ -131,6 +132,13 @@ class OrchestratorMonitor:
         """Register an orchestrator instance."""
         self.active_orchestrators[orchestrator_id] = orchestrator
         
+        # Forward agent output to dashboard clients as it streams
+        if hasattr(orchestrator, 'subscribe_stream'):
+            def forward(adapter_name, event, orchestrator_id=orchestrator_id):
+                self._on_stream_event(orchestrator_id, adapter_name, event)
+            orchestrator.subscribe_stream(forward)
+            self.stream_callbacks[orchestrator_id] = forward
+        
         # Create a new run in the database
         try:
             run_id = self.database.create_run(
@@ -174,6 +182,11 @@ class OrchestratorMonitor:
                 except Exception as e:
                     logger.error(f"Error updating database run for orchestrator {orchestrator_id}: {e}")
             
+            # Stop forwarding agent output
+            callback = self.stream_callbacks.pop(orchestrator_id, None)
+            if callback is not None:
+                self.active_orchestrators[orchestrator_id].unsubscribe_stream(callback)
+            
             # Remove from active orchestrators
             del self.active_orchestrators[orchestrator_id]
             
@@ -186,6 +199,23 @@ class OrchestratorMonitor:
                 "data": {"id": orchestrator_id, "timestamp": datetime.now().isoformat()}
             })
     
+    def _on_stream_event(self, orchestrator_id: str, adapter_name: str, event) -> None:
+        """Broadcast a streamed adapter event to WebSocket clients."""
+        if not self.websocket_clients:
+            return
+        data = {
+            "id": orchestrator_id,
+            "adapter": adapter_name,
+            "kind": event.kind,
+            "text": event.text[:4096],
+            "timestamp": datetime.now().isoformat()
+        }
+        if event.kind == "tool_use":
+            data["tool"] = event.data.get("name")
+        elif event.kind == "usage":
+            data["usage"] = event.data
+        self._schedule_broadcast({"type": "agent_output", "data": data})
+    
     def get_orchestrator_status(self, orchestrator_id: str) -> Dict[str, Any]:
         """Get status of a specific orchestrator."""
         if orchestrator_id not in self.active_orchestrators:
@@ -459,6 +489,18 @@ class WebMonitor:
                 "tasks": task_status
             }
         
+        @self.app.get("/api/orchestrators/{orchestrator_id}/breakers", dependencies=[auth_dependency] if self.enable_auth else [])
+        async def get_orchestrator_breakers(orchestrator_id: str):
+            """Get per-adapter circuit breaker state for an orchestrator."""
+            if orchestrator_id not in self.monitor.active_orchestrators:
+                raise HTTPException(status_code=404, detail="Orchestrator not found")
+            
+            orchestrator = self.monitor.active_orchestrators[orchestrator_id]
+            return {
+                "orchestrator_id": orchestrator_id,
+                "breakers": orchestrator.safety_guard.breaker_stats()
+            }
+        
         @self.app.post("/api/orchestrators/{orchestrator_id}/pause", dependencies=[auth_dependency] if self.enable_auth else [])
         async def pause_orchestrator(orchestrator_id: str):
             """Pause an orchestrator."""
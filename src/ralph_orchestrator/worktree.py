@@ -0,0 +1,212 @@
+# ABOUTME: Async git helpers and git worktree management for Ralph Orchestrator
+# ABOUTME: Provides isolated checkouts so several agents can work on one repo at once
+
+"""Git worktree helpers for Ralph Orchestrator."""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger('ralph-orchestrator.worktree')
+
+
+@dataclass
+class GitResult:
+    """Result of a git command."""
+    returncode: int
+    stdout: str
+    stderr: str
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+async def run_git(
+    *args: str,
+    cwd: Optional[Path] = None,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[bytes] = None
+) -> GitResult:
+    """Run a git command without blocking the event loop.
+
+    Args:
+        args: Arguments passed to git
+        cwd: Working directory for the command
+        env: Extra environment variables merged over os.environ
+        input: Optional bytes written to stdin
+
+    Returns:
+        GitResult with decoded output
+    """
+    process_env = None
+    if env:
+        process_env = os.environ.copy()
+        process_env.update(env)
+
+    process = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=str(cwd) if cwd else None,
+        env=process_env,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate(input)
+    return GitResult(
+        returncode=process.returncode,
+        stdout=stdout.decode('utf-8', errors='replace'),
+        stderr=stderr.decode('utf-8', errors='replace')
+    )
+
+
+async def current_branch(cwd: Optional[Path] = None) -> str:
+    """Return the checked out branch name (or commit id when detached)."""
+    result = await run_git("rev-parse", "--abbrev-ref", "HEAD", cwd=cwd)
+    branch = result.stdout.strip()
+    if not result.ok or branch == "HEAD":
+        result = await run_git("rev-parse", "HEAD", cwd=cwd)
+        branch = result.stdout.strip()
+    return branch
+
+
+async def git_common_dir(cwd: Optional[Path] = None) -> Path:
+    """Return the absolute path of the repository's common .git directory."""
+    result = await run_git("rev-parse", "--path-format=absolute", "--git-common-dir", cwd=cwd)
+    if not result.ok:
+        raise RuntimeError(f"Not a git repository: {result.stderr.strip()}")
+    return Path(result.stdout.strip())
+
+
+class Worktree:
+    """A git worktree checked out on its own branch."""
+
+    def __init__(self, repo_dir: Path, path: Path, branch: str):
+        """Initialize a worktree handle.
+
+        Args:
+            repo_dir: Main working tree the worktree belongs to
+            path: Location of the worktree checkout
+            branch: Branch checked out in the worktree
+        """
+        self.repo_dir = repo_dir
+        self.path = path
+        self.branch = branch
+
+    @classmethod
+    async def create(cls, repo_dir: Path, name: str, base: str) -> 'Worktree':
+        """Create (or recreate) a worktree named ``name`` starting at ``base``.
+
+        Worktrees live under the repository's .git directory so they never show
+        up as untracked files in the main working tree.
+        """
+        root = await git_common_dir(repo_dir) / "ralph-worktrees"
+        root.mkdir(parents=True, exist_ok=True)
+        path = root / name
+        branch = f"ralph/{name}"
+
+        # Clear leftovers from an interrupted run
+        if path.exists():
+            await run_git("worktree", "remove", "--force", str(path), cwd=repo_dir)
+        await run_git("worktree", "prune", cwd=repo_dir)
+
+        result = await run_git(
+            "worktree", "add", "--force", "-B", branch, str(path), base,
+            cwd=repo_dir
+        )
+        if not result.ok:
+            raise RuntimeError(f"Failed to create worktree {name}: {result.stderr.strip()}")
+
+        logger.info(f"Created worktree {name} at {path}")
+        return cls(repo_dir, path, branch)
+
+    async def sync(self, base: str) -> None:
+        """Discard local state and move the worktree to ``base``."""
+        await run_git("reset", "--hard", "--quiet", base, cwd=self.path)
+        await run_git("clean", "-fdq", cwd=self.path)
+
+    async def head(self) -> str:
+        """Return the commit id checked out in the worktree."""
+        result = await run_git("rev-parse", "HEAD", cwd=self.path)
+        return result.stdout.strip()
+
+    async def commit_all(self, message: str, exclude: Sequence[str] = ()) -> bool:
+        """Stage and commit every change in the worktree.
+
+        Args:
+            message: Commit message
+            exclude: Paths that must not be committed
+
+        Returns:
+            True if a commit was created
+        """
+        pathspec: List[str] = ["--", "."] + [f":(exclude){path}" for path in exclude]
+        await run_git("add", "-A", *pathspec, cwd=self.path)
+
+        status = await run_git("diff", "--cached", "--quiet", cwd=self.path)
+        if status.ok:
+            return False
+
+        result = await run_git("commit", "--no-verify", "-q", "-m", message, cwd=self.path)
+        if not result.ok:
+            logger.warning(f"Commit in {self.path} failed: {result.stderr.strip()}")
+        return result.ok
+
+    async def has_commits_since(self, base: str) -> bool:
+        """Check whether the worktree branch is ahead of ``base``."""
+        result = await run_git("rev-list", "--count", f"{base}..HEAD", cwd=self.path)
+        return result.ok and int(result.stdout.strip() or 0) > 0
+
+    async def diff_since(self, base: str) -> bytes:
+        """Return a binary patch of everything changed in the worktree since ``base``."""
+        await run_git("add", "-A", cwd=self.path)
+        process = await asyncio.create_subprocess_exec(
+            "git", "diff", "--cached", "--binary", base,
+            cwd=str(self.path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        patch, _ = await process.communicate()
+        return patch
+
+    async def remove(self) -> None:
+        """Remove the worktree checkout and its branch."""
+        await run_git("worktree", "remove", "--force", str(self.path), cwd=self.repo_dir)
+        await run_git("branch", "-D", self.branch, cwd=self.repo_dir)
+        logger.debug(f"Removed worktree {self.path}")
+
+
+async def snapshot_worktree(repo_dir: Path, index_file: Path, message: str = "Ralph snapshot") -> str:
+    """Record the working tree, including uncommitted changes, as a commit.
+
+    Uses a private index so neither HEAD, the branch nor the user's index
+    are touched. The commit is not referenced by any branch. Keeping the
+    private index between calls lets git reuse its stat cache.
+
+    Args:
+        repo_dir: Working tree to snapshot
+        index_file: Private index file to stage into
+        message: Commit message for the snapshot
+
+    Returns:
+        Commit id of the snapshot
+    """
+    env = {"GIT_INDEX_FILE": str(index_file)}
+    head = await run_git("rev-parse", "--verify", "-q", "HEAD", cwd=repo_dir)
+
+    await run_git("add", "-A", cwd=repo_dir, env=env)
+    tree = await run_git("write-tree", cwd=repo_dir, env=env)
+    if not tree.ok:
+        raise RuntimeError(f"git write-tree failed: {tree.stderr.strip()}")
+
+    parents = ["-p", head.stdout.strip()] if head.ok else []
+    commit = await run_git(
+        "commit-tree", tree.stdout.strip(), *parents, "-m", message,
+        cwd=repo_dir
+    )
+    if not commit.ok:
+        raise RuntimeError(f"git commit-tree failed: {commit.stderr.strip()}")
+    return commit.stdout.strip()